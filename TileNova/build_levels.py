@@ -0,0 +1,9 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from config import LEVELS_DIR, LEVEL_PACK
+from level_pack import build_level_pack
+
+if __name__ == "__main__":
+    count = build_level_pack(LEVELS_DIR, LEVEL_PACK)
+    print(f"Packed {count} levels into {LEVEL_PACK}")
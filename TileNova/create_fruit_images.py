@@ -1,242 +1,274 @@
 import pygame
 import sys
 import os
-import math
+import json
+import hashlib
+import numpy
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-from config import TILE_COLORS, FRUIT_IMAGES, TILE_ASSETS
+from config import (TILE_COLORS, FRUIT_IMAGES, SPECIAL_TILES, TILE_ASSETS, TILE_IMAGE_PADDING, ASSET_TILE_SIZES,
+                    TILE_MANIFEST, TILE_ATLAS_IMAGE, TILE_ATLAS_INDEX)
 
-def create_curved_square_fruit_images():
-    """Create beautiful curved square fruit images with gradients and shadows"""
-    pygame.init()
-    
-    # Ensure the assets directory exists
-    os.makedirs(TILE_ASSETS, exist_ok=True)
-    
-    # Fruit colors and details
-    fruit_details = {
-        0: {"name": "apple", "color": (220, 20, 60), "accent": (255, 69, 0)},      # Apple - red with orange accent
-        1: {"name": "banana", "color": (255, 255, 0), "accent": (255, 215, 0)},   # Banana - yellow with gold accent
-        2: {"name": "cherry", "color": (139, 0, 0), "accent": (255, 20, 147)},    # Cherry - dark red with pink accent
-        3: {"name": "grape", "color": (128, 0, 128), "accent": (186, 85, 211)},   # Grape - purple with medium orchid accent
-        4: {"name": "orange", "color": (255, 165, 0), "accent": (255, 140, 0)},   # Orange - orange with dark orange accent
-        5: {"name": "pear", "color": (154, 205, 50), "accent": (124, 252, 0)},    # Pear - yellow green with lawn green accent
-        6: {"name": "strawberry", "color": (255, 20, 147), "accent": (255, 105, 180)} # Strawberry - deep pink with hot pink accent
-    }
-    
+# Bump when the drawing code changes so cached output is rebuilt
+GENERATOR_VERSION = 3
+
+# Size the artwork was originally designed at; everything else scales from it
+BASE_SIZE = 64
+
+# Fruit colors and details
+FRUIT_DETAILS = {
+    0: {"name": "apple", "color": (220, 20, 60), "accent": (255, 69, 0)},      # Apple - red with orange accent
+    1: {"name": "banana", "color": (255, 255, 0), "accent": (255, 215, 0)},   # Banana - yellow with gold accent
+    2: {"name": "cherry", "color": (139, 0, 0), "accent": (255, 20, 147)},    # Cherry - dark red with pink accent
+    3: {"name": "grape", "color": (128, 0, 128), "accent": (186, 85, 211)},   # Grape - purple with medium orchid accent
+    4: {"name": "orange", "color": (255, 165, 0), "accent": (255, 140, 0)},   # Orange - orange with dark orange accent
+    5: {"name": "pear", "color": (154, 205, 50), "accent": (124, 252, 0)},    # Pear - yellow green with lawn green accent
+    6: {"name": "strawberry", "color": (255, 20, 147), "accent": (255, 105, 180)} # Strawberry - deep pink with hot pink accent
+}
+
+def scaled(value, size):
+    """Scale a coordinate from the 64px design to the requested size"""
+    return int(round(value * size / BASE_SIZE))
+
+def pixel_grid(size):
+    """Return x and y coordinate arrays indexed as [x, y] like surfarray"""
+    return numpy.meshgrid(numpy.arange(size), numpy.arange(size), indexing='ij')
+
+def rounded_rect_mask(size, corner_radius, offset=0):
+    """Boolean mask of a rounded rectangle; offset shifts the top-left edge and corners"""
+    x, y = pixel_grid(size)
+    mask = (x >= offset) & (y >= offset)
+
+    near_left = x < corner_radius + offset
+    near_top = y < corner_radius + offset
+    near_right = x >= size - corner_radius
+    near_bottom = y >= size - corner_radius
+
+    left_cx = corner_radius + offset
+    top_cy = corner_radius + offset
+    right_cx = size - corner_radius
+    bottom_cy = size - corner_radius
+
+    # Cut away the pixels outside each corner arc (same order as the original checks)
+    corners = [
+        (near_left & near_top, left_cx, top_cy),
+        (~(near_left & near_top) & near_right & near_top, right_cx, top_cy),
+        (~(near_left & near_top) & ~(near_right & near_top) & near_left & near_bottom, left_cx, bottom_cy),
+        (~(near_left & near_top) & ~(near_right & near_top) & ~(near_left & near_bottom) & near_right & near_bottom,
+         right_cx, bottom_cy),
+    ]
+    for region, cx, cy in corners:
+        outside = numpy.sqrt((x - cx) ** 2.0 + (y - cy) ** 2.0) > corner_radius
+        mask &= ~(region & outside)
+
+    return mask
+
+def surface_from_arrays(rgb, alpha):
+    """Build an SRCALPHA surface from [x, y, 3] color and [x, y] alpha arrays"""
+    size = rgb.shape[0]
+    surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    pygame.surfarray.pixels3d(surface)[...] = rgb
+    pygame.surfarray.pixels_alpha(surface)[...] = alpha
+    return surface
+
+def filled_layer(mask, color):
+    """Build a surface with a flat RGBA color wherever mask is set"""
+    rgb = numpy.zeros(mask.shape + (3,), dtype=numpy.uint8)
+    rgb[mask] = color[:3]
+    alpha = numpy.where(mask, color[3], 0).astype(numpy.uint8)
+    return surface_from_arrays(rgb, alpha)
+
+def gradient_tile(size, channels):
+    """Build a rounded tile whose channels are given as arrays over the pixel grid"""
+    mask = rounded_rect_mask(size, scaled(12, size))
+    rgb = numpy.stack(channels, axis=-1)
+    rgb = numpy.where(mask[..., None], rgb, 0).astype(numpy.uint8)
+    alpha = numpy.where(mask, 255, 0).astype(numpy.uint8)
+    return surface_from_arrays(rgb, alpha)
+
+def create_fruit_surface(tile_type, size):
+    """Render one curved square fruit tile at the given size"""
+    fruit = FRUIT_DETAILS.get(tile_type, {"color": TILE_COLORS[tile_type % len(TILE_COLORS)], "accent": (255, 255, 255)})
+    base_color = numpy.array(fruit["color"], dtype=numpy.float64)
+    accent_color = numpy.array(fruit["accent"], dtype=numpy.float64)
+    x, y = pixel_grid(size)
+    half = size / 2
+
+    # Gradient from top-left to bottom-right, interpolated between base and accent color
+    gradient_factor = ((x + y) / (2.0 * size))[..., None]
+    color = numpy.trunc(base_color * (1 - gradient_factor) + accent_color * gradient_factor)
+
+    # Brightness variation for depth
+    brightness_factor = (0.8 + 0.4 * (1 - numpy.abs(x - half) / half) * (1 - numpy.abs(y - half) / half))[..., None]
+    color = numpy.minimum(255, numpy.trunc(color * brightness_factor))
+
+    surface = gradient_tile(size, [color[..., 0], color[..., 1], color[..., 2]])
+
+    # Subtle shadow offset by 2 pixels
+    shadow_surface = filled_layer(rounded_rect_mask(size, scaled(12, size), offset=scaled(2, size)), (0, 0, 0, 30))
+
+    # Diagonal highlight in the top-left area
+    extent = scaled(20, size)
+    inset = scaled(8, size)
+    highlight_mask = numpy.zeros((size, size), dtype=bool)
+    hx, hy = pixel_grid(extent)
+    highlight_mask[inset:inset + extent, inset:inset + extent] = (hx + hy) < scaled(25, size)
+    highlight_surface = filled_layer(highlight_mask, (255, 255, 255, 60))
+
+    # Combine shadow, main surface and highlight
+    final_surface = pygame.Surface((size, size), pygame.SRCALPHA)
+    final_surface.blit(shadow_surface, (0, 0))
+    final_surface.blit(surface, (0, 0))
+    final_surface.blit(highlight_surface, (0, 0))
+    return final_surface
+
+def create_rocket_surface(size):
+    """Rocket tile (for 4-tile matches)"""
+    x, y = pixel_grid(size)
+    gradient_factor = y / float(size)
+    surface = gradient_tile(size, [
+        numpy.trunc(255 * (1 - gradient_factor * 0.3)),
+        numpy.trunc(100 * gradient_factor),
+        numpy.zeros_like(gradient_factor),
+    ])
+
+    def s(value):
+        return scaled(value, size)
+
+    pygame.draw.polygon(surface, (255, 255, 0), [(s(32), s(10)), (s(25), s(35)), (s(39), s(35))])  # Tip
+    pygame.draw.rect(surface, (200, 200, 200), (s(28), s(35), s(8), s(20)))  # Body
+    pygame.draw.polygon(surface, (255, 100, 0), [(s(20), s(55)), (s(32), s(45)), (s(44), s(55))])  # Flames
+    return surface
+
+def create_lightning_surface(size):
+    """Lightning tile (for 5-tile matches)"""
+    x, y = pixel_grid(size)
+    gradient_factor = (x + y) / (2.0 * size)
+    surface = gradient_tile(size, [
+        numpy.trunc(128 * (1 - gradient_factor)),
+        numpy.trunc(50 * gradient_factor),
+        numpy.trunc(255 * (0.7 + 0.3 * gradient_factor)),
+    ])
+
+    lightning_points = [(scaled(px, size), scaled(py, size))
+                        for px, py in [(35, 8), (25, 30), (30, 30), (20, 56), (30, 35), (25, 35)]]
+    pygame.draw.polygon(surface, (255, 255, 255), lightning_points)
+    pygame.draw.polygon(surface, (255, 255, 0), lightning_points, max(1, scaled(2, size)))
+    return surface
+
+def create_bomb_surface(size):
+    """Bomb tile (for L/T shaped matches)"""
+    x, y = pixel_grid(size)
+    gradient_factor = (x + y) / (2.0 * size)
+    shade = numpy.trunc(50 * (1 - gradient_factor * 0.5))
+    surface = gradient_tile(size, [shade, shade, shade])
+
+    def s(value):
+        return scaled(value, size)
+
+    pygame.draw.circle(surface, (40, 40, 40), (s(32), s(40)), s(18))  # Main body
+    pygame.draw.circle(surface, (60, 60, 60), (s(32), s(40)), s(18), max(1, s(2)))  # Outline
+    pygame.draw.line(surface, (139, 69, 19), (s(32), s(22)), (s(28), s(15)), max(1, s(3)))  # Fuse
+    pygame.draw.circle(surface, (255, 100, 0), (s(26), s(13)), max(1, s(3)))  # Spark
+    return surface
+
+SPECIAL_RENDERERS = {
+    "rocket.png": create_rocket_surface,
+    "lightning.png": create_lightning_surface,
+    "bomb.png": create_bomb_surface,
+}
+
+def render_tile_images(size):
+    """Render every fruit and special tile at the given size, keyed by image name"""
+    images = {}
     for tile_type, image_name in FRUIT_IMAGES.items():
-        # Create surface with alpha channel
-        surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-        
-        # Get fruit details
-        fruit = fruit_details.get(tile_type, {"color": TILE_COLORS[tile_type % len(TILE_COLORS)], "accent": (255, 255, 255)})
-        base_color = fruit["color"]
-        accent_color = fruit["accent"]
-        
-        # Create gradient effect
-        for y in range(64):
-            for x in range(64):
-                # Calculate distance from center for rounded corners
-                center_x, center_y = 32, 32
-                corner_radius = 12
-                
-                # Check if pixel is within rounded rectangle
-                if (x < corner_radius and y < corner_radius):
-                    # Top-left corner
-                    if math.sqrt((x - corner_radius)**2 + (y - corner_radius)**2) > corner_radius:
-                        continue
-                elif (x >= 64 - corner_radius and y < corner_radius):
-                    # Top-right corner
-                    if math.sqrt((x - (64 - corner_radius))**2 + (y - corner_radius)**2) > corner_radius:
-                        continue
-                elif (x < corner_radius and y >= 64 - corner_radius):
-                    # Bottom-left corner
-                    if math.sqrt((x - corner_radius)**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                        continue
-                elif (x >= 64 - corner_radius and y >= 64 - corner_radius):
-                    # Bottom-right corner
-                    if math.sqrt((x - (64 - corner_radius))**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                        continue
-                
-                # Create gradient from top-left to bottom-right
-                gradient_factor = (x + y) / 128.0
-                
-                # Interpolate between base color and accent color
-                r = int(base_color[0] * (1 - gradient_factor) + accent_color[0] * gradient_factor)
-                g = int(base_color[1] * (1 - gradient_factor) + accent_color[1] * gradient_factor)
-                b = int(base_color[2] * (1 - gradient_factor) + accent_color[2] * gradient_factor)
-                
-                # Add some brightness variation for depth
-                brightness_factor = 0.8 + 0.4 * (1 - abs(x - 32) / 32) * (1 - abs(y - 32) / 32)
-                r = min(255, int(r * brightness_factor))
-                g = min(255, int(g * brightness_factor))
-                b = min(255, int(b * brightness_factor))
-                
-                surface.set_at((x, y), (r, g, b, 255))
-        
-        # Add subtle shadow effect
-        shadow_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-        shadow_color = (0, 0, 0, 30)
-        
-        # Draw shadow (offset by 2 pixels)
-        for y in range(2, 64):
-            for x in range(2, 64):
-                center_x, center_y = 32, 32
-                corner_radius = 12
-                
-                # Check if pixel is within rounded rectangle (same logic as above)
-                if (x < corner_radius + 2 and y < corner_radius + 2):
-                    if math.sqrt((x - corner_radius - 2)**2 + (y - corner_radius - 2)**2) > corner_radius:
-                        continue
-                elif (x >= 64 - corner_radius and y < corner_radius + 2):
-                    if math.sqrt((x - (64 - corner_radius))**2 + (y - corner_radius - 2)**2) > corner_radius:
-                        continue
-                elif (x < corner_radius + 2 and y >= 64 - corner_radius):
-                    if math.sqrt((x - corner_radius - 2)**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                        continue
-                elif (x >= 64 - corner_radius and y >= 64 - corner_radius):
-                    if math.sqrt((x - (64 - corner_radius))**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                        continue
-                
-                shadow_surface.set_at((x, y), shadow_color)
-        
-        # Combine shadow and main surface
-        final_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-        final_surface.blit(shadow_surface, (0, 0))
-        final_surface.blit(surface, (0, 0))
-        
-        # Add highlight effect
-        highlight_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-        highlight_color = (255, 255, 255, 60)
-        
-        # Add highlight in top-left area
-        for y in range(20):
-            for x in range(20):
-                if x + y < 25:  # Create diagonal highlight
-                    highlight_surface.set_at((x + 8, y + 8), highlight_color)
-        
-        final_surface.blit(highlight_surface, (0, 0))
-        
-        # Save the image
-        pygame.image.save(final_surface, f"{TILE_ASSETS}{image_name}")
-        print(f"Created {image_name} with curved square design")
-
-def create_special_tile_images():
-    """Create special power-up tile images"""
+        images[image_name] = create_fruit_surface(tile_type, size)
+    for image_name in SPECIAL_TILES.values():
+        images[image_name] = SPECIAL_RENDERERS[image_name](size)
+    return images
+
+def build_atlas(images, size, path):
+    """Pack rendered tiles into one atlas image plus a JSON index of sub-rectangles"""
+    names = sorted(images)
+    columns = max(1, int(numpy.ceil(numpy.sqrt(len(names)))))
+    rows = (len(names) + columns - 1) // columns
+
+    atlas = pygame.Surface((columns * size, rows * size), pygame.SRCALPHA)
+    rects = {}
+    for index, image_name in enumerate(names):
+        x = (index % columns) * size
+        y = (index // columns) * size
+        atlas.blit(images[image_name], (x, y))
+        rects[image_name] = [x, y, size, size]
+
+    pygame.image.save(atlas, os.path.join(path, TILE_ATLAS_IMAGE))
+    with open(os.path.join(path, TILE_ATLAS_INDEX), 'w') as f:
+        json.dump({"image": TILE_ATLAS_IMAGE, "image_size": size, "rects": rects}, f, indent=4)
+
+def output_targets():
+    """Map each output directory to the pixel size rendered into it"""
+    # The loose 64px files keep working for anything that loads them directly
+    targets = {TILE_ASSETS: BASE_SIZE}
+    for tile_size in ASSET_TILE_SIZES:
+        targets[os.path.join(TILE_ASSETS, str(tile_size), "")] = tile_size - TILE_IMAGE_PADDING
+    return targets
+
+def parameters_hash():
+    """Content hash of everything that affects the generated images"""
+    params = {
+        "version": GENERATOR_VERSION,
+        "fruits": {str(k): v for k, v in FRUIT_DETAILS.items()},
+        "fruit_images": {str(k): v for k, v in FRUIT_IMAGES.items()},
+        "special_images": {str(k): v for k, v in SPECIAL_TILES.items()},
+        "targets": output_targets(),
+        "atlas": [TILE_ATLAS_IMAGE, TILE_ATLAS_INDEX],
+    }
+    encoded = json.dumps(params, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def load_manifest():
+    """Load the manifest written by the previous run, if any"""
+    try:
+        with open(TILE_MANIFEST, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def manifest_is_current(manifest, content_hash):
+    """Check whether the manifest matches the current parameters and its files still exist"""
+    if not manifest or manifest.get("hash") != content_hash:
+        return False
+    for variant in manifest.get("variants", {}).values():
+        for image_name in variant["files"] + [TILE_ATLAS_IMAGE, TILE_ATLAS_INDEX]:
+            if not os.path.exists(os.path.join(variant["path"], image_name)):
+                return False
+    return True
+
+def build_tile_assets(force=False):
+    """Generate all tile image variants and the manifest; skip if nothing changed"""
     pygame.init()
-    
-    # Ensure the assets directory exists
-    os.makedirs(TILE_ASSETS, exist_ok=True)
-    
-    # Rocket tile (for 4-tile matches)
-    rocket_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-    
-    # Create rocket background with gradient
-    for y in range(64):
-        for x in range(64):
-            # Rounded rectangle check
-            corner_radius = 12
-            if (x < corner_radius and y < corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y < corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x < corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            
-            # Red to orange gradient for rocket
-            gradient_factor = y / 64.0
-            r = int(255 * (1 - gradient_factor * 0.3))
-            g = int(100 * gradient_factor)
-            b = 0
-            rocket_surface.set_at((x, y), (r, g, b, 255))
-    
-    # Add rocket shape
-    pygame.draw.polygon(rocket_surface, (255, 255, 0), [(32, 10), (25, 35), (39, 35)])  # Tip
-    pygame.draw.rect(rocket_surface, (200, 200, 200), (28, 35, 8, 20))  # Body
-    pygame.draw.polygon(rocket_surface, (255, 100, 0), [(20, 55), (32, 45), (44, 55)])  # Flames
-    
-    pygame.image.save(rocket_surface, f"{TILE_ASSETS}rocket.png")
-    print("Created rocket.png")
-    
-    # Lightning tile (for 5-tile matches)
-    lightning_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-    
-    # Create lightning background with gradient
-    for y in range(64):
-        for x in range(64):
-            # Rounded rectangle check (same as above)
-            corner_radius = 12
-            if (x < corner_radius and y < corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y < corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x < corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            
-            # Purple to blue gradient for lightning
-            gradient_factor = (x + y) / 128.0
-            r = int(128 * (1 - gradient_factor))
-            g = int(50 * gradient_factor)
-            b = int(255 * (0.7 + 0.3 * gradient_factor))
-            lightning_surface.set_at((x, y), (r, g, b, 255))
-    
-    # Add lightning bolt shape
-    lightning_points = [(35, 8), (25, 30), (30, 30), (20, 56), (30, 35), (25, 35)]
-    pygame.draw.polygon(lightning_surface, (255, 255, 255), lightning_points)
-    pygame.draw.polygon(lightning_surface, (255, 255, 0), lightning_points, 2)
-    
-    pygame.image.save(lightning_surface, f"{TILE_ASSETS}lightning.png")
-    print("Created lightning.png")
-    
-    # Bomb tile (for L/T shaped matches)
-    bomb_surface = pygame.Surface((64, 64), pygame.SRCALPHA)
-    
-    # Create bomb background with gradient
-    for y in range(64):
-        for x in range(64):
-            # Rounded rectangle check (same as above)
-            corner_radius = 12
-            if (x < corner_radius and y < corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y < corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - corner_radius)**2) > corner_radius:
-                    continue
-            elif (x < corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - corner_radius)**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            elif (x >= 64 - corner_radius and y >= 64 - corner_radius):
-                if math.sqrt((x - (64 - corner_radius))**2 + (y - (64 - corner_radius))**2) > corner_radius:
-                    continue
-            
-            # Dark gradient for bomb
-            gradient_factor = (x + y) / 128.0
-            r = int(50 * (1 - gradient_factor * 0.5))
-            g = int(50 * (1 - gradient_factor * 0.5))
-            b = int(50 * (1 - gradient_factor * 0.5))
-            bomb_surface.set_at((x, y), (r, g, b, 255))
-    
-    # Add bomb shape
-    pygame.draw.circle(bomb_surface, (40, 40, 40), (32, 40), 18)  # Main body
-    pygame.draw.circle(bomb_surface, (60, 60, 60), (32, 40), 18, 2)  # Outline
-    pygame.draw.line(bomb_surface, (139, 69, 19), (32, 22), (28, 15), 3)  # Fuse
-    pygame.draw.circle(bomb_surface, (255, 100, 0), (26, 13), 3)  # Spark
-    
-    pygame.image.save(bomb_surface, f"{TILE_ASSETS}bomb.png")
-    print("Created bomb.png")
+
+    content_hash = parameters_hash()
+    if not force and manifest_is_current(load_manifest(), content_hash):
+        print("Tile images are up to date")
+        return False
+
+    variants = {}
+    for path, size in output_targets().items():
+        os.makedirs(path, exist_ok=True)
+        images = render_tile_images(size)
+        for image_name, surface in images.items():
+            pygame.image.save(surface, os.path.join(path, image_name))
+        build_atlas(images, size, path)
+
+        key = "base" if path == TILE_ASSETS else path[len(TILE_ASSETS):].strip("/\\")
+        variants[key] = {"path": path, "image_size": size, "files": sorted(images)}
+        print(f"Created {len(images)} tiles at {size}x{size} in {path}")
+
+    manifest = {"hash": content_hash, "version": GENERATOR_VERSION, "variants": variants}
+    with open(TILE_MANIFEST, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    return True
 
 if __name__ == "__main__":
-    create_curved_square_fruit_images()
-    create_special_tile_images()
-    print("All curved square fruit images and special tiles created successfully!")
+    if build_tile_assets(force="--force" in sys.argv):
+        print("All curved square fruit images and special tiles created successfully!")
@@ -0,0 +1,84 @@
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+import pygame
+from config import SCREEN_WIDTH, SCREEN_HEIGHT, FPS
+from level_manager import LevelManager
+from replay import Replay
+
+OUTCOMES = ["unfinished", "win", "loss"]
+
+def watch(replay):
+    """Play a replay in the game window at normal speed; returns (score, outcome)"""
+    from game import Game
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("TileNova replay")
+    clock = pygame.time.Clock()
+    game = Game(screen)
+    game.start_playback(replay)
+
+    while game.playback_result is None:
+        if any(event.type == pygame.QUIT for event in pygame.event.get()):
+            break
+        game.update()
+        game.draw()
+        pygame.display.flip()
+        clock.tick(FPS)
+
+    result = game.playback_result
+    game.shutdown()
+    pygame.quit()
+    return result
+
+def check(paths):
+    """Play replays back headlessly at full speed; returns how many did not match their recording"""
+    from replay_player import ReplayGame
+    level_manager = LevelManager()
+    mismatches = 0
+    moves = 0
+    start = time.perf_counter()
+    for path in paths:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ValueError) as e:
+            mismatches += 1
+            print(f"{path}: unreadable, {e}")
+            continue
+        score, outcome = ReplayGame(level_manager).play(replay)
+        moves += len(replay.events)
+        if not replay.matches(score, outcome):
+            mismatches += 1
+            print(f"{path}: MISMATCH recorded {replay.final_score} ({OUTCOMES[replay.outcome]}), "
+                  f"played back {score} ({OUTCOMES[outcome]})")
+    elapsed = time.perf_counter() - start
+    print(f"{len(paths) - mismatches} of {len(paths)} replays matched; "
+          f"{moves} swaps in {elapsed:.2f}s ({elapsed / max(1, len(paths)) * 1000:.1f} ms per replay)")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back recorded levels from the replays directory")
+    parser.add_argument("replays", nargs="+", help=".tnr replay files")
+    parser.add_argument("--headless", action="store_true",
+                        help="play at full speed without a window and check each final score")
+    args = parser.parse_args()
+
+    if args.headless:
+        sys.exit(1 if check(args.replays) else 0)
+
+    if len(args.replays) != 1:
+        parser.error("watch one replay at a time, or use --headless")
+    replay = Replay.load(args.replays[0])
+    result = watch(replay)
+    if result is None:
+        print("Playback stopped before the end")
+    elif replay.matches(*result):
+        print(f"Replay matched: {result[0]} points ({OUTCOMES[result[1]]})")
+    else:
+        print(f"Replay diverged: recorded {replay.final_score}, played back {result[0]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from config import SIMULATION_GAMES
+from level_manager import LevelManager
+from simulator import POLICIES, simulate, write_csv, write_json
+
+def parse_levels(text, level_count):
+    """Turn "1-3,5" into [1, 2, 3, 5]; empty means every level"""
+    if not text:
+        return list(range(1, level_count + 1))
+    levels = []
+    for part in text.split(","):
+        first, _, last = part.partition("-")
+        levels.extend(range(int(first), int(last or first) + 1))
+    return levels
+
+def main():
+    parser = argparse.ArgumentParser(description="Play levels with bots to measure their difficulty")
+    parser.add_argument("--levels", help="levels to play, e.g. 1-3,5 (default: all)")
+    parser.add_argument("--policies", help=f"comma-separated: {', '.join(POLICIES)} (default: random,greedy)")
+    parser.add_argument("--games", type=int, default=SIMULATION_GAMES, help="games per level and policy")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", choices=["single", "batch"], default="single",
+                        help="batch plays many boards at once with NumPy, random policy only")
+    parser.add_argument("--output", default="simulation.json", help="report path; .csv writes CSV, else JSON")
+    args = parser.parse_args()
+
+    level_manager = LevelManager()
+    levels = parse_levels(args.levels, level_manager.get_level_count())
+    batch = args.engine == "batch"
+    policies = (args.policies or ("random" if batch else "random,greedy")).split(",")
+    for policy in policies:
+        if policy not in POLICIES:
+            parser.error(f"unknown policy {policy}")
+    if batch and policies != ["random"]:
+        parser.error("the batch engine only plays the random policy")
+
+    start = time.perf_counter()
+    reports = simulate(levels, policies, args.games, args.workers, args.seed, level_manager, batch)
+    elapsed = time.perf_counter() - start
+
+    if args.output.endswith(".csv"):
+        write_csv(reports, args.output)
+    else:
+        write_json(reports, args.output)
+
+    for report in reports:
+        print(f"Level {report['level']:>3} {report['policy']:<10} pass {report['pass_rate']:6.1%}  "
+              f"median score {report['score']['p50']:>6}  moves used {report['avg_moves_used']:.1f}")
+    print(f"{len(levels) * len(policies) * args.games} games in {elapsed:.1f}s, report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import random
+import time
+from collections import OrderedDict
+from config import *
+from engine import is_swappable, is_matchable
+
+class ZobristHasher:
+    """Hashes a board in the get_cells() layout by XOR-ing one random key per (cell, code)"""
+
+    def __init__(self, size=BOARD_WIDTH * BOARD_HEIGHT, seed=0):
+        rng = random.Random(seed)
+        self.keys = [[rng.getrandbits(64) for _ in range(256)] for _ in range(size)]
+
+    def hash(self, cells):
+        """64-bit hash of a whole board"""
+        value = 0
+        for keys, cell in zip(self.keys, cells):
+            value ^= keys[cell]
+        return value
+
+    def update(self, value, index, old_cell, new_cell):
+        """Hash after one cell changes, without rehashing the board"""
+        return value ^ self.keys[index][old_cell] ^ self.keys[index][new_cell]
+
+class TranspositionTable:
+    """Bounded map from search keys to values that evicts the least recently used entry"""
+
+    def __init__(self, capacity=AI_TABLE_SIZE):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Stored value for a key, or None"""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """Store a value, evicting the oldest entry once the table is full"""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+class OutOfTime(Exception):
+    """Raised inside a search when its time budget runs out"""
+
+class SearchCancelled(Exception):
+    """Raised out of rank() when the caller no longer wants the answer"""
+
+class ExpectimaxAI:
+    """Picks moves by expectimax over the headless engine's cascades and refills
+
+    Each move is a chance node: refills are unknown, so its value is the mean
+    over sampled refill sequences of the points it scores plus the value of
+    the best reply. Search deepens one move at a time until the budget runs
+    out and the deepest finished ranking is used; past the first move only
+    the best few root moves are searched. Sampled refills are seeded from the
+    position's Zobrist hash, so a position always gets the same value and
+    can be reused from the transposition table, which persists between calls.
+    """
+
+    def __init__(self, budget=AI_TIME_BUDGET, max_depth=AI_MAX_DEPTH, samples=AI_CHANCE_SAMPLES,
+                 beam_width=AI_BEAM_WIDTH, table_size=AI_TABLE_SIZE):
+        self.budget = budget
+        self.max_depth = max_depth
+        self.samples = samples
+        self.beam_width = beam_width
+        self.hasher = ZobristHasher()
+        self.table = TranspositionTable(table_size)
+        self.depth_reached = 0
+        self.should_stop = None
+
+    def choose(self, state, moves=None):
+        """Best move for a GameState, or None if it has none"""
+        ranked = self.rank(state, moves)
+        return ranked[0][0] if ranked else None
+
+    def rank(self, state, moves=None, should_stop=None):
+        """(move, value) pairs for the root moves, best first
+
+        The one-move ranking always finishes, whatever the budget, so there
+        is always an answer, unless should_stop returns true during the
+        search, which raises SearchCancelled.
+        """
+        deadline = time.perf_counter() + self.budget
+        moves = state.valid_moves() if moves is None else list(moves)
+        ranked = [(move, 0.0) for move in moves]
+        self.depth_reached = 0
+        self.should_stop = should_stop
+        try:
+            for depth in range(1, self.max_depth + 1):
+                beam = ranked if depth == 1 else ranked[:self.beam_width]
+                try:
+                    values = [(move, self.move_value(state, move, depth, deadline if depth > 1 else None,
+                                                     self.samples)) for move, _ in beam]
+                except OutOfTime:
+                    break
+                values.sort(key=lambda item: item[1], reverse=True)
+                ranked = values + ranked[len(beam):]
+                self.depth_reached = depth
+        finally:
+            self.should_stop = None
+        return ranked
+
+    def move_value(self, state, move, depth, deadline, samples=1):
+        """Expected points from a move plus the best play after it, depth moves deep in all"""
+        position = self.hasher.hash(state.cells)
+        key = (position, move, depth, samples, state.moves_left, max(0, state.target_score - state.score))
+        value = self.table.get(key)
+        if value is not None:
+            return value
+
+        total = 0
+        for sample in range(samples):
+            if self.should_stop is not None and self.should_stop():
+                raise SearchCancelled()
+            if deadline is not None and time.perf_counter() > deadline:
+                raise OutOfTime()
+            child = state.copy(random.Random(hash((position, move, sample))))
+            stats = child.play(*move)
+            if stats is not None:  # A lightning tile that finds nothing to clear scores nothing
+                total += stats['score_delta'] + self.node_value(child, depth - 1, deadline)
+        value = total / samples
+        self.table.put(key, value)
+        return value
+
+    def node_value(self, state, depth, deadline):
+        """Value of the best move in a position, or its static value at the search horizon"""
+        if depth == 0 or state.outcome() is not None:
+            return self.evaluate(state)
+        moves = state.valid_moves()
+        if not moves:
+            return self.evaluate(state)  # The board will be shuffled, which the search does not model
+        return max(self.move_value(state, move, depth, deadline) for move in moves)
+
+    def evaluate(self, state):
+        """Static value: reaching the target, or the special tiles left on the board to use later"""
+        if state.score >= state.target_score:
+            return AI_WIN_BONUS
+        return AI_SPECIAL_VALUE * sum(1 for cell in state.cells if is_swappable(cell) and not is_matchable(cell))
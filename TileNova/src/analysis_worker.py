@@ -0,0 +1,186 @@
+import multiprocessing
+import struct
+from multiprocessing import shared_memory
+import numpy
+from config import *
+from ai import ExpectimaxAI, SearchCancelled
+from engine import GameState
+
+# Shared memory holds two slots, each a sequence counter followed by its record:
+#   request: board version, target score, moves left, active flag, then the board
+#            as an int8 grid whose bytes are the get_cells() codes (CELL_EMPTY reads as -1)
+#   result:  board version, move count, then up to ANALYSIS_RESULT_MOVES ranked moves
+SEQUENCE = struct.Struct("<I")
+REQUEST_HEADER = struct.Struct("<QiHBx")
+RESULT_HEADER = struct.Struct("<QBxxx")
+RESULT_MOVE = struct.Struct("<BBBBf")  # x1, y1, x2, y2, value
+NO_VERSION = 2 ** 64 - 1  # Version in the slots before anything is written; no board ever has it
+
+class Seqlock:
+    """A sequence counter guarding one record in shared memory, with one writer and no locks
+
+    The writer makes the counter odd, writes the record, then makes it even
+    again. A reader copies the record and keeps the copy only if the counter
+    was even and unchanged throughout, so it never waits on the writer.
+    """
+
+    def __init__(self, buf, offset):
+        self.buf = buf
+        self.offset = offset
+
+    def sequence(self):
+        return SEQUENCE.unpack_from(self.buf, self.offset)[0]
+
+    def begin_write(self):
+        SEQUENCE.pack_into(self.buf, self.offset, self.sequence() + 1)
+
+    def end_write(self):
+        SEQUENCE.pack_into(self.buf, self.offset, self.sequence() + 1)
+
+    def read(self, copy):
+        """Run copy() and return its result, or None if a write was in progress or happened meanwhile"""
+        before = self.sequence()
+        if before & 1:
+            return None
+        value = copy()
+        return value if self.sequence() == before else None
+
+class SharedSlots:
+    """The request and result slots laid out over one shared memory block"""
+
+    def __init__(self, buf, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.buf = buf
+        self.request_lock = Seqlock(buf, 0)
+        self.request_offset = SEQUENCE.size
+        grid_offset = self.request_offset + REQUEST_HEADER.size
+        self.grid = numpy.ndarray((height, width), dtype=numpy.int8, buffer=buf, offset=grid_offset)
+        self.result_lock = Seqlock(buf, grid_offset + width * height)
+        self.result_offset = self.result_lock.offset + SEQUENCE.size
+
+    @staticmethod
+    def size(width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        return (SEQUENCE.size * 2 + REQUEST_HEADER.size + width * height + RESULT_HEADER.size +
+                RESULT_MOVE.size * ANALYSIS_RESULT_MOVES)
+
+    def write_request(self, version, cells, moves_left, target_score, active=True):
+        self.request_lock.begin_write()
+        REQUEST_HEADER.pack_into(self.buf, self.request_offset, version, int(target_score), moves_left, active)
+        if cells is not None:
+            self.grid.reshape(-1)[:] = numpy.frombuffer(cells, dtype=numpy.int8)
+        self.request_lock.end_write()
+
+    def is_wanted(self, version):
+        """Check whether a request is still the newest and not cancelled, without taking a snapshot"""
+        newest, _, _, active = REQUEST_HEADER.unpack_from(self.buf, self.request_offset)
+        return newest == version and active
+
+    def read_request(self):
+        """(version, cells, moves left, target score, active), or None if it was being written"""
+        def copy():
+            version, target_score, moves_left, active = REQUEST_HEADER.unpack_from(self.buf, self.request_offset)
+            return version, self.grid.tobytes(), moves_left, target_score, active
+        return self.request_lock.read(copy)
+
+    def write_result(self, version, ranking):
+        ranking = ranking[:ANALYSIS_RESULT_MOVES]
+        self.result_lock.begin_write()
+        RESULT_HEADER.pack_into(self.buf, self.result_offset, version, len(ranking))
+        for i, (((x1, y1), (x2, y2)), value) in enumerate(ranking):
+            RESULT_MOVE.pack_into(self.buf, self.result_offset + RESULT_HEADER.size + i * RESULT_MOVE.size,
+                                  x1, y1, x2, y2, value)
+        self.result_lock.end_write()
+
+    def result_sequence(self):
+        return self.result_lock.sequence()
+
+    def read_result(self):
+        """(version, [(move, value), ...]), or None if it was being written"""
+        def copy():
+            version, count = RESULT_HEADER.unpack_from(self.buf, self.result_offset)
+            start = self.result_offset + RESULT_HEADER.size
+            end = start + min(count, ANALYSIS_RESULT_MOVES) * RESULT_MOVE.size
+            moves = RESULT_MOVE.iter_unpack(self.buf[start:end])
+            return version, [(((x1, y1), (x2, y2)), value) for x1, y1, x2, y2, value in moves]
+        return self.result_lock.read(copy)
+
+def run_worker(memory_name, wake, stop):
+    """Worker process: wait for a board, rank its moves with the AI and publish the ranking"""
+    memory = shared_memory.SharedMemory(name=memory_name)  # Owned and unlinked by the game process
+    slots = SharedSlots(memory.buf)
+    ai = ExpectimaxAI()
+    done_version = None
+    try:
+        while not stop.is_set():
+            if not wake.wait(0.1):
+                continue
+            wake.clear()
+            request = slots.read_request()
+            if request is None:
+                wake.set()  # Caught it mid-write; look again
+                continue
+            version, cells, moves_left, target_score, active = request
+            if not active or version == done_version:
+                continue
+            try:
+                ranking = ai.rank(GameState(cells, target_score, moves_left),
+                                  should_stop=lambda: not slots.is_wanted(version) or stop.is_set())
+            except SearchCancelled:
+                continue
+            slots.write_result(version, ranking)
+            done_version = version
+    finally:
+        del slots
+        memory.close()
+
+class AnalysisWorker:
+    """Runs the AI in a separate process so searches never hold the game loop's GIL
+
+    submit() writes a board snapshot into shared memory and wakes the worker;
+    poll() reads the latest result without locking and is cheap enough to
+    call every frame. A newer submit() or cancel() makes the worker abandon
+    whatever it is searching.
+    """
+
+    def __init__(self):
+        self.memory = shared_memory.SharedMemory(create=True, size=SharedSlots.size())
+        self.slots = SharedSlots(self.memory.buf)
+        self.slots.write_request(NO_VERSION, None, 0, 0, active=False)
+        self.slots.write_result(NO_VERSION, [])
+        self.wake = multiprocessing.Event()
+        self.stop = multiprocessing.Event()
+        self.process = multiprocessing.Process(target=run_worker, args=(self.memory.name, self.wake, self.stop),
+                                               name="analysis-worker", daemon=True)
+        self.process.start()
+        self.result_sequence = None
+        self.result = None
+
+    def submit(self, version, cells, moves_left, target_score):
+        """Ask for a ranking of a board; version must change whenever the board does"""
+        self.slots.write_request(version, cells, moves_left, target_score)
+        self.wake.set()
+
+    def cancel(self, version):
+        """Tell the worker to drop its current search"""
+        self.slots.write_request(version, None, 0, 0, active=False)
+
+    def poll(self, version):
+        """The ranking for a board version if the worker has published it, else None"""
+        sequence = self.slots.result_sequence()
+        if sequence != self.result_sequence:
+            result = self.slots.read_result()
+            if result is None:
+                return None
+            self.result_sequence, self.result = sequence, result
+        result_version, ranking = self.result
+        return ranking if result_version == version else None
+
+    def close(self, timeout=1.0):
+        """Stop the worker and release the shared memory"""
+        self.stop.set()
+        self.wake.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        del self.slots
+        self.memory.close()
+        self.memory.unlink()
@@ -0,0 +1,217 @@
+import random
+import time
+import pygame
+from config import *
+from board import Board
+from effects import Effects
+from engine import GameState
+from simulator import POLICIES
+
+# Detail levels, lowered while attract mode runs over its CPU budget
+DETAIL_NONE = 0  # Tiles only
+DETAIL_POPUPS = 1  # Plus score popups
+DETAIL_FULL = 2  # Plus particle explosions
+
+class AttractMode:
+    """A bot playing the real levels behind the menu, one step per frame
+
+    Moves go through the same Board and Effects code as a real game, but a
+    cascade advances one step each time the tiles come to rest instead of
+    blocking the frame, so the menu stays responsive. Time spent here is
+    measured every frame: detail drops while the average is over budget and
+    comes back once there is room. After every move the board is checked for
+    broken invariants, which makes a long-running kiosk a soak test; see
+    report().
+    """
+
+    def __init__(self, level_manager, speed=ATTRACT_SPEED, budget=ATTRACT_CPU_BUDGET, policy=ATTRACT_POLICY):
+        self.level_manager = level_manager
+        self.speed = speed
+        self.budget = budget
+        self.policy = POLICIES[policy](random.Random())
+        self.board = Board()
+        self.effects = Effects()
+        self.detail = DETAIL_FULL
+        self.frame_time = 0.0  # Moving average of seconds spent per frame
+        self.frame_spent = 0.0  # Seconds spent so far this frame
+        self.frames = 0
+        self.soak = False  # Print report() every ATTRACT_REPORT_INTERVAL seconds
+        self.last_report = time.monotonic()
+        self.overlay = None
+
+        # Soak test counters
+        self.games = 0
+        self.moves = 0
+        self.cascades = 0
+        self.errors = 0
+        self.slowest_frame = 0.0
+
+        self.level = 0
+        self.start_game()
+
+    def start_game(self):
+        """Set up the next level, wrapping around after the last one"""
+        self.level = self.level % max(1, self.level_manager.get_level_count()) + 1
+        level_data = self.level_manager.load_level(self.level) or {}
+        self.moves_left = level_data.get('moves', 20)
+        self.target_score = level_data.get('target_score', 3000)
+        self.score = 0
+        self.combo_multiplier = 1
+        self.cascading = False
+        self.board.initialize(self.level_manager.get_compiled_level(self.level))
+        self.next_move_ticks = pygame.time.get_ticks() + ATTRACT_MOVE_DELAY // self.speed
+        self.effects.clear_all()
+        self.games += 1
+
+    def update(self):
+        """Advance the animation by speed steps and take the next game step once tiles are at rest"""
+        started = time.perf_counter()
+        for _ in range(self.speed if self.detail > DETAIL_NONE else 1):
+            self.board.update()
+        if self.detail > DETAIL_NONE:
+            self.effects.update()
+
+        if not self.board.animation_in_progress:
+            if self.cascading:
+                self.step_cascade()
+            elif pygame.time.get_ticks() >= self.next_move_ticks:
+                self.play_move()
+        self.frame_spent += time.perf_counter() - started
+
+    def play_move(self):
+        """Let the bot pick a move on a headless copy of the board and start playing it"""
+        if self.score >= self.target_score or self.moves_left <= 0:
+            self.start_game()
+            return
+
+        state = GameState(self.board.get_cells(), self.target_score, self.moves_left)
+        moves = self.board.get_possible_moves()
+        if not moves:
+            self.board.shuffle_board()
+            self.cascading = True  # A shuffle can line up matches
+            return
+
+        pos1, pos2 = self.policy.choose(state, moves)
+        self.moves_left -= 1
+        self.moves += 1
+        self.combo_multiplier = 1
+        for x, y in (pos1, pos2):
+            tile = self.board.get_tile_at(x, y)
+            if tile and tile.is_special_tile():
+                affected = self.board.activate_special_tile(x, y)
+                if affected:
+                    self.clear_special(affected)
+                    return
+        self.board.swap_tiles(pos1, pos2)
+        if not self.board.check_matches()[0]:
+            self.board.swap_tiles(pos1, pos2)  # As in Game.try_swap, a swap that matches nothing is undone
+        self.cascading = True
+
+    def clear_special(self, affected):
+        """Remove the tiles a special tile hits and let the board refill"""
+        removed = 0
+        for x, y in affected:
+            tile = self.board.get_tile_at(x, y)
+            if tile:
+                self.board.tiles.remove(tile)
+                self.board.grid[y][x] = None
+                removed += 1
+        self.add_points(removed * SPECIAL_POINTS * self.combo_multiplier)
+        self.board.apply_gravity()
+        self.board.fill_empty_spaces()
+        self.cascading = True
+
+    def step_cascade(self):
+        """One round of Game.process_matches: clear matches, drop, refill and place specials"""
+        matches, match_groups = self.board.check_matches()
+        if not matches:
+            self.cascading = False
+            self.check_board()
+            self.next_move_ticks = pygame.time.get_ticks() + ATTRACT_MOVE_DELAY // self.speed
+            return
+
+        self.cascades += 1
+        special_tiles = self.board.create_special_tiles(match_groups)
+        removed = self.board.remove_matches(matches)
+        self.add_points(removed * MATCH_POINTS * self.combo_multiplier)
+        if self.detail >= DETAIL_FULL:
+            for x, y in matches:
+                self.effects.add_particle_explosion(self.cell_center(x, y), YELLOW, 8)
+        self.combo_multiplier += 1
+
+        self.board.apply_gravity()
+        self.board.fill_empty_spaces()
+        for x, y, special_tile in special_tiles:
+            self.board.place_special_tile(x, y, special_tile)
+
+    def add_points(self, points):
+        """Score points and show them when detail allows"""
+        self.score += points
+        if points and self.detail >= DETAIL_POPUPS:
+            self.effects.add_score_popup(self.cell_center(BOARD_WIDTH / 2, BOARD_HEIGHT / 2), points)
+
+    def cell_center(self, x, y):
+        """Screen position of the middle of a board cell"""
+        return (int(BOARD_OFFSET_X + x * TILE_SIZE + TILE_SIZE // 2),
+                int(BOARD_OFFSET_Y + y * TILE_SIZE + TILE_SIZE // 2))
+
+    def check_board(self):
+        """Soak check once the board has settled: grid, sprites and obstacles must agree and no match is left"""
+        problems = []
+        tile_count = 0
+        for y, row in enumerate(self.board.grid):
+            for x, tile in enumerate(row):
+                if (x, y) in self.board.obstacles:
+                    if tile is not None:
+                        problems.append(f"tile on obstacle ({x}, {y})")
+                elif tile is None:
+                    problems.append(f"hole at ({x}, {y})")
+                else:
+                    tile_count += 1
+                    if (tile.grid_x, tile.grid_y) != (x, y):
+                        problems.append(f"tile at ({x}, {y}) thinks it is at ({tile.grid_x}, {tile.grid_y})")
+        if len(self.board.tiles) != tile_count:
+            problems.append(f"{len(self.board.tiles)} sprites for {tile_count} tiles")
+        if self.board.check_matches()[0]:
+            problems.append("match left after cascades")
+
+        if problems:
+            self.errors += 1
+            print(f"Attract mode soak check failed on level {self.level}: {'; '.join(problems)}")
+            self.start_game()
+
+    def track_time(self, elapsed):
+        """Fold a frame's cost, update and draw, into the average and move the detail level to fit the budget"""
+        self.frame_time += (elapsed - self.frame_time) * 0.1
+        self.slowest_frame = max(self.slowest_frame, elapsed)
+        self.frames += 1
+        if self.frames % ATTRACT_ADJUST_FRAMES == 0:
+            if self.frame_time > self.budget and self.detail > DETAIL_NONE:
+                self.detail -= 1
+                if self.detail < DETAIL_FULL:
+                    self.effects.clear_all()
+            elif self.frame_time < self.budget / 2 and self.detail < DETAIL_FULL:
+                self.detail += 1
+
+        if self.soak and time.monotonic() - self.last_report >= ATTRACT_REPORT_INTERVAL:
+            self.last_report = time.monotonic()
+            print(self.report())
+
+    def report(self):
+        """One line of soak test statistics"""
+        return (f"[attract] games {self.games}  moves {self.moves}  cascades {self.cascades}  "
+                f"errors {self.errors}  frame {self.frame_time * 1000:.2f} ms avg, "
+                f"{self.slowest_frame * 1000:.2f} ms worst  detail {self.detail}")
+
+    def draw(self, screen):
+        """Draw the game dimmed so the menu on top stays readable"""
+        started = time.perf_counter()
+        self.board.draw(screen)
+        if self.detail > DETAIL_NONE:
+            self.effects.draw(screen)
+        if self.overlay is None:
+            self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 150))
+        screen.blit(self.overlay, (0, 0))
+        self.track_time(self.frame_spent + time.perf_counter() - started)
+        self.frame_spent = 0.0
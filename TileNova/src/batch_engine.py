@@ -0,0 +1,281 @@
+import numpy
+from config import *
+from board_generator import generate_boards
+from engine import playable_shuffle
+from rng import GameRandom
+
+# Boards are int8, so the byte codes for empty and blocked cells get negative stand-ins
+BATCH_EMPTY = -1
+BATCH_OBSTACLE = -2
+
+def candidate_moves(width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Every adjacent swap as rows of (x1, y1, x2, y2), right swaps then down swaps"""
+    moves = [(x, y, x + 1, y) for y in range(height) for x in range(width - 1)]
+    moves += [(x, y, x, y + 1) for y in range(height - 1) for x in range(width)]
+    return numpy.array(moves, dtype=numpy.intp)
+
+def to_batch_cells(cells, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+    """Convert get_cells() bytes to one int8 (H, W) board"""
+    board = numpy.frombuffer(bytes(cells), dtype=numpy.uint8).astype(numpy.int16).reshape(height, width)
+    board[board == CELL_EMPTY] = BATCH_EMPTY
+    board[board == CELL_OBSTACLE] = BATCH_OBSTACLE
+    return board.astype(numpy.int8)
+
+def from_batch_cells(board):
+    """Convert one int8 (H, W) board back to get_cells() bytes"""
+    cells = board.astype(numpy.uint8)
+    cells[board == BATCH_EMPTY] = CELL_EMPTY
+    cells[board == BATCH_OBSTACLE] = CELL_OBSTACLE
+    return cells.tobytes()
+
+def run_lengths(boards, matchable):
+    """Length of the run each cell belongs to along the last axis, and where each run starts"""
+    same = numpy.zeros(boards.shape, dtype=bool)
+    same[..., 1:] = (boards[..., 1:] == boards[..., :-1]) & matchable[..., 1:] & matchable[..., :-1]
+    forward = numpy.ones(boards.shape, dtype=numpy.int8)
+    backward = numpy.ones(boards.shape, dtype=numpy.int8)
+    length = boards.shape[-1]
+    for i in range(1, length):
+        forward[..., i] = numpy.where(same[..., i], forward[..., i - 1] + 1, 1)
+    for i in range(length - 2, -1, -1):
+        backward[..., i] = numpy.where(same[..., i + 1], backward[..., i + 1] + 1, 1)
+    return forward + backward - 1, ~same
+
+def has_any_match(boards):
+    """True for each board (over the leading axes) that has a run of three anywhere"""
+    matchable = (boards >= 0) & (boards < SPECIAL_TILE_ROCKET)
+    triple_h = ((boards[..., :, :-2] == boards[..., :, 1:-1]) & (boards[..., :, 1:-1] == boards[..., :, 2:]) &
+                matchable[..., :, :-2])
+    triple_v = ((boards[..., :-2, :] == boards[..., 1:-1, :]) & (boards[..., 1:-1, :] == boards[..., 2:, :]) &
+                matchable[..., :-2, :])
+    return triple_h.any(axis=(-2, -1)) | triple_v.any(axis=(-2, -1))
+
+class BatchEngine:
+    """B games held as one (B, H, W) int8 array and advanced together
+
+    Follows the same rules as engine.GameState and Game: special tiles
+    activate when swapped, each cascade scores MATCH_POINTS per cleared tile
+    times the combo multiplier, runs of 4 and 5+ leave a rocket or lightning
+    tile at their center, tiles fall within obstacle-free column segments,
+    and refills are random. Every operation works on all boards at once.
+    """
+
+    def __init__(self, batch_size, cells=None, target_score=3000, moves=20, seed=None,
+                 width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.batch_size = batch_size
+        self.width = width
+        self.height = height
+        self.target_score = target_score
+        self.moves = moves
+        self.rng = numpy.random.default_rng(seed)
+        self.shuffle_rng = GameRandom(int(self.rng.integers(0, 2 ** 63)))  # For playable_shuffle, one board at a time
+        self.candidates = candidate_moves(width, height)
+        self.grid_y, self.grid_x = numpy.indices((height, width))
+        self.batch_index = numpy.arange(batch_size)
+        self.reset(cells)
+
+    def reset(self, cells=None):
+        """Start every game again, from a level's cells or from random boards"""
+        if cells is not None:
+            self.boards = numpy.repeat(to_batch_cells(cells, self.width, self.height)[None], self.batch_size, axis=0)
+        else:
+            self.boards = generate_boards(self.batch_size, self.width, self.height, seed=self.rng)
+        obstacles = self.boards == BATCH_OBSTACLE
+
+        # Gravity sorts each column on this key: segments stay in order, empties rise within a segment
+        blocked_above = numpy.cumsum(obstacles, axis=1)
+        self.segment_ids = numpy.where(obstacles, 2 * blocked_above - 1, 2 * blocked_above).astype(numpy.int16)
+
+        self.score = numpy.zeros(self.batch_size, dtype=numpy.int64)
+        self.moves_left = numpy.full(self.batch_size, self.moves, dtype=numpy.int32)
+        self.moves_made = numpy.zeros(self.batch_size, dtype=numpy.int32)
+        self.combo = numpy.ones(self.batch_size, dtype=numpy.int64)
+
+    def done(self):
+        """Boards whose level is over, won or lost"""
+        return (self.score >= self.target_score) | (self.moves_left <= 0)
+
+    def won(self):
+        """Boards that reached the target score"""
+        return self.score >= self.target_score
+
+    def valid_move_mask(self):
+        """(B, M) flags for which of self.candidates are legal on each board"""
+        x1, y1, x2, y2 = self.candidates.T
+        first = self.boards[:, y1, x1]
+        second = self.boards[:, y2, x2]
+        swappable = (first >= 0) & (second >= 0)
+        special = swappable & ((first >= SPECIAL_TILE_ROCKET) | (second >= SPECIAL_TILE_ROCKET))
+
+        # Try every candidate on a copy of every board: (B, M, H, W)
+        trial = numpy.repeat(self.boards[:, None], len(self.candidates), axis=1)
+        moves = numpy.arange(len(self.candidates))
+        trial[:, moves, y1, x1] = second
+        trial[:, moves, y2, x2] = first
+        return special | (swappable & (first != second) & has_any_match(trial))
+
+    def random_moves(self):
+        """A uniformly random legal move index per board, or -1 if it has none"""
+        mask = self.valid_move_mask()
+        keys = numpy.where(mask, self.rng.random(mask.shape), -1.0)
+        choice = keys.argmax(axis=1)
+        return numpy.where(mask.any(axis=1), choice, -1)
+
+    def new_stats(self):
+        """Per-board counters for one move"""
+        zeros = lambda: numpy.zeros(self.batch_size, dtype=numpy.int64)
+        return {'score_delta': zeros(), 'cascade_depth': zeros(), 'specials_created': zeros(),
+                'specials_triggered': zeros(), 'cleared': zeros(), 'played': numpy.zeros(self.batch_size, dtype=bool)}
+
+    def play(self, move_index):
+        """Make one move on every board (-1 skips a board) and resolve all cascades"""
+        stats = self.new_stats()
+        active = (move_index >= 0) & ~self.done()
+        played, activated = self.swap(numpy.where(active, move_index, 0), active, stats)
+        self.moves_left -= played
+        self.moves_made += played
+        stats['played'] = played
+
+        # Game cascades a special's clear before it resets the combo, so only swaps start from 1
+        self.combo[played & ~activated] = 1
+        while self.step(stats).any():
+            pass
+        self.combo[activated] = 1
+        return stats
+
+    def swap(self, move_index, active, stats):
+        """Swap or activate a special for each active board
+
+        Returns the boards whose move counted and, of those, the ones that activated a special.
+        """
+        x1, y1, x2, y2 = self.candidates[move_index].T
+        b = self.batch_index
+        activated_any = numpy.zeros(self.batch_size, dtype=bool)
+
+        # As in Game.try_swap, a special tile activates instead of swapping, the first tile checked first
+        for x, y in ((x1, y1), (x2, y2)):
+            cell = self.boards[b, y, x]
+            candidate = active & ~activated_any & (cell >= SPECIAL_TILE_ROCKET)
+            affected = self.special_area(cell, x, y) & candidate[:, None, None]
+            activated = affected.any(axis=(1, 2))
+            if activated.any():
+                activated_any |= activated
+                stats['specials_triggered'] += activated
+                self.clear(affected & (self.boards >= 0), SPECIAL_POINTS, stats)
+                self.settle()
+
+        normal = active & ~activated_any
+        first = self.boards[b, y1, x1]
+        second = self.boards[b, y2, x2]
+        normal &= (first >= 0) & (second >= 0)
+        self.boards[b[normal], y1[normal], x1[normal]] = second[normal]
+        self.boards[b[normal], y2[normal], x2[normal]] = first[normal]
+        undo = normal & ~has_any_match(self.boards)
+        self.boards[b[undo], y1[undo], x1[undo]] = first[undo]
+        self.boards[b[undo], y2[undo], x2[undo]] = second[undo]
+        return activated_any | (normal & ~undo), activated_any
+
+    def special_area(self, cell, x, y):
+        """(B, H, W) cells each board's special tile at (x, y) would clear"""
+        gx, gy = self.grid_x[None], self.grid_y[None]
+        x, y, cell = x[:, None, None], y[:, None, None], cell[:, None, None]
+        rocket = (cell == SPECIAL_TILE_ROCKET) & ((gy == y) | (gx == x))
+        bomb = (cell == SPECIAL_TILE_BOMB) & (numpy.abs(gy - y) <= 1) & (numpy.abs(gx - x) <= 1)
+        target_color = self.rng.integers(0, len(FRUIT_IMAGES), size=self.batch_size)[:, None, None]
+        lightning = (cell == SPECIAL_TILE_LIGHTNING) & (self.boards == target_color)
+        return rocket | bomb | lightning
+
+    def clear(self, cleared, points_per_tile, stats):
+        """Empty the given cells and score them with each board's combo multiplier"""
+        counts = cleared.sum(axis=(1, 2))
+        points = counts * points_per_tile * self.combo
+        self.score += points
+        stats['score_delta'] += points
+        stats['cleared'] += counts
+        self.boards[cleared] = BATCH_EMPTY
+
+    def step(self, stats):
+        """Advance every board one cascade: match, score, drop, refill, place specials
+
+        Returns the boards that had a match, i.e. that may need another step.
+        """
+        boards = self.boards
+        matchable = (boards >= 0) & (boards < SPECIAL_TILE_ROCKET)
+        run_h, start_h = run_lengths(boards, matchable)
+        run_v, start_v = run_lengths(boards.transpose(0, 2, 1), matchable.transpose(0, 2, 1))
+        run_v, start_v = run_v.transpose(0, 2, 1), start_v.transpose(0, 2, 1)
+        matched = matchable & ((run_h >= 3) | (run_v >= 3))
+        active = matched.any(axis=(1, 2))
+        if not active.any():
+            return active
+
+        # Specials land on the center of runs of 4 and 5+, vertical runs placed after horizontal ones
+        specials = numpy.full(boards.shape, BATCH_EMPTY, dtype=numpy.int8)
+        for run, start, horizontal in ((run_h, start_h, True), (run_v, start_v, False)):
+            for size_test, special_type in ((run == 4, SPECIAL_TILE_ROCKET), (run >= 5, SPECIAL_TILE_LIGHTNING)):
+                b, y, x = numpy.nonzero(start & matchable & size_test)
+                offset = run[b, y, x] // 2
+                if horizontal:
+                    specials[b, y, x + offset] = special_type
+                else:
+                    specials[b, y + offset, x] = special_type
+        created = (specials != BATCH_EMPTY).sum(axis=(1, 2))
+
+        stats['cascade_depth'] += active
+        stats['specials_created'] += created
+        self.clear(matched, MATCH_POINTS, stats)
+        self.combo += active
+        self.settle()
+        placed = specials != BATCH_EMPTY
+        self.boards[placed] = specials[placed]
+        return active
+
+    def settle(self):
+        """Gravity then refill on every board"""
+        key = self.segment_ids * 2 + (self.boards != BATCH_EMPTY)
+        order = numpy.argsort(key, axis=1, kind='stable')
+        self.boards = numpy.take_along_axis(self.boards, order, axis=1)
+        empty = self.boards == BATCH_EMPTY
+        self.boards[empty] = self.rng.integers(0, len(FRUIT_IMAGES), size=int(empty.sum()), dtype=numpy.int8)
+
+    def shuffle(self, which):
+        """Rearrange the selected boards into boards with a move and no match, as Board.shuffle_board does
+
+        Stuck boards are rare, so each goes through engine.playable_shuffle on
+        its own rather than in a batch. The combo starts over, as the next
+        cascade on a shuffled board can only come from a fresh swap.
+        """
+        for i in numpy.flatnonzero(which):
+            cells = playable_shuffle(from_batch_cells(self.boards[i]), self.width, self.height, self.shuffle_rng)
+            self.boards[i] = to_batch_cells(cells, self.width, self.height)
+        self.combo[which] = 1
+
+def run_random_games(engine, shuffle_limit=SIMULATION_SHUFFLE_LIMIT):
+    """Play every board in the batch to the end with random moves
+
+    Returns per-board results in the simulator's format plus the number of
+    moves simulated.
+    """
+    cascades = [[] for _ in range(engine.batch_size)]
+    specials = numpy.zeros(engine.batch_size, dtype=numpy.int64)
+    stuck = numpy.zeros(engine.batch_size, dtype=numpy.int32)
+    total_moves = 0
+    while True:
+        playing = ~engine.done() & (stuck < shuffle_limit)
+        if not playing.any():
+            break
+        moves = engine.random_moves()
+        no_moves = playing & (moves < 0)
+        stuck = numpy.where(no_moves, stuck + 1, 0)
+        if no_moves.any():
+            engine.shuffle(no_moves)
+        stats = engine.play(numpy.where(playing, moves, -1))
+        specials += stats['specials_created']
+        total_moves += int(stats['played'].sum())
+        for i in numpy.nonzero(stats['played'])[0]:
+            cascades[i].append(int(stats['cascade_depth'][i]))
+
+    won = engine.won()
+    results = [{'won': bool(won[i]), 'score': int(engine.score[i]), 'moves_used': int(engine.moves_made[i]),
+                'cascades': cascades[i], 'specials_created': int(specials[i])} for i in range(engine.batch_size)]
+    return results, total_moves
@@ -1,52 +1,79 @@
+import itertools
+import numpy
 import pygame
-import random
 from config import *
+from rng import GameRandom
+from board_generator import generate_boards
 from tile import Tile, TileGroup
+from engine import column_segments, find_match_groups, find_valid_moves, is_valid_swap, playable_shuffle
 
 class Board:
+    versions = itertools.count()  # Shared so no two boards, even preloaded ones, ever report the same version
+    
     def __init__(self):
         self.tiles = TileGroup()
         self.grid = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+        self.obstacles = set()  # (x, y) cells that never hold a tile
+        self.segments = self.full_columns()  # (x, top, bottom) runs that gravity and refill work within
+        self.possible_moves = None  # Cached get_possible_moves() result, cleared whenever tiles change
+        self.version = next(Board.versions)  # Changes whenever tiles change; caches of board analysis key on it
+        self.rng = GameRandom()  # Game logic randomness; initialize() starts a new stream per game
         self.selected_tile = None
         self.matches_found = []
         self.combo_count = 0
         self.animation_in_progress = False
         
-    def initialize(self):
-        """Initialize the board with random tiles"""
+    def initialize(self, compiled=None, seed=None):
+        """Initialize the board from a level's CompiledLevel, or with random tiles if it has none
+
+        Everything random in the game that follows, from the starting tiles
+        to refills, shuffles and lightning, comes from one stream seeded
+        here; pass the seed of an earlier game to replay it.
+        """
+        self.rng = GameRandom(seed)
+        if compiled is not None:
+            # Already validated by the level compiler, so this is a straight copy
+            self.load_cells(compiled.cells)
+            self.possible_moves = list(compiled.moves)
+            return
+        
+        # No runs to start with and at least BOARD_MIN_MOVES moves, drawn from this game's stream
+        board = generate_boards(1, seed=self.rng.generator)[0]
+        self.load_cells(board.astype(numpy.uint8).tobytes())
+    
+    def get_cells(self):
+        """The board as one byte per cell, row by row: tile type, CELL_EMPTY or CELL_OBSTACLE"""
+        return bytes(CELL_OBSTACLE if (x, y) in self.obstacles else tile.tile_type if tile else CELL_EMPTY
+                     for y, row in enumerate(self.grid) for x, tile in enumerate(row))
+    
+    def load_cells(self, cells):
+        """Rebuild the board from get_cells() output without generating anything"""
         self.tiles.empty()
         self.grid = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
+        self.obstacles = set()
+        self.changed()
+        self.selected_tile = None
         
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                # Generate tile type ensuring no initial matches
-                tile_type = self.generate_safe_tile_type(x, y)
-                tile = Tile(x, y, tile_type)
+        for index, cell in enumerate(cells):
+            y, x = divmod(index, BOARD_WIDTH)
+            if cell == CELL_OBSTACLE:
+                self.obstacles.add((x, y))
+            elif cell != CELL_EMPTY:
+                tile = Tile(x, y, cell)
                 self.tiles.add(tile)
                 self.grid[y][x] = tile
-    
-    def generate_safe_tile_type(self, x, y):
-        """Generate a tile type that won't create initial matches"""
-        forbidden_types = set()
-        
-        # Check horizontal matches
-        if x >= 2:
-            if (self.grid[y][x-1] and self.grid[y][x-2] and 
-                self.grid[y][x-1].tile_type == self.grid[y][x-2].tile_type):
-                forbidden_types.add(self.grid[y][x-1].tile_type)
         
-        # Check vertical matches
-        if y >= 2:
-            if (self.grid[y-1][x] and self.grid[y-2][x] and 
-                self.grid[y-1][x].tile_type == self.grid[y-2][x].tile_type):
-                forbidden_types.add(self.grid[y-1][x].tile_type)
-        
-        # Generate a safe tile type
-        available_types = [i for i in range(len(FRUIT_IMAGES)) if i not in forbidden_types]
-        if not available_types:
-            available_types = list(range(len(FRUIT_IMAGES)))
-        
-        return random.choice(available_types)
+        # Obstacles only change when a level is loaded, so the segments are worked out once here
+        self.segments = column_segments(cells, BOARD_WIDTH, BOARD_HEIGHT) if self.obstacles else self.full_columns()
+    
+    def changed(self):
+        """Invalidate everything derived from the tiles"""
+        self.possible_moves = None
+        self.version = next(Board.versions)
+    
+    def full_columns(self):
+        """Segments for a board without obstacles: every column top to bottom"""
+        return [(x, 0, BOARD_HEIGHT) for x in range(BOARD_WIDTH)]
     
     def get_tile_at(self, x, y):
         """Get tile at grid position"""
@@ -63,6 +90,8 @@ class Board:
         tile2 = self.get_tile_at(x2, y2)
         
         if tile1 and tile2:
+            self.changed()
+            
             # Swap in grid
             self.grid[y1][x1] = tile2
             self.grid[y2][x2] = tile1
@@ -76,97 +105,10 @@ class Board:
     
     def check_matches(self):
         """Check for matches on the board and return match info"""
+        match_groups = find_match_groups(self.get_cells(), BOARD_WIDTH, BOARD_HEIGHT)
         matches = set()
-        match_groups = []  # Store groups with their lengths for special tile creation
-        
-        # Check horizontal matches
-        for y in range(BOARD_HEIGHT):
-            count = 1
-            current_type = None
-            start_x = 0
-            
-            for x in range(BOARD_WIDTH):
-                tile = self.get_tile_at(x, y)
-                tile_type = tile.tile_type if tile and not tile.is_special_tile() else None
-                
-                if tile and tile_type == current_type and current_type is not None:
-                    count += 1
-                else:
-                    if count >= 3 and current_type is not None:
-                        group_matches = [(i, y) for i in range(start_x, x)]
-                        matches.update(group_matches)
-                        match_groups.append({
-                            'matches': group_matches,
-                            'count': count,
-                            'type': current_type,
-                            'direction': 'horizontal',
-                            'center': (start_x + count // 2, y)
-                        })
-                    
-                    if tile and tile_type is not None:
-                        current_type = tile_type
-                        start_x = x
-                        count = 1
-                    else:
-                        current_type = None
-                        count = 0
-            
-            # Check end of row
-            if count >= 3 and current_type is not None:
-                group_matches = [(i, y) for i in range(start_x, BOARD_WIDTH)]
-                matches.update(group_matches)
-                match_groups.append({
-                    'matches': group_matches,
-                    'count': count,
-                    'type': current_type,
-                    'direction': 'horizontal',
-                    'center': (start_x + count // 2, y)
-                })
-        
-        # Check vertical matches
-        for x in range(BOARD_WIDTH):
-            count = 1
-            current_type = None
-            start_y = 0
-            
-            for y in range(BOARD_HEIGHT):
-                tile = self.get_tile_at(x, y)
-                tile_type = tile.tile_type if tile and not tile.is_special_tile() else None
-                
-                if tile and tile_type == current_type and current_type is not None:
-                    count += 1
-                else:
-                    if count >= 3 and current_type is not None:
-                        group_matches = [(x, i) for i in range(start_y, y)]
-                        matches.update(group_matches)
-                        match_groups.append({
-                            'matches': group_matches,
-                            'count': count,
-                            'type': current_type,
-                            'direction': 'vertical',
-                            'center': (x, start_y + count // 2)
-                        })
-                    
-                    if tile and tile_type is not None:
-                        current_type = tile_type
-                        start_y = y
-                        count = 1
-                    else:
-                        current_type = None
-                        count = 0
-            
-            # Check end of column
-            if count >= 3 and current_type is not None:
-                group_matches = [(x, i) for i in range(start_y, BOARD_HEIGHT)]
-                matches.update(group_matches)
-                match_groups.append({
-                    'matches': group_matches,
-                    'count': count,
-                    'type': current_type,
-                    'direction': 'vertical',
-                    'center': (x, start_y + count // 2)
-                })
-        
+        for group in match_groups:
+            matches.update(group['matches'])
         return list(matches), match_groups
     
     def create_special_tiles(self, match_groups):
@@ -209,7 +151,7 @@ class Board:
         elif special_type == SPECIAL_TILE_LIGHTNING:
             # Clear all tiles of the same color as the tile that was swapped with it
             # For now, we'll clear all tiles of a random color
-            target_color = random.randint(0, len(FRUIT_IMAGES) - 1)
+            target_color = self.rng.randint(0, len(FRUIT_IMAGES) - 1)
             for board_y in range(BOARD_HEIGHT):
                 for board_x in range(BOARD_WIDTH):
                     board_tile = self.get_tile_at(board_x, board_y)
@@ -229,6 +171,8 @@ class Board:
     def place_special_tile(self, x, y, special_tile):
         """Place a special tile on the board"""
         if 0 <= x < BOARD_WIDTH and 0 <= y < BOARD_HEIGHT:
+            self.changed()
+            
             # Remove existing tile if any
             existing_tile = self.get_tile_at(x, y)
             if existing_tile:
@@ -241,6 +185,7 @@ class Board:
     
     def remove_matches(self, matches):
         """Remove matched tiles from the board"""
+        self.changed()
         for x, y in matches:
             tile = self.get_tile_at(x, y)
             if tile:
@@ -252,20 +197,21 @@ class Board:
         return len(matches)
     
     def apply_gravity(self):
-        """Apply gravity to make tiles fall"""
+        """Apply gravity to make tiles fall, each column segment landing on its own floor"""
+        self.changed()
         moved = False
         
-        for x in range(BOARD_WIDTH):
-            # Collect non-None tiles in this column
+        for x, top, bottom in self.segments:
+            # Collect non-None tiles in this segment
             column_tiles = []
-            for y in range(BOARD_HEIGHT):
+            for y in range(top, bottom):
                 if self.grid[y][x] is not None:
                     column_tiles.append(self.grid[y][x])
                     self.grid[y][x] = None
             
-            # Place tiles at the bottom
+            # Place tiles at the bottom of the segment
             for i, tile in enumerate(column_tiles):
-                new_y = BOARD_HEIGHT - len(column_tiles) + i
+                new_y = bottom - len(column_tiles) + i
                 if new_y != tile.grid_y:
                     moved = True
                     tile.set_position(x, new_y)
@@ -276,15 +222,21 @@ class Board:
     
     def fill_empty_spaces(self):
         """Fill empty spaces with new tiles"""
+        self.changed()
         new_tiles = []
         
-        for x in range(BOARD_WIDTH):
-            for y in range(BOARD_HEIGHT):
+        for x, top, bottom in self.segments:
+            empty_count = sum(1 for y in range(top, bottom) if self.grid[y][x] is None)
+            for y in range(top, bottom):
                 if self.grid[y][x] is None:
-                    tile_type = Tile.generate_random_type()
+                    tile_type = self.rng.tile_type()
                     tile = Tile(x, y, tile_type)
-                    # Start tiles above the board
-                    tile.y = -TILE_SIZE * (BOARD_HEIGHT - y)
+                    if top == 0:
+                        # Start tiles above the board
+                        tile.y = -TILE_SIZE * (BOARD_HEIGHT - y)
+                    else:
+                        # Below an obstacle, drop in from behind it
+                        tile.y = BOARD_OFFSET_Y + (y - empty_count) * TILE_SIZE
                     tile.rect.y = tile.y
                     tile.start_falling()
                     
@@ -303,54 +255,34 @@ class Board:
         if abs(x1 - x2) + abs(y1 - y2) != 1:
             return False
         
-        # Temporarily swap tiles
-        if self.swap_tiles(pos1, pos2):
-            matches = self.check_matches()
-            # Swap back
-            self.swap_tiles(pos1, pos2)
-            return len(matches) > 0
-        
-        return False
+        return is_valid_swap(bytearray(self.get_cells()), BOARD_WIDTH, BOARD_HEIGHT, pos1, pos2)
     
     def get_possible_moves(self):
         """Get all possible moves on the board"""
-        possible_moves = []
-        
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                # Check right
-                if x < BOARD_WIDTH - 1:
-                    if self.is_valid_move((x, y), (x + 1, y)):
-                        possible_moves.append(((x, y), (x + 1, y)))
-                
-                # Check down
-                if y < BOARD_HEIGHT - 1:
-                    if self.is_valid_move((x, y), (x, y + 1)):
-                        possible_moves.append(((x, y), (x, y + 1)))
-        
-        return possible_moves
+        if self.possible_moves is None:
+            self.possible_moves = find_valid_moves(self.get_cells(), BOARD_WIDTH, BOARD_HEIGHT)
+        return list(self.possible_moves)
     
     def has_possible_moves(self):
         """Check if there are any possible moves"""
         return len(self.get_possible_moves()) > 0
     
     def shuffle_board(self):
-        """Shuffle the board when no moves are available"""
-        tile_types = []
-        for y in range(BOARD_HEIGHT):
-            for x in range(BOARD_WIDTH):
-                if self.grid[y][x]:
-                    tile_types.append(self.grid[y][x].tile_type)
+        """Shuffle the board when no moves are available, into one with a move and no matches
         
-        random.shuffle(tile_types)
+        Only tile types move; every sprite stays where it is and is redrawn
+        with its new fruit.
+        """
+        cells = playable_shuffle(self.get_cells(), BOARD_WIDTH, BOARD_HEIGHT, self.rng)
+        self.changed()
         
-        index = 0
         for y in range(BOARD_HEIGHT):
             for x in range(BOARD_WIDTH):
-                if self.grid[y][x] and index < len(tile_types):
-                    self.grid[y][x].tile_type = tile_types[index]
-                    self.grid[y][x].update_appearance()
-                    index += 1
+                tile = self.grid[y][x]
+                if tile and tile.tile_type != cells[y * BOARD_WIDTH + x]:
+                    tile.tile_type = cells[y * BOARD_WIDTH + x]
+                    tile.fruit_image = tile.load_fruit_image()
+                    tile.update_appearance()
     
     def update(self):
         """Update the board state"""
@@ -382,8 +314,17 @@ class Board:
             end_pos = (BOARD_OFFSET_X + BOARD_WIDTH * TILE_SIZE, BOARD_OFFSET_Y + y * TILE_SIZE)
             pygame.draw.line(screen, GRAY, start_pos, end_pos, 1)
         
-        # Draw tiles
+        # Draw tiles, then obstacles over them so refills appear from behind
         self.tiles.draw(screen)
+        for x, y in self.obstacles:
+            obstacle_rect = pygame.Rect(
+                BOARD_OFFSET_X + x * TILE_SIZE,
+                BOARD_OFFSET_Y + y * TILE_SIZE,
+                TILE_SIZE,
+                TILE_SIZE
+            ).inflate(-4, -4)
+            pygame.draw.rect(screen, GRAY, obstacle_rect, border_radius=8)
+            pygame.draw.rect(screen, DARK_GRAY, obstacle_rect, 3, border_radius=8)
         
         # Highlight selected tile
         if self.selected_tile:
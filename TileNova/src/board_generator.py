@@ -0,0 +1,160 @@
+import numpy
+from config import *
+
+# Boards are built a row at a time across the whole batch. A row is drawn
+# at once, then the cells in a run of three are redrawn in three passes,
+# one for each column modulo 3: cells three apart never share a run, so a
+# pass can redraw all of its cells together, each avoiding every fruit that
+# would complete a run with the cells around it. Every run has a cell in
+# each pass, so three passes always suffice.
+
+def sample_excluding(rng, excluded, type_count):
+    """Uniform fruit per cell, skipping the values in the last axis of excluded (-1 for none)"""
+    values = numpy.sort(numpy.where(excluded < 0, type_count, excluded), axis=-1)
+    repeated = numpy.zeros(values.shape, dtype=bool)
+    repeated[..., 1:] = values[..., 1:] == values[..., :-1]
+    values = numpy.sort(numpy.where(repeated, type_count, values), axis=-1)
+    choice = rng.integers(0, type_count - (values < type_count).sum(axis=-1))
+    for i in range(values.shape[-1]):
+        choice = choice + (choice >= values[..., i])  # Step over each excluded value, lowest first
+    return choice.astype(numpy.int8)
+
+def pair_value(first, second):
+    """The fruit where two cells hold the same one, else -1"""
+    return numpy.where(first == second, first, -1)
+
+def in_runs(rows):
+    """(N, W) flags for cells that are part of a horizontal run of three or more"""
+    triple = (rows[:, :-2] == rows[:, 1:-1]) & (rows[:, 1:-1] == rows[:, 2:])
+    flags = numpy.zeros(rows.shape, dtype=bool)
+    flags[:, :-2] |= triple
+    flags[:, 1:-1] |= triple
+    flags[:, 2:] |= triple
+    return flags
+
+def fill_rows(rng, count, width, height, fixed=None, type_count=len(FRUIT_IMAGES)):
+    """count boards of random fruit without a run of three, keeping any fixed cells (-1 where free)"""
+    boards = numpy.empty((count, height, width), dtype=numpy.int8)
+    none = numpy.full((count, width), -1, dtype=numpy.int8)
+    phase = numpy.arange(width) % 3
+    for y in range(height):
+        # Avoid what the two rows above share, and a fixed cell below that would line up with the row
+        # above or with the fixed cell under it, since fixed cells are never redrawn
+        above = pair_value(boards[:, y - 1], boards[:, y - 2]) if y >= 2 else none
+        below = none
+        if fixed is not None and y < height - 1:
+            lines_up = numpy.zeros((count, width), dtype=bool)
+            if y >= 1:
+                lines_up |= boards[:, y - 1] == fixed[:, y + 1]
+            if y < height - 2:
+                lines_up |= fixed[:, y + 2] == fixed[:, y + 1]
+            below = numpy.where((fixed[:, y + 1] >= 0) & lines_up, fixed[:, y + 1], -1)
+        free = numpy.ones((count, width), dtype=bool) if fixed is None else fixed[:, y] < 0
+
+        # Most cells are unconstrained, so draw the whole row and redraw only those that landed on an
+        # excluded fruit; either way each cell ends up uniform over the fruit it may hold
+        row = rng.integers(0, type_count, (count, width), dtype=numpy.int8)
+        if fixed is not None:
+            row = numpy.where(free, row, fixed[:, y])
+        cells = numpy.nonzero(free & ((row == above) | (row == below)))
+        if len(cells[0]):
+            row[cells] = sample_excluding(rng, numpy.stack([above[cells], below[cells]], axis=-1), type_count)
+
+        for step in range(3):
+            cells = numpy.nonzero(in_runs(row) & free & (phase == step))
+            if not len(cells[0]):
+                continue
+            boards_at, x = cells[0], cells[1] + 2
+            padded = numpy.pad(row, ((0, 0), (2, 2)), constant_values=-1)
+            left = pair_value(padded[boards_at, x - 1], padded[boards_at, x - 2])
+            right = pair_value(padded[boards_at, x + 1], padded[boards_at, x + 2])
+            middle = pair_value(padded[boards_at, x - 1], padded[boards_at, x + 1])
+            excluded = numpy.stack([above[cells], below[cells], left, right, middle], axis=-1)
+            row[cells] = sample_excluding(rng, excluded, type_count)
+        boards[:, y] = row
+    return boards
+
+def right_swap_moves(boards):
+    """(N, H, W - 1) flags for which swaps of a cell with its right neighbour make a run
+
+    Only valid for boards of fruit with no run already on them, where a
+    swap is a move exactly when either tile lines up where it lands.
+    """
+    count, height, width = boards.shape
+    padded = numpy.pad(boards, ((0, 0), (3, 3), (3, 3)), constant_values=-1)
+
+    def cell(dy, dx):
+        return padded[:, 3 + dy:3 + dy + height, 3 + dx:3 + dx + width - 1]
+
+    first, second = cell(0, 0), cell(0, 1)
+    # first moves right a column, second moves left one
+    lands_first = ((cell(0, 2) == first) & (cell(0, 3) == first) |
+                   (cell(-1, 1) == first) & ((cell(-2, 1) == first) | (cell(1, 1) == first)) |
+                   (cell(1, 1) == first) & (cell(2, 1) == first))
+    lands_second = ((cell(0, -1) == second) & (cell(0, -2) == second) |
+                    (cell(-1, 0) == second) & ((cell(-2, 0) == second) | (cell(1, 0) == second)) |
+                    (cell(1, 0) == second) & (cell(2, 0) == second))
+    return (first != second) & (lands_first | lands_second)
+
+def count_moves(boards):
+    """Legal moves on each of a batch of run-free fruit boards, found by pattern instead of by trying swaps"""
+    right = right_swap_moves(boards).sum(axis=(1, 2))
+    down = right_swap_moves(boards.transpose(0, 2, 1)).sum(axis=(1, 2))
+    return right + down
+
+def max_planted_moves(width, height):
+    """How many moves plant_moves can fit on a board: one per 2x3 block, laid across or down"""
+    return max((height // 2) * (width // 3), (height // 3) * (width // 2))
+
+def plant_moves(rng, count, width, height, moves, type_count=len(FRUIT_IMAGES)):
+    """Fixed cells giving each board moves ready-made moves, one per 2x3 block picked at random
+
+    Each is two fruit side by side with a third diagonally past the end of
+    the pair; the cell beside the pair can never become that fruit, since
+    it would complete a run, so swapping the third into it always makes
+    one. Every block on a board faces the same way, so two blocks never
+    line up into a run of their own. Blocks are laid down the board, as 3x2,
+    when more fit that way; at most max_planted_moves() are planted.
+    """
+    if (height // 3) * (width // 2) > (height // 2) * (width // 3):
+        return plant_moves(rng, count, height, width, moves, type_count).transpose(0, 2, 1).copy()
+    fixed = numpy.full((count, height, width), -1, dtype=numpy.int8)
+    columns = width // 3
+    moves = min(moves, (height // 2) * columns)
+    if moves <= 0:
+        return fixed
+    blocks = numpy.argsort(rng.random((count, (height // 2) * columns)), axis=1)[:, :moves]
+    y, x = 2 * (blocks // columns), 3 * (blocks % columns)
+    fruit = rng.integers(0, type_count, blocks.shape, dtype=numpy.int8)
+    mirrored, flipped = (rng.random((2, count, 1)) < 0.5).astype(int)
+    boards = numpy.arange(count)[:, None]
+    fixed[boards, y + flipped, x + mirrored] = fruit
+    fixed[boards, y + flipped, x + 1 + mirrored] = fruit
+    fixed[boards, y + 1 - flipped, x + 2 - 2 * mirrored] = fruit
+    return fixed
+
+def generate_boards(count, width=BOARD_WIDTH, height=BOARD_HEIGHT, min_moves=BOARD_MIN_MOVES, seed=None):
+    """(count, height, width) int8 boards of random fruit with no run of three and at least min_moves moves
+
+    seed is anything numpy.random.default_rng takes, including a Generator
+    to draw from. Boards that come out short of moves are drawn once more
+    around ready-made moves, so there are never more than two passes. That
+    can only promise max_planted_moves() moves, so asking for more on a
+    small board raises ValueError.
+    """
+    type_count = len(FRUIT_IMAGES)
+    if type_count < 6:
+        raise ValueError("generating boards needs at least six fruit types")
+    if min_moves > max_planted_moves(width, height):
+        raise ValueError(f"a {width}x{height} board can only be promised {max_planted_moves(width, height)} moves")
+    rng = numpy.random.default_rng(seed)
+    boards = fill_rows(rng, count, width, height)
+    short = numpy.flatnonzero(count_moves(boards) < min_moves)
+    if len(short):
+        fixed = plant_moves(rng, len(short), width, height, min_moves)
+        boards[short] = fill_rows(rng, len(short), width, height, fixed)
+    return boards
+
+def generate_board(width=BOARD_WIDTH, height=BOARD_HEIGHT, min_moves=BOARD_MIN_MOVES, seed=None):
+    """One board in the get_cells() layout"""
+    return generate_boards(1, width, height, min_moves, seed)[0].tobytes()
@@ -1,3 +1,5 @@
+import os
+
 # Game settings
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
@@ -5,7 +7,9 @@ FPS = 60
 TILE_SIZE = 64
 BOARD_WIDTH = 8
 BOARD_HEIGHT = 8
+BOARD_MIN_MOVES = 3  # Fresh random boards start with at least this many valid moves
 ANIMATION_SPEED = 5
+TRACE_STARTUP = False  # Print per-phase startup timings (also enabled by --trace-startup)
 
 # Colors
 BLACK = (0, 0, 0)
@@ -56,10 +60,97 @@ GAME_OVER = "game_over"
 TILE_ASSETS = "assets/images/tiles/"
 AUDIO_BG = "assets/audio/bg_music.mp3"
 AUDIO_MATCH = "assets/audio/match_sfx.wav"
+SOUND_CACHE_DIR = "assets/audio/cache/"  # Synthesized sound buffers, keyed by parameters
+SOUND_CACHE_VERSION = 1  # Bump when the synthesis code changes
+
+# Level data, resolved from the game directory rather than the working directory
+GAME_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LEVELS_DIR = os.path.join(GAME_ROOT, "levels")  # Loose level_N.json sources
+LEVEL_PACK = os.path.join(GAME_ROOT, "assets", "levels.pack")  # Built from LEVELS_DIR by build_levels.py
+LEVEL_PACK_VERSION = 2
+
+# Pre-scaled tile image variants (generated by create_fruit_images.py)
+TILE_IMAGE_PADDING = 15  # Tile images are drawn TILE_SIZE - TILE_IMAGE_PADDING wide
+ASSET_TILE_SIZES = [48, 64, 80, 96]
+TILE_MANIFEST = TILE_ASSETS + "manifest.json"
+TILE_ATLAS_IMAGE = "atlas.png"  # Packed tiles, one per variant directory
+TILE_ATLAS_INDEX = "atlas.json"  # Sub-rectangle of each tile inside the atlas
+
+# Persistence settings
+PERSIST_FLUSH_INTERVAL = 0.5  # Seconds the writer thread batches updates before committing
+PERSIST_QUEUE_SIZE = 1024  # Pending updates before enqueueing applies backpressure
+
+# Profile settings
+DEFAULT_PROFILE_ID = 1  # Profile used when no player has signed in; owns progress saved before profiles existed
+DEFAULT_PROFILE_NAME = "Player"
+LEADERBOARD_PAGE_SIZE = 10
+OVERALL_BOARD_ID = 0  # leaderboard_counts key for the overall board; level ids start at 1
+LEADERBOARD_BUCKET_SIZE = 100  # Points per band in leaderboard_buckets; a rank counts single players in one band only
+
+# Balancing simulator settings (simulate_levels.py)
+SIMULATION_GAMES = 1000  # Games per level and policy
+SIMULATION_CHUNK_SIZE = 50  # Games handed to a worker process at a time
+SIMULATION_BATCH_SIZE = 1000  # Games a worker plays at once with the batch engine
+SIMULATION_SCORE_BIN = 500  # Width of the score histogram buckets
+SIMULATION_SHUFFLE_LIMIT = 20  # Shuffles tried before a board with no moves counts as a loss
+
+# Telemetry settings
+TELEMETRY_BUFFER_SIZE = 4096  # Events held in memory between flushes
+TELEMETRY_FLUSH_INTERVAL = 5.0  # Seconds between bulk inserts
+TELEMETRY_ROLLUP_INTERVAL = 300.0  # Seconds between rollups into level_summary
+TELEMETRY_RETENTION_DAYS = 7  # Raw events older than this are pruned once rolled up
 
 # Board settings
 BOARD_OFFSET_X = 100
 BOARD_OFFSET_Y = 100
+CELL_EMPTY = 255  # Cell codes used wherever a board is stored as one byte per cell
+CELL_OBSTACLE = 254
+
+# Attract mode settings (a bot playing behind the menu)
+ATTRACT_MODE = True
+ATTRACT_POLICY = "greedy"  # Bot from simulator.POLICIES
+ATTRACT_SPEED = 2  # Animation steps per frame; also shortens the pause between moves
+ATTRACT_MOVE_DELAY = 800  # Milliseconds between moves at speed 1
+ATTRACT_CPU_BUDGET = 0.004  # Seconds per frame attract mode may use before it cuts detail
+ATTRACT_ADJUST_FRAMES = 30  # Frames between detail level changes
+ATTRACT_SOAK = False  # Print soak test statistics (also enabled by --soak)
+ATTRACT_REPORT_INTERVAL = 60.0  # Seconds between soak test reports
+
+# Random number settings
+RNG_BUFFER_SIZE = 4096  # Raw values a game's GameRandom prefetches from NumPy at a time
+
+# Scoring, shared by Game and the headless engines
+MATCH_POINTS = 10  # Per tile cleared by a match, times the combo multiplier
+SPECIAL_POINTS = 20  # Per tile cleared by a special tile, times the combo multiplier
+
+# AI player settings, used by hints, autoplay and the expectimax simulator policy
+AI_TIME_BUDGET = 0.05  # Seconds per decision; the one-move search always finishes regardless
+AI_MAX_DEPTH = 3  # Moves looked ahead when the budget allows
+AI_CHANCE_SAMPLES = 3  # Refill sequences sampled for each root move
+AI_BEAM_WIDTH = 6  # Root moves searched deeper than one move
+AI_TABLE_SIZE = 100000  # Positions kept in the transposition table
+AI_SPECIAL_VALUE = 100  # Points a special tile left on the board is assumed to be worth
+AI_WIN_BONUS = 10000  # Value of a line of play that reaches the target score
+
+ANALYSIS_RESULT_MOVES = 16  # Ranked moves the analysis worker process hands back
+
+# Hint and autoplay settings
+HINT_DURATION = 4.0  # Seconds the suggested move stays highlighted
+AUTOPLAY_MOVE_DELAY = 600  # Milliseconds autoplay waits between moves
+
+# Save state settings
+SAVE_STATE_VERSION = 1  # Bump when the binary layout in save_state.py changes
+
+# Replay settings
+REPLAY_RECORDING = True  # Record every level so it can be played back exactly
+REPLAY_DIR = os.path.join(GAME_ROOT, "replays")  # Written when a level ends or the game closes mid-level
+REPLAY_FORMAT_VERSION = 3  # Bump when the binary layout in replay.py, the move rules or board generation change
+
+# Score verification settings (verify_replays.py)
+SCORE_VERIFICATION = False  # Level results are recorded only once verify_replays.py has replayed them
+VERIFY_CHUNK_SIZE = 64  # Replays handed to a worker process at a time
+VERIFY_BATCH_SIZE = 4096  # Pending submissions read from the database per round
+VERIFY_POLL_INTERVAL = 2.0  # Seconds between checks for new submissions with --watch
 
 # UI settings
 FONT_SIZE = 24
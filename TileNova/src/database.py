@@ -1,123 +1,589 @@
 import sqlite3
 import os
+import threading
 from datetime import datetime
+from config import *
 
 class Database:
     def __init__(self, db_file="game_progress.db"):
         self.db_file = db_file
+        self.lock = threading.RLock()
+        self.conn = None
+        self.settings = {}  # Typed copy of the settings table, served without touching disk
+        self.setting_listeners = {}
+        self.setting_writer = None
+        self.connect()
         self.init_database()
-    
+        self.load_settings()
+
+    def connect(self):
+        """Open the long-lived connection used by every query"""
+        try:
+            # The connection is created on a startup thread and shared with the game loop
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False, cached_statements=128)
+
+            # WAL lets reads proceed during writes; NORMAL only fsyncs at checkpoints
+            self.conn.execute('PRAGMA journal_mode = WAL')
+            self.conn.execute('PRAGMA synchronous = NORMAL')
+            self.conn.execute('PRAGMA temp_store = MEMORY')
+
+        except sqlite3.Error as e:
+            print(f"Database error opening {self.db_file}: {e}")
+            self.conn = None
+
+    def now(self):
+        """Timestamp in the format stored in the last_played/last_updated columns"""
+        return datetime.now().isoformat(" ")
+
     def init_database(self):
         """Initialize the database with required tables"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # Create levels table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS levels (
-                    level_id INTEGER PRIMARY KEY,
-                    best_score INTEGER DEFAULT 0,
-                    completed BOOLEAN DEFAULT FALSE,
-                    stars INTEGER DEFAULT 0,
-                    attempts INTEGER DEFAULT 0,
-                    last_played TIMESTAMP
-                )
-            ''')
-            
-            # Create game_stats table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS game_stats (
-                    id INTEGER PRIMARY KEY,
-                    total_score INTEGER DEFAULT 0,
-                    total_matches INTEGER DEFAULT 0,
-                    total_moves INTEGER DEFAULT 0,
-                    play_time INTEGER DEFAULT 0,
-                    games_played INTEGER DEFAULT 0,
-                    last_updated TIMESTAMP
-                )
-            ''')
-            
-            # Create settings table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT
-                )
-            ''')
-            
-            # Initialize default settings
-            default_settings = {
-                'music_volume': '0.5',
-                'sfx_volume': '0.7',
-                'music_enabled': 'True',
-                'sfx_enabled': 'True'
-            }
-            
-            for key, value in default_settings.items():
+            with self.lock, self.conn:
+                cursor = self.conn.cursor()
+
+                self.init_profile_tables(cursor)
+
+                # Create settings table
                 cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS settings (
+                        key TEXT PRIMARY KEY,
+                        value TEXT
+                    )
+                ''')
+
+                # Initialize default settings
+                default_settings = {
+                    'music_volume': '0.5',
+                    'sfx_volume': '0.7',
+                    'music_enabled': 'True',
+                    'sfx_enabled': 'True'
+                }
+
+                cursor.executemany('''
                     INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)
-                ''', (key, value))
-            
-            # Initialize game stats if not exists
-            cursor.execute('''
-                INSERT OR IGNORE INTO game_stats (id, last_updated) VALUES (1, ?)
-            ''', (datetime.now(),))
-            
-            conn.commit()
-            conn.close()
-            
-        except sqlite3.Error as e:
+                ''', default_settings.items())
+
+                # Latest SaveState blob per profile, overwritten after every move
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS save_states (
+                        profile_id INTEGER PRIMARY KEY,
+                        data BLOB NOT NULL,
+                        updated_at TIMESTAMP
+                    )
+                ''')
+
+                self.migrate_single_player(cursor)
+                self.migrate_leaderboards(cursor)
+                self.init_telemetry_tables(cursor)
+                self.init_replay_tables(cursor)
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error: {e}")
-    
-    def save_level_progress(self, level_id, score, completed=False, stars=0):
-        """Save progress for a specific level"""
+
+    def init_profile_tables(self, cursor):
+        """Create the profile tables, their leaderboard indexes and counts, and the triggers keeping them current"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS profiles (
+                profile_id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL,
+                created_at TIMESTAMP
+            )
+        ''')
+
+        # The primary key serves per-player lookups; the rank index serves per-level leaderboards
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS profile_levels (
+                profile_id INTEGER NOT NULL,
+                level_id INTEGER NOT NULL,
+                best_score INTEGER DEFAULT 0,
+                completed BOOLEAN DEFAULT FALSE,
+                stars INTEGER DEFAULT 0,
+                attempts INTEGER DEFAULT 0,
+                last_played TIMESTAMP,
+                PRIMARY KEY (profile_id, level_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_profile_levels_rank
+            ON profile_levels (level_id, best_score DESC, profile_id)
+        ''')
+
+        # best_total is the sum of a profile's best level scores and ranks the overall leaderboard
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS profile_stats (
+                profile_id INTEGER PRIMARY KEY,
+                total_score INTEGER DEFAULT 0,
+                total_matches INTEGER DEFAULT 0,
+                total_moves INTEGER DEFAULT 0,
+                play_time INTEGER DEFAULT 0,
+                games_played INTEGER DEFAULT 0,
+                best_total INTEGER DEFAULT 0,
+                last_updated TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_profile_stats_rank
+            ON profile_stats (best_total DESC, profile_id)
+        ''')
+
+        # Entries per leaderboard, and per band of LEADERBOARD_BUCKET_SIZE points on it, kept by the
+        # triggers: board_id is the level, or OVERALL_BOARD_ID for the overall board, which only lists
+        # profiles with best_total > 0
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_counts (
+                board_id INTEGER PRIMARY KEY,
+                entries INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS leaderboard_buckets (
+                board_id INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                entries INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (board_id, bucket)
+            ) WITHOUT ROWID
+        ''')
+        self.create_profile_triggers(cursor)
+
+        now = self.now()
+        cursor.execute('''
+            INSERT OR IGNORE INTO profiles (profile_id, name, created_at) VALUES (?, ?, ?)
+        ''', (DEFAULT_PROFILE_ID, DEFAULT_PROFILE_NAME, now))
+        cursor.execute('''
+            INSERT OR IGNORE INTO profile_stats (profile_id, last_updated) VALUES (?, ?)
+        ''', (DEFAULT_PROFILE_ID, now))
+
+    def create_profile_triggers(self, cursor):
+        """Create the triggers keeping best_total and the leaderboard counts in step with profile_levels"""
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS profile_levels_insert AFTER INSERT ON profile_levels
+            BEGIN
+                UPDATE profile_stats SET best_total = best_total + NEW.best_score
+                WHERE profile_id = NEW.profile_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS profile_levels_update AFTER UPDATE OF best_score ON profile_levels
+            BEGIN
+                UPDATE profile_stats SET best_total = best_total + NEW.best_score - OLD.best_score
+                WHERE profile_id = NEW.profile_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS profile_levels_delete AFTER DELETE ON profile_levels
+            BEGIN
+                UPDATE profile_stats SET best_total = best_total - OLD.best_score
+                WHERE profile_id = OLD.profile_id;
+            END
+        ''')
+
+        size = LEADERBOARD_BUCKET_SIZE
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_levels_insert AFTER INSERT ON profile_levels
+            BEGIN
+                INSERT INTO leaderboard_counts (board_id, entries) VALUES (NEW.level_id, 1)
+                ON CONFLICT (board_id) DO UPDATE SET entries = entries + 1;
+                INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+                VALUES (NEW.level_id, NEW.best_score / {size}, 1)
+                ON CONFLICT (board_id, bucket) DO UPDATE SET entries = entries + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_levels_update AFTER UPDATE OF best_score ON profile_levels
+            WHEN OLD.best_score / {size} != NEW.best_score / {size}
+            BEGIN
+                UPDATE leaderboard_buckets SET entries = entries - 1
+                WHERE board_id = OLD.level_id AND bucket = OLD.best_score / {size};
+                INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+                VALUES (NEW.level_id, NEW.best_score / {size}, 1)
+                ON CONFLICT (board_id, bucket) DO UPDATE SET entries = entries + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_levels_delete AFTER DELETE ON profile_levels
+            BEGIN
+                UPDATE leaderboard_counts SET entries = entries - 1 WHERE board_id = OLD.level_id;
+                UPDATE leaderboard_buckets SET entries = entries - 1
+                WHERE board_id = OLD.level_id AND bucket = OLD.best_score / {size};
+            END
+        ''')
+        # The level triggers move best_total, which fires these for the overall board
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_stats_insert AFTER INSERT ON profile_stats
+            WHEN NEW.best_total > 0
+            BEGIN
+                UPDATE leaderboard_counts SET entries = entries + 1 WHERE board_id = {OVERALL_BOARD_ID};
+                INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+                VALUES ({OVERALL_BOARD_ID}, NEW.best_total / {size}, 1)
+                ON CONFLICT (board_id, bucket) DO UPDATE SET entries = entries + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_stats_update AFTER UPDATE OF best_total ON profile_stats
+            WHEN (OLD.best_total > 0) != (NEW.best_total > 0) OR OLD.best_total / {size} != NEW.best_total / {size}
+            BEGIN
+                UPDATE leaderboard_counts SET entries = entries + (NEW.best_total > 0) - (OLD.best_total > 0)
+                WHERE board_id = {OVERALL_BOARD_ID};
+                UPDATE leaderboard_buckets SET entries = entries - 1
+                WHERE board_id = {OVERALL_BOARD_ID} AND bucket = OLD.best_total / {size} AND OLD.best_total > 0;
+                INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+                SELECT {OVERALL_BOARD_ID}, NEW.best_total / {size}, 1 WHERE NEW.best_total > 0
+                ON CONFLICT (board_id, bucket) DO UPDATE SET entries = entries + 1;
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS leaderboard_stats_delete AFTER DELETE ON profile_stats
+            WHEN OLD.best_total > 0
+            BEGIN
+                UPDATE leaderboard_counts SET entries = entries - 1 WHERE board_id = {OVERALL_BOARD_ID};
+                UPDATE leaderboard_buckets SET entries = entries - 1
+                WHERE board_id = {OVERALL_BOARD_ID} AND bucket = OLD.best_total / {size};
+            END
+        ''')
+
+    def migrate_leaderboards(self, cursor):
+        """Recreate the profile triggers and rebuild the leaderboard counts from the scores on record
+
+        Databases from before the counts existed, or from builds whose triggers
+        kept them differently, would otherwise keep their old trigger bodies,
+        since CREATE TRIGGER IF NOT EXISTS leaves an existing trigger alone.
+        """
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= 2:
+            return
+        triggers = [row[0] for row in cursor.execute('''
+            SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('profile_levels', 'profile_stats')
+        ''')]
+        for name in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+        self.create_profile_triggers(cursor)
+
+        cursor.execute('DELETE FROM leaderboard_counts')
+        cursor.execute('DELETE FROM leaderboard_buckets')
+        cursor.execute('''
+            INSERT INTO leaderboard_counts (board_id, entries)
+            SELECT level_id, COUNT(*) FROM profile_levels GROUP BY level_id
+        ''')
+        cursor.execute('''
+            INSERT INTO leaderboard_counts (board_id, entries)
+            SELECT ?, COUNT(*) FROM profile_stats WHERE best_total > 0
+        ''', (OVERALL_BOARD_ID,))
+        cursor.execute('''
+            INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+            SELECT level_id, best_score / ?, COUNT(*) FROM profile_levels GROUP BY level_id, best_score / ?
+        ''', (LEADERBOARD_BUCKET_SIZE, LEADERBOARD_BUCKET_SIZE))
+        cursor.execute('''
+            INSERT INTO leaderboard_buckets (board_id, bucket, entries)
+            SELECT ?, best_total / ?, COUNT(*) FROM profile_stats WHERE best_total > 0 GROUP BY best_total / ?
+        ''', (OVERALL_BOARD_ID, LEADERBOARD_BUCKET_SIZE, LEADERBOARD_BUCKET_SIZE))
+        cursor.execute('PRAGMA user_version = 2')
+
+    def migrate_single_player(self, cursor):
+        """Move progress from the old single-player levels/game_stats tables into the default profile"""
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= 1:
+            return
+        tables = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        if 'game_stats' in tables:
+            cursor.execute('''
+                UPDATE profile_stats SET
+                (total_score, total_matches, total_moves, play_time, games_played, last_updated) =
+                (SELECT total_score, total_matches, total_moves, play_time, games_played, last_updated
+                 FROM game_stats WHERE id = 1)
+                WHERE profile_id = ? AND EXISTS (SELECT 1 FROM game_stats WHERE id = 1)
+            ''', (DEFAULT_PROFILE_ID,))
+
+        if 'levels' in tables:
+            # The insert trigger adds each best score to best_total
+            cursor.execute('''
+                INSERT OR IGNORE INTO profile_levels
+                (profile_id, level_id, best_score, completed, stars, attempts, last_played)
+                SELECT ?, level_id, best_score, completed, stars, attempts, last_played FROM levels
+            ''', (DEFAULT_PROFILE_ID,))
+
+        cursor.execute('PRAGMA user_version = 1')
+
+    def init_telemetry_tables(self, cursor):
+        """Create the append-only events table and its per-level rollups"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS events (
+                id INTEGER PRIMARY KEY,
+                session_id TEXT,
+                level_id INTEGER,
+                event_type TEXT,
+                created_at REAL,
+                move_number INTEGER DEFAULT 0,
+                score_delta INTEGER DEFAULT 0,
+                cascade_depth INTEGER DEFAULT 0,
+                specials_created INTEGER DEFAULT 0,
+                specials_triggered INTEGER DEFAULT 0,
+                duration_ms INTEGER DEFAULT 0,
+                outcome TEXT
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_level_time ON events (level_id, created_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_events_created ON events (created_at)')
+
+        # One row per level and day, folded in from events by rollup_events()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS level_summary (
+                level_id INTEGER,
+                day TEXT,
+                moves INTEGER DEFAULT 0,
+                invalid_swaps INTEGER DEFAULT 0,
+                max_cascade INTEGER DEFAULT 0,
+                total_cascade_depth INTEGER DEFAULT 0,
+                score_total INTEGER DEFAULT 0,
+                specials_created INTEGER DEFAULT 0,
+                specials_triggered INTEGER DEFAULT 0,
+                wins INTEGER DEFAULT 0,
+                losses INTEGER DEFAULT 0,
+                move_time_ms INTEGER DEFAULT 0,
+                PRIMARY KEY (level_id, day)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS telemetry_rollup (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                last_event_id INTEGER DEFAULT 0
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO telemetry_rollup (id, last_event_id) VALUES (1, 0)')
+
+    def init_replay_tables(self, cursor):
+        """Create the queue of replays submitted for score verification"""
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS replay_submissions (
+                submission_id INTEGER PRIMARY KEY,
+                profile_id INTEGER NOT NULL,
+                level_id INTEGER NOT NULL,
+                claimed_score INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                status TEXT DEFAULT 'pending',
+                verified_score INTEGER,
+                reason TEXT,
+                submitted_at TIMESTAMP,
+                verified_at TIMESTAMP
+            )
+        ''')
+        # Verified rows drop out of the index, so finding work stays cheap however long the history grows
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_replay_submissions_pending
+            ON replay_submissions (submission_id) WHERE status = 'pending'
+        ''')
+
+    def submit_replays(self, submissions):
+        """Queue (profile_id, level_id, claimed_score, data) replays for verify_replays.py"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            # Get current best score
-            cursor.execute('SELECT best_score FROM levels WHERE level_id = ?', (level_id,))
-            result = cursor.fetchone()
-            
-            if result:
-                current_best = result[0]
-                new_best = max(current_best, score)
-                
-                cursor.execute('''
-                    UPDATE levels SET 
-                    best_score = ?, completed = ?, stars = ?, 
-                    attempts = attempts + 1, last_played = ?
-                    WHERE level_id = ?
-                ''', (new_best, completed, stars, datetime.now(), level_id))
-            else:
-                cursor.execute('''
-                    INSERT INTO levels (level_id, best_score, completed, stars, attempts, last_played)
-                    VALUES (?, ?, ?, ?, 1, ?)
-                ''', (level_id, score, completed, stars, datetime.now()))
-            
-            conn.commit()
-            conn.close()
+            with self.lock, self.conn:
+                now = self.now()
+                self.conn.executemany('''
+                    INSERT INTO replay_submissions (profile_id, level_id, claimed_score, data, submitted_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [(*submission, now) for submission in submissions])
             return True
-            
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error submitting replays: {e}")
+            return False
+
+    def get_pending_replays(self, limit):
+        """Oldest unverified submissions as (submission_id, claimed_score, data)"""
+        try:
+            with self.lock:
+                return self.conn.execute('''
+                    SELECT submission_id, claimed_score, data FROM replay_submissions
+                    WHERE status = 'pending' ORDER BY submission_id LIMIT ?
+                ''', (limit,)).fetchall()
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error getting pending replays: {e}")
+            return []
+
+    def record_replay_verdicts(self, verdicts):
+        """Mark submissions verified and raise best scores for the accepted ones, in one transaction
+
+        verdicts is a list of (submission_id, verdict) with verdicts as made by
+        verifier.verify_replay. Verification never counts as an attempt.
+        """
+        try:
+            with self.lock, self.conn:
+                now = self.now()
+                self.conn.executemany('''
+                    UPDATE replay_submissions SET status = ?, verified_score = ?, reason = ?, verified_at = ?
+                    WHERE submission_id = ?
+                ''', [('accepted' if verdict['accepted'] else 'rejected', verdict['score'], verdict['reason'], now,
+                       submission_id) for submission_id, verdict in verdicts])
+                self.conn.executemany('''
+                    INSERT INTO profile_levels
+                    (profile_id, level_id, best_score, completed, stars, attempts, last_played)
+                    SELECT profile_id, level_id, ?, ?, ?, 0, ? FROM replay_submissions WHERE submission_id = ?
+                    ON CONFLICT(profile_id, level_id) DO UPDATE SET
+                    best_score = MAX(best_score, excluded.best_score),
+                    completed = MAX(completed, excluded.completed), stars = MAX(stars, excluded.stars)
+                ''', [(verdict['score'], verdict['completed'], verdict['stars'], now, submission_id)
+                      for submission_id, verdict in verdicts if verdict['accepted']])
+            return True
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error recording replay verdicts: {e}")
+            return False
+
+    def save_level_progress(self, level_id, score, completed=False, stars=0, profile_id=DEFAULT_PROFILE_ID):
+        """Save a profile's progress for a specific level; completed and stars of None are left unchanged"""
+        try:
+            with self.lock, self.conn:
+                # Keep the best score in a single statement instead of SELECT then UPDATE/INSERT
+                self.conn.execute('''
+                    INSERT INTO profile_levels
+                    (profile_id, level_id, best_score, completed, stars, attempts, last_played)
+                    VALUES (?, ?, ?, COALESCE(?, FALSE), COALESCE(?, 0), 1, ?)
+                    ON CONFLICT(profile_id, level_id) DO UPDATE SET
+                    best_score = MAX(best_score, excluded.best_score),
+                    completed = COALESCE(?, completed), stars = COALESCE(?, stars),
+                    attempts = attempts + 1, last_played = excluded.last_played
+                ''', (profile_id, level_id, score, completed, stars, self.now(), completed, stars))
+            return True
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error saving level progress: {e}")
             return False
-    
-    def get_level_progress(self, level_id):
-        """Get progress for a specific level"""
+
+    def write_batch(self, levels, stats=None, settings=None, events=None, states=None):
+        """Apply merged level, stats, setting, telemetry and save state updates in one transaction
+
+        levels is keyed by (profile_id, level_id); stats and states by profile_id.
+        A state of None deletes that profile's save.
+        """
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT best_score, completed, stars, attempts, last_played
-                FROM levels WHERE level_id = ?
-            ''', (level_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
+            with self.lock, self.conn:
+                now = self.now()
+                self.conn.executemany('''
+                    INSERT INTO profile_levels
+                    (profile_id, level_id, best_score, completed, stars, attempts, last_played)
+                    VALUES (?, ?, ?, COALESCE(?, FALSE), COALESCE(?, 0), ?, ?)
+                    ON CONFLICT(profile_id, level_id) DO UPDATE SET
+                    best_score = MAX(best_score, excluded.best_score),
+                    completed = COALESCE(?, completed), stars = COALESCE(?, stars),
+                    attempts = attempts + excluded.attempts, last_played = excluded.last_played
+                ''', [(profile_id, level_id, update['score'], update['completed'], update['stars'],
+                       update['attempts'], now, update['completed'], update['stars'])
+                      for (profile_id, level_id), update in levels.items()])
+
+                if stats:
+                    self.conn.executemany('''
+                        UPDATE profile_stats SET
+                        total_score = total_score + ?,
+                        total_matches = total_matches + ?,
+                        total_moves = total_moves + ?,
+                        play_time = play_time + ?,
+                        games_played = games_played + ?,
+                        last_updated = ?
+                        WHERE profile_id = ?
+                    ''', [(*totals, now, profile_id) for profile_id, totals in stats.items()])
+
+                if settings:
+                    self.conn.executemany('''
+                        INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)
+                    ''', [(key, str(value)) for key, value in settings.items()])
+
+                if events:
+                    self.conn.executemany('''
+                        INSERT INTO events (session_id, level_id, event_type, created_at, move_number,
+                        score_delta, cascade_depth, specials_created, specials_triggered, duration_ms, outcome)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', events)
+
+                if states:
+                    self.conn.executemany('''
+                        INSERT OR REPLACE INTO save_states (profile_id, data, updated_at) VALUES (?, ?, ?)
+                    ''', [(profile_id, data, now) for profile_id, data in states.items() if data is not None])
+                    self.conn.executemany('''
+                        DELETE FROM save_states WHERE profile_id = ?
+                    ''', [(profile_id,) for profile_id, data in states.items() if data is None])
+            return True
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error writing batch: {e}")
+            return False
+
+    def rollup_events(self, retention_seconds=None):
+        """Fold new events into level_summary, then prune rolled-up events past retention"""
+        try:
+            with self.lock, self.conn:
+                last_id = self.conn.execute('SELECT last_event_id FROM telemetry_rollup WHERE id = 1').fetchone()[0]
+                max_id = self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+
+                if max_id > last_id:
+                    self.conn.execute('''
+                        INSERT INTO level_summary (level_id, day, moves, invalid_swaps, max_cascade,
+                        total_cascade_depth, score_total, specials_created, specials_triggered,
+                        wins, losses, move_time_ms)
+                        SELECT level_id, date(created_at, 'unixepoch'),
+                        SUM(event_type = 'swap'),
+                        SUM(event_type = 'invalid_swap'),
+                        MAX(cascade_depth),
+                        SUM(cascade_depth),
+                        SUM(CASE WHEN event_type = 'swap' THEN score_delta ELSE 0 END),
+                        SUM(specials_created),
+                        SUM(specials_triggered),
+                        SUM(event_type = 'level_end' AND outcome = 'win'),
+                        SUM(event_type = 'level_end' AND outcome = 'loss'),
+                        SUM(CASE WHEN event_type = 'swap' THEN duration_ms ELSE 0 END)
+                        FROM events WHERE id > ? AND id <= ?
+                        GROUP BY level_id, date(created_at, 'unixepoch')
+                        ON CONFLICT(level_id, day) DO UPDATE SET
+                        moves = moves + excluded.moves,
+                        invalid_swaps = invalid_swaps + excluded.invalid_swaps,
+                        max_cascade = MAX(max_cascade, excluded.max_cascade),
+                        total_cascade_depth = total_cascade_depth + excluded.total_cascade_depth,
+                        score_total = score_total + excluded.score_total,
+                        specials_created = specials_created + excluded.specials_created,
+                        specials_triggered = specials_triggered + excluded.specials_triggered,
+                        wins = wins + excluded.wins,
+                        losses = losses + excluded.losses,
+                        move_time_ms = move_time_ms + excluded.move_time_ms
+                    ''', (last_id, max_id))
+                    self.conn.execute('UPDATE telemetry_rollup SET last_event_id = ? WHERE id = 1', (max_id,))
+
+                # Only events already folded into the summary are ever deleted
+                if retention_seconds is not None:
+                    cutoff = datetime.now().timestamp() - retention_seconds
+                    self.conn.execute('''
+                        DELETE FROM events WHERE created_at < ? AND id <= ?
+                    ''', (cutoff, max_id))
+            return True
+
+        except (sqlite3.Error, AttributeError, TypeError) as e:
+            print(f"Database error rolling up events: {e}")
+            return False
+
+    def get_level_summary(self, level_id):
+        """Get the per-day telemetry rollups for a level, newest first"""
+        try:
+            with self.lock:
+                rows = self.conn.execute('''
+                    SELECT day, moves, invalid_swaps, max_cascade, total_cascade_depth, score_total,
+                    specials_created, specials_triggered, wins, losses, move_time_ms
+                    FROM level_summary WHERE level_id = ? ORDER BY day DESC
+                ''', (level_id,)).fetchall()
+
+            columns = ['day', 'moves', 'invalid_swaps', 'max_cascade', 'total_cascade_depth', 'score_total',
+                       'specials_created', 'specials_triggered', 'wins', 'losses', 'move_time_ms']
+            return [dict(zip(columns, row)) for row in rows]
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error getting level summary: {e}")
+            return []
+
+    def get_level_progress(self, level_id, profile_id=DEFAULT_PROFILE_ID):
+        """Get a profile's progress for a specific level"""
+        try:
+            with self.lock:
+                result = self.conn.execute('''
+                    SELECT best_score, completed, stars, attempts, last_played
+                    FROM profile_levels WHERE profile_id = ? AND level_id = ?
+                ''', (profile_id, level_id)).fetchone()
+
             if result:
                 return {
                     'best_score': result[0],
@@ -134,50 +600,42 @@ class Database:
                     'attempts': 0,
                     'last_played': None
                 }
-                
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error getting level progress: {e}")
             return None
-    
-    def update_game_stats(self, score_gained=0, matches_made=0, moves_made=0, time_played=0):
-        """Update overall game statistics"""
+
+    def update_game_stats(self, score_gained=0, matches_made=0, moves_made=0, time_played=0,
+                          profile_id=DEFAULT_PROFILE_ID):
+        """Update a profile's overall game statistics"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE game_stats SET
-                total_score = total_score + ?,
-                total_matches = total_matches + ?,
-                total_moves = total_moves + ?,
-                play_time = play_time + ?,
-                games_played = games_played + 1,
-                last_updated = ?
-                WHERE id = 1
-            ''', (score_gained, matches_made, moves_made, time_played, datetime.now()))
-            
-            conn.commit()
-            conn.close()
+            with self.lock, self.conn:
+                self.conn.execute('''
+                    UPDATE profile_stats SET
+                    total_score = total_score + ?,
+                    total_matches = total_matches + ?,
+                    total_moves = total_moves + ?,
+                    play_time = play_time + ?,
+                    games_played = games_played + 1,
+                    last_updated = ?
+                    WHERE profile_id = ?
+                ''', (score_gained, matches_made, moves_made, time_played, self.now(), profile_id))
             return True
-            
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error updating game stats: {e}")
             return False
-    
-    def get_game_stats(self):
-        """Get overall game statistics"""
+
+    def get_game_stats(self, profile_id=DEFAULT_PROFILE_ID):
+        """Get a profile's overall game statistics"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT total_score, total_matches, total_moves, play_time, games_played, last_updated
-                FROM game_stats WHERE id = 1
-            ''')
-            
-            result = cursor.fetchone()
-            conn.close()
-            
+            with self.lock:
+                result = self.conn.execute('''
+                    SELECT total_score, total_matches, total_moves, play_time, games_played, last_updated,
+                    best_total
+                    FROM profile_stats WHERE profile_id = ?
+                ''', (profile_id,)).fetchone()
+
             if result:
                 return {
                     'total_score': result[0],
@@ -185,73 +643,227 @@ class Database:
                     'total_moves': result[2],
                     'play_time': result[3],
                     'games_played': result[4],
-                    'last_updated': result[5]
+                    'last_updated': result[5],
+                    'best_total': result[6]
                 }
             else:
                 return None
-                
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error getting game stats: {e}")
             return None
-    
+
+    def load_state(self, profile_id=DEFAULT_PROFILE_ID):
+        """Get a profile's saved level in progress as a blob, or None"""
+        try:
+            with self.lock:
+                result = self.conn.execute('''
+                    SELECT data FROM save_states WHERE profile_id = ?
+                ''', (profile_id,)).fetchone()
+            return result[0] if result else None
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error loading save state: {e}")
+            return None
+
+    def create_profile(self, name):
+        """Create a player profile and return its id, or the existing id if the name is taken"""
+        try:
+            with self.lock, self.conn:
+                now = self.now()
+                self.conn.execute('''
+                    INSERT OR IGNORE INTO profiles (name, created_at) VALUES (?, ?)
+                ''', (name, now))
+                profile_id = self.conn.execute('''
+                    SELECT profile_id FROM profiles WHERE name = ?
+                ''', (name,)).fetchone()[0]
+                self.conn.execute('''
+                    INSERT OR IGNORE INTO profile_stats (profile_id, last_updated) VALUES (?, ?)
+                ''', (profile_id, now))
+            return profile_id
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error creating profile: {e}")
+            return None
+
+    def get_profile(self, profile_id):
+        """Get a profile's name and creation time"""
+        try:
+            with self.lock:
+                result = self.conn.execute('''
+                    SELECT name, created_at FROM profiles WHERE profile_id = ?
+                ''', (profile_id,)).fetchone()
+
+            if result:
+                return {'profile_id': profile_id, 'name': result[0], 'created_at': result[1]}
+            return None
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error getting profile: {e}")
+            return None
+
+    def leaderboard_source(self, level_id):
+        """Table, score column, filter and leaderboard_counts key for a level's board, or the overall one for None"""
+        if level_id is None:
+            return 'profile_stats', 'best_total', 'best_total > 0', (), OVERALL_BOARD_ID
+        return 'profile_levels', 'best_score', 'level_id = ?', (level_id,), level_id
+
+    def count_above(self, level_id, score):
+        """Entries on a board scoring more than score; call with self.lock held
+
+        The bucket counts give every band above the score's own in one keyed
+        range, bounded by the score range rather than the number of players.
+        Only entries in the score's own band of LEADERBOARD_BUCKET_SIZE
+        points are counted off the rank index.
+        """
+        table, column, condition, params, board_id = self.leaderboard_source(level_id)
+        bucket = score // LEADERBOARD_BUCKET_SIZE
+        higher = self.conn.execute('''
+            SELECT COALESCE(SUM(entries), 0) FROM leaderboard_buckets WHERE board_id = ? AND bucket > ?
+        ''', (board_id, bucket)).fetchone()[0]
+        within = self.conn.execute(f'''
+            SELECT COUNT(*) FROM {table} WHERE {condition} AND {column} > ? AND {column} < ?
+        ''', (*params, score, (bucket + 1) * LEADERBOARD_BUCKET_SIZE)).fetchone()[0]
+        return higher + within
+
+    def get_leaderboard(self, level_id=None, limit=LEADERBOARD_PAGE_SIZE, offset=0, after=None):
+        """Get one page of a level's leaderboard, or the overall one when level_id is None
+
+        Page with after: pass the (score, profile_id) of the previous page's
+        last row and the page is read straight off the rank index from there;
+        the plain <= bound is what lets SQLite seek there with bound values.
+        offset is a convenience for shallow pages only, since SQLite walks
+        every skipped entry. Each rank comes from count_above, once per
+        distinct score on the page. Equal scores share a rank.
+        """
+        table, column, condition, params, _ = self.leaderboard_source(level_id)
+        try:
+            with self.lock:
+                if after is not None:
+                    score, profile_id = after
+                    rows = self.conn.execute(f'''
+                        SELECT t.profile_id, p.name, t.{column} FROM {table} t
+                        JOIN profiles p ON p.profile_id = t.profile_id
+                        WHERE {condition} AND t.{column} <= ? AND (t.{column} < ? OR (t.{column} = ? AND t.profile_id > ?))
+                        ORDER BY t.{column} DESC, t.profile_id LIMIT ?
+                    ''', (*params, score, score, score, profile_id, limit)).fetchall()
+                else:
+                    rows = self.conn.execute(f'''
+                        SELECT t.profile_id, p.name, t.{column} FROM {table} t
+                        JOIN profiles p ON p.profile_id = t.profile_id
+                        WHERE {condition}
+                        ORDER BY t.{column} DESC, t.profile_id LIMIT ? OFFSET ?
+                    ''', (*params, limit, offset)).fetchall()
+                ranks = {}
+                for _, _, score in rows:
+                    if score not in ranks:
+                        ranks[score] = self.count_above(level_id, score) + 1
+
+            return [{'rank': ranks[score], 'profile_id': profile_id, 'name': name, 'score': score}
+                    for profile_id, name, score in rows]
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error getting leaderboard: {e}")
+            return []
+
+    def get_player_rank(self, profile_id, level_id=None):
+        """Get a profile's rank and score on a level's leaderboard, or the overall one for None
+
+        Finding the player and the board's size are single key lookups, and
+        the rank is a count_above: a bounded range over the bucket counts plus
+        a count of the players in the same band of points.
+        """
+        table, column, condition, params, board_id = self.leaderboard_source(level_id)
+        try:
+            with self.lock:
+                result = self.conn.execute(f'''
+                    SELECT {column} FROM {table} WHERE {condition} AND profile_id = ?
+                ''', (*params, profile_id)).fetchone()
+                if result is None:
+                    return None
+                above = self.count_above(level_id, result[0])
+                total = self.conn.execute('''
+                    SELECT entries FROM leaderboard_counts WHERE board_id = ?
+                ''', (board_id,)).fetchone()[0]
+
+            return {'rank': above + 1, 'score': result[0], 'players': total}
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error getting player rank: {e}")
+            return None
+
+    @staticmethod
+    def parse_setting(value):
+        """Convert a stored setting string to bool, float or str"""
+        if value.lower() in ['true', 'false']:
+            return value.lower() == 'true'
+        try:
+            return float(value)
+        except ValueError:
+            return value
+
+    def load_settings(self):
+        """Read the whole settings table into memory once"""
+        try:
+            with self.lock:
+                rows = self.conn.execute('SELECT key, value FROM settings').fetchall()
+            self.settings = {key: self.parse_setting(value) for key, value in rows}
+
+        except (sqlite3.Error, AttributeError) as e:
+            print(f"Database error loading settings: {e}")
+
+    def set_setting_writer(self, writer):
+        """Route setting writes through a batching writer (anything with save_setting)"""
+        self.setting_writer = writer
+
+    def add_setting_listener(self, key, callback):
+        """Call callback(key, value) whenever the setting changes"""
+        self.setting_listeners.setdefault(key, []).append(callback)
+
+    def remove_setting_listener(self, key, callback):
+        """Stop notifying a callback about a setting"""
+        listeners = self.setting_listeners.get(key, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
     def save_setting(self, key, value):
         """Save a game setting"""
+        # Keep the in-memory copy typed the same way it would be read back from disk
+        typed_value = self.parse_setting(str(value))
+        changed = self.settings.get(key) != typed_value
+        self.settings[key] = typed_value
+
+        if changed:
+            for callback in list(self.setting_listeners.get(key, [])):
+                callback(key, typed_value)
+
+        if self.setting_writer is not None:
+            return self.setting_writer.save_setting(key, value)
+
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)
-            ''', (key, str(value)))
-            
-            conn.commit()
-            conn.close()
+            with self.lock, self.conn:
+                self.conn.execute('''
+                    INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)
+                ''', (key, str(value)))
             return True
-            
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error saving setting: {e}")
             return False
-    
+
     def get_setting(self, key, default_value=None):
         """Get a game setting"""
+        return self.settings.get(key, default_value)
+
+    def get_all_level_progress(self, profile_id=DEFAULT_PROFILE_ID):
+        """Get a profile's progress for all levels"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('SELECT value FROM settings WHERE key = ?', (key,))
-            result = cursor.fetchone()
-            conn.close()
-            
-            if result:
-                value = result[0]
-                # Try to convert to appropriate type
-                if value.lower() in ['true', 'false']:
-                    return value.lower() == 'true'
-                try:
-                    return float(value)
-                except ValueError:
-                    return value
-            else:
-                return default_value
-                
-        except sqlite3.Error as e:
-            print(f"Database error getting setting: {e}")
-            return default_value
-    
-    def get_all_level_progress(self):
-        """Get progress for all levels"""
-        try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT level_id, best_score, completed, stars, attempts
-                FROM levels ORDER BY level_id
-            ''')
-            
-            results = cursor.fetchall()
-            conn.close()
-            
+            with self.lock:
+                results = self.conn.execute('''
+                    SELECT level_id, best_score, completed, stars, attempts
+                    FROM profile_levels WHERE profile_id = ? ORDER BY level_id
+                ''', (profile_id,)).fetchall()
+
             progress = {}
             for result in results:
                 progress[result[0]] = {
@@ -260,36 +872,40 @@ class Database:
                     'stars': result[3],
                     'attempts': result[4]
                 }
-            
+
             return progress
-            
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error getting all level progress: {e}")
             return {}
-    
-    def reset_progress(self):
-        """Reset all game progress"""
+
+    def reset_progress(self, profile_id=DEFAULT_PROFILE_ID):
+        """Reset a profile's game progress"""
         try:
-            conn = sqlite3.connect(self.db_file)
-            cursor = conn.cursor()
-            
-            cursor.execute('DELETE FROM levels')
-            cursor.execute('''
-                UPDATE game_stats SET
-                total_score = 0, total_matches = 0, total_moves = 0,
-                play_time = 0, games_played = 0, last_updated = ?
-                WHERE id = 1
-            ''', (datetime.now(),))
-            
-            conn.commit()
-            conn.close()
+            with self.lock, self.conn:
+                self.conn.execute('DELETE FROM profile_levels WHERE profile_id = ?', (profile_id,))
+                self.conn.execute('DELETE FROM save_states WHERE profile_id = ?', (profile_id,))
+                self.conn.execute('''
+                    UPDATE profile_stats SET
+                    total_score = 0, total_matches = 0, total_moves = 0,
+                    play_time = 0, games_played = 0, best_total = 0, last_updated = ?
+                    WHERE profile_id = ?
+                ''', (self.now(), profile_id))
             return True
-            
-        except sqlite3.Error as e:
+
+        except (sqlite3.Error, AttributeError) as e:
             print(f"Database error resetting progress: {e}")
             return False
-    
+
     def close(self):
         """Close database connection"""
-        # SQLite connections are closed after each operation
-        pass
+        with self.lock:
+            if self.conn is None:
+                return
+            try:
+                # Fold the WAL back into the main file so the .db is self-contained on exit
+                self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                self.conn.close()
+            except sqlite3.Error as e:
+                print(f"Database error closing connection: {e}")
+            self.conn = None
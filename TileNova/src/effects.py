@@ -1,7 +1,8 @@
 import pygame
 import math
-import random
 from config import *
+from rng import cosmetic
+from utils.helpers import get_font
 
 class Effect:
     """Base class for visual effects"""
@@ -83,10 +84,10 @@ class ParticleEffect(Effect):
         
         # Create particles
         for _ in range(particle_count):
-            angle = random.uniform(0, 2 * math.pi)
-            speed = random.uniform(50, 150)
-            size = random.uniform(2, 6)
-            life = random.uniform(0.5, 1.0)
+            angle = cosmetic.uniform(0, 2 * math.pi)
+            speed = cosmetic.uniform(50, 150)
+            size = cosmetic.uniform(2, 6)
+            life = cosmetic.uniform(0.5, 1.0)
             
             particle = {
                 'x': position[0],
@@ -134,7 +135,7 @@ class ScorePopup(Effect):
         super().__init__(duration)
         self.start_pos = position
         self.score = score
-        self.font = pygame.font.Font(None, 32)
+        self.font = get_font(32)
         self.color = YELLOW if score >= 100 else WHITE
     
     def draw(self, screen):
@@ -160,7 +161,7 @@ class ComboEffect(Effect):
         super().__init__(duration)
         self.position = position
         self.combo = combo
-        self.font = pygame.font.Font(None, 48)
+        self.font = get_font(48)
         self.color = ORANGE
     
     def draw(self, screen):
@@ -184,6 +185,30 @@ class ComboEffect(Effect):
         text_rect = text.get_rect(center=self.position)
         screen.blit(text, text_rect)
 
+class HintHighlight(Effect):
+    """Pulsing outline around the two tiles of a suggested move"""
+    def __init__(self, pos1, pos2, duration=HINT_DURATION):
+        super().__init__(duration)
+        left, top = min(pos1[0], pos2[0]), min(pos1[1], pos2[1])
+        right, bottom = max(pos1[0], pos2[0]) + 1, max(pos1[1], pos2[1]) + 1
+        self.rect = pygame.Rect(BOARD_OFFSET_X + left * TILE_SIZE, BOARD_OFFSET_Y + top * TILE_SIZE,
+                                (right - left) * TILE_SIZE, (bottom - top) * TILE_SIZE)
+    
+    def draw(self, screen):
+        if not self.active:
+            return
+        
+        # Pulse the outline, fading out over the last second
+        pulse = abs(math.sin(self.timer * 4))
+        fade = min(1.0, self.duration - self.timer)
+        alpha = int((120 + 135 * pulse) * fade)
+        grow = int(4 * pulse)
+        
+        rect = self.rect.inflate(grow * 2, grow * 2)
+        hint_surface = pygame.Surface(rect.size, pygame.SRCALPHA)
+        pygame.draw.rect(hint_surface, (*WHITE, alpha), hint_surface.get_rect(), 4, border_radius=12)
+        screen.blit(hint_surface, rect.topleft)
+
 class Effects:
     """Manager for all visual effects"""
     def __init__(self):
@@ -215,6 +240,16 @@ class Effects:
         effect = ComboEffect(position, combo)
         self.effects.append(effect)
     
+    def add_hint(self, pos1, pos2):
+        """Highlight a suggested move, replacing any hint already shown"""
+        self.clear_hints()
+        effect = HintHighlight(pos1, pos2)
+        self.effects.append(effect)
+    
+    def clear_hints(self):
+        """Remove any hint highlight"""
+        self.effects = [effect for effect in self.effects if not isinstance(effect, HintHighlight)]
+    
     def update(self):
         """Update all effects"""
         dt = self.clock.tick(60) / 1000.0  # Delta time in seconds
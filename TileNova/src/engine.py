@@ -0,0 +1,417 @@
+import random
+from config import *
+
+# Match rules on a board stored as one cell code per square, row by row
+# (the get_cells() layout): tile types below SPECIAL_TILE_ROCKET match,
+# while special tiles, CELL_EMPTY and CELL_OBSTACLE never do.
+
+def is_matchable(cell):
+    """Check if a cell can be part of a match"""
+    return cell < SPECIAL_TILE_ROCKET
+
+def is_swappable(cell):
+    """Check if a cell holds a tile the player can move"""
+    return cell != CELL_EMPTY and cell != CELL_OBSTACLE
+
+def find_match_groups(cells, width, height):
+    """Find every horizontal and vertical run of three or more, in Board.check_matches' group format"""
+    groups = []
+    for y in range(height):
+        row = y * width
+        x = 0
+        while x < width:
+            cell = cells[row + x]
+            end = x + 1
+            if is_matchable(cell):
+                while end < width and cells[row + end] == cell:
+                    end += 1
+                count = end - x
+                if count >= 3:
+                    groups.append({
+                        'matches': [(i, y) for i in range(x, end)],
+                        'count': count,
+                        'type': cell,
+                        'direction': 'horizontal',
+                        'center': (x + count // 2, y)
+                    })
+            x = end
+
+    for x in range(width):
+        y = 0
+        while y < height:
+            cell = cells[y * width + x]
+            end = y + 1
+            if is_matchable(cell):
+                while end < height and cells[end * width + x] == cell:
+                    end += 1
+                count = end - y
+                if count >= 3:
+                    groups.append({
+                        'matches': [(x, i) for i in range(y, end)],
+                        'count': count,
+                        'type': cell,
+                        'direction': 'vertical',
+                        'center': (x, y + count // 2)
+                    })
+            y = end
+
+    return groups
+
+def has_match_at(cells, width, height, x, y):
+    """Check if the cell at (x, y) is part of a run of three or more"""
+    cell = cells[y * width + x]
+    if not is_matchable(cell):
+        return False
+
+    run = 1
+    i = x - 1
+    while i >= 0 and cells[y * width + i] == cell:
+        run += 1
+        i -= 1
+    i = x + 1
+    while i < width and cells[y * width + i] == cell:
+        run += 1
+        i += 1
+    if run >= 3:
+        return True
+
+    run = 1
+    i = y - 1
+    while i >= 0 and cells[i * width + x] == cell:
+        run += 1
+        i -= 1
+    i = y + 1
+    while i < height and cells[i * width + x] == cell:
+        run += 1
+        i += 1
+    return run >= 3
+
+def is_valid_swap(cells, width, height, pos1, pos2):
+    """Check if swapping two adjacent cells is a legal move
+
+    Swapping a special tile always is, since it activates; other swaps must
+    create a match at one of the two cells.
+    """
+    (x1, y1), (x2, y2) = pos1, pos2
+    a, b = y1 * width + x1, y2 * width + x2
+    first, second = cells[a], cells[b]
+    if not is_swappable(first) or not is_swappable(second):
+        return False
+    if not is_matchable(first) or not is_matchable(second):
+        return True
+    if first == second:
+        return False
+
+    cells[a], cells[b] = second, first
+    try:
+        return has_match_at(cells, width, height, x1, y1) or has_match_at(cells, width, height, x2, y2)
+    finally:
+        cells[a], cells[b] = first, second
+
+def find_valid_moves(cells, width, height):
+    """List every legal swap as ((x1, y1), (x2, y2)), scanning right and down from each cell"""
+    cells = bytearray(cells)
+    moves = []
+    for y in range(height):
+        for x in range(width):
+            if x < width - 1 and is_valid_swap(cells, width, height, (x, y), (x + 1, y)):
+                moves.append(((x, y), (x + 1, y)))
+            if y < height - 1 and is_valid_swap(cells, width, height, (x, y), (x, y + 1)):
+                moves.append(((x, y), (x, y + 1)))
+    return moves
+
+def column_segments(cells, width, height):
+    """Split each column into (x, top, bottom) runs of rows between obstacles, bottom exclusive
+
+    Tiles fall and refill within a segment and never pass an obstacle.
+    """
+    segments = []
+    for x in range(width):
+        top = 0
+        for y in range(height + 1):
+            if y == height or cells[y * width + x] == CELL_OBSTACLE:
+                if y > top:
+                    segments.append((x, top, y))
+                top = y + 1
+    return segments
+
+def completes_run(cells, width, height, x, y, cell):
+    """Check if putting cell at (x, y) would line it up with two or more of the same already placed"""
+    index = y * width + x
+    previous = cells[index]
+    cells[index] = cell
+    try:
+        return has_match_at(cells, width, height, x, y)
+    finally:
+        cells[index] = previous
+
+def plant_move(cells, positions, width, height, rng):
+    """Pick cells for a guaranteed move: p, then two cells in line with its neighbour q
+
+    Fruit of one kind on p and both line cells, with anything else on q,
+    makes swapping p and q complete a run of three. Returns (p, line cells)
+    as indexes, or None if no such shape fits among the open positions.
+    """
+    open_cells = set(positions)
+    start = rng.randint(0, len(positions) - 1)
+    for k in range(len(positions)):
+        q = positions[(start + k) % len(positions)]
+        qy, qx = divmod(q, width)
+        shapes = []
+        for dx, dy in ((1, 0), (0, 1)):
+            for before in range(3):  # Where q sits in the line of three
+                line = [(qx + (i - before) * dx, qy + (i - before) * dy) for i in range(3) if i != before]
+                if not all(0 <= x < width and 0 <= y < height for x, y in line):
+                    continue
+                line = [y * width + x for x, y in line]
+                for px, py in ((qx - 1, qy), (qx + 1, qy), (qx, qy - 1), (qx, qy + 1)):
+                    p = py * width + px
+                    if 0 <= px < width and 0 <= py < height and p not in line:
+                        shapes.append((p, line))
+        shapes = [(p, line) for p, line in shapes if p in open_cells and all(i in open_cells for i in line)]
+        if shapes:
+            return rng.choice(shapes)
+    return None
+
+def draw_tile(counts, allowed, rng):
+    """Take one tile of the allowed types from counts, picked in proportion to how many are left"""
+    pick = rng.randint(0, sum(counts[cell] for cell in allowed) - 1)
+    for cell in allowed:
+        pick -= counts[cell]
+        if pick < 0:
+            counts[cell] -= 1
+            return cell
+
+def trade_tile(cells, counts, placed, index, width, height):
+    """Fill a cell that every remaining tile would complete a run on by moving an earlier tile into it
+
+    The earlier cell takes one of the remaining tiles instead. Returns False
+    if no earlier cell can trade without completing a run itself.
+    """
+    y, x = divmod(index, width)
+    for j in placed:
+        tile = cells[j]
+        jy, jx = divmod(j, width)
+        cells[j] = CELL_EMPTY
+        if not (is_matchable(tile) and completes_run(cells, width, height, x, y, tile)):
+            cells[index] = tile
+            for cell, n in counts.items():
+                if n and not (is_matchable(cell) and completes_run(cells, width, height, jx, jy, cell)):
+                    cells[j] = cell
+                    counts[cell] -= 1
+                    return True
+            cells[index] = CELL_EMPTY
+        cells[j] = tile
+    return False
+
+def playable_shuffle(cells, width, height, rng):
+    """Rearrange a board's tiles so it has no match and at least one move, as far as its tiles allow
+
+    A move is planted first: three of the most plentiful fruit, two in a
+    line and one beside the cell that completes it. The rest of the cells
+    are filled in reading order with tiles drawn at random from those left,
+    passing over any fruit that would complete a run. When every tile left
+    would, the cell trades with an earlier one. Each cell costs at most one
+    pass over the board, with no retries, so the time stays bounded on
+    large boards. A board whose tiles cannot avoid a run, such as one that
+    is nearly all one fruit, gets as close as it can.
+    """
+    result = bytearray(cells)
+    positions = [i for i, cell in enumerate(result) if is_swappable(cell)]
+    if not positions:
+        return result
+    counts = {}
+    for i in positions:
+        counts[result[i]] = counts.get(result[i], 0) + 1
+        result[i] = CELL_EMPTY
+
+    planted = set()
+    fruit = max((cell for cell in counts if is_matchable(cell)), key=lambda cell: counts[cell], default=None)
+    move = plant_move(result, positions, width, height, rng) if fruit is not None and counts[fruit] >= 3 else None
+    if move is not None:
+        p, line = move
+        for i in (p, *line):
+            result[i] = fruit
+            planted.add(i)
+        counts[fruit] -= 3
+
+    placed = []
+    for i in positions:
+        if i in planted:
+            continue
+        y, x = divmod(i, width)
+        allowed = [cell for cell, n in counts.items()
+                   if n and not (is_matchable(cell) and completes_run(result, width, height, x, y, cell))]
+        if allowed:
+            result[i] = draw_tile(counts, allowed, rng)
+        elif not trade_tile(result, counts, placed, i, width, height):
+            result[i] = draw_tile(counts, [cell for cell, n in counts.items() if n], rng)
+        placed.append(i)
+    return result
+
+def new_move_stats():
+    """Counters for one move, the same ones Game.new_move_stats tracks plus cells cleared"""
+    return {'score_delta': 0, 'cascade_depth': 0, 'specials_created': 0, 'specials_triggered': 0, 'cleared': 0}
+
+class GameState:
+    """A level in play without sprites, drawing or timing
+
+    Moves follow Game.try_swap, activate_special_effects and process_matches:
+    special tiles activate when swapped, each cascade scores MATCH_POINTS per
+    cleared tile times the combo multiplier, runs of 4 and 5+ leave a rocket
+    or lightning tile, and the board shuffles when no move is left.
+    """
+
+    def __init__(self, cells, target_score=3000, moves_left=20, rng=None, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.cells = bytearray(cells)
+        self.width = width
+        self.height = height
+        self.segments = column_segments(self.cells, width, height)
+        self.target_score = target_score
+        self.moves_left = moves_left
+        self.score = 0
+        self.moves_made = 0
+        self.combo_multiplier = 1
+        self.rng = rng or random.Random()
+
+    def copy(self, rng=None):
+        """Independent copy for trying moves; shares nothing but the segments
+
+        Without an rng the copy continues this state's random sequence, so it
+        sees the same refills; bots pass their own rng so they cannot.
+        """
+        state = GameState.__new__(GameState)
+        state.__dict__.update(self.__dict__)
+        state.cells = bytearray(self.cells)
+        if rng is None:
+            rng = random.Random()
+            rng.setstate(self.rng.getstate())
+        state.rng = rng
+        return state
+
+    def valid_moves(self):
+        """Every legal swap on the current board"""
+        return find_valid_moves(self.cells, self.width, self.height)
+
+    def outcome(self):
+        """'win', 'loss', or None while the level is still being played"""
+        if self.score >= self.target_score:
+            return 'win'
+        if self.moves_left <= 0:
+            return 'loss'
+        return None
+
+    def play(self, pos1, pos2):
+        """Make a move and resolve its cascades, returning its stats, or None if the swap is illegal"""
+        stats = new_move_stats()
+        if not self.try_swap(pos1, pos2, stats):
+            return None
+        self.moves_left -= 1
+        self.moves_made += 1
+        self.combo_multiplier = 1
+        self.resolve_cascades(stats)
+        return stats
+
+    def try_swap(self, pos1, pos2, stats):
+        """Swap two cells or activate a special tile, as Game.try_swap does"""
+        (x1, y1), (x2, y2) = pos1, pos2
+        if abs(x1 - x2) + abs(y1 - y2) != 1:
+            return False
+
+        for x, y in (pos1, pos2):
+            cell = self.cells[y * self.width + x]
+            if is_swappable(cell) and not is_matchable(cell):
+                affected = self.activate_special(x, y, cell)
+                if affected:
+                    stats['specials_triggered'] += 1
+                    self.clear_special(affected, stats)
+                    return True
+
+        a, b = y1 * self.width + x1, y2 * self.width + x2
+        if not is_swappable(self.cells[a]) or not is_swappable(self.cells[b]):
+            return False
+        self.cells[a], self.cells[b] = self.cells[b], self.cells[a]
+        if find_match_groups(self.cells, self.width, self.height):
+            return True
+        self.cells[a], self.cells[b] = self.cells[b], self.cells[a]
+        return False
+
+    def activate_special(self, x, y, special_type):
+        """Cells a special tile clears, as Board.activate_special_tile picks them"""
+        if special_type == SPECIAL_TILE_ROCKET:
+            return [(i, y) for i in range(self.width)] + [(x, i) for i in range(self.height)]
+        if special_type == SPECIAL_TILE_LIGHTNING:
+            target_color = self.rng.randint(0, len(FRUIT_IMAGES) - 1)
+            return [(i % self.width, i // self.width) for i, cell in enumerate(self.cells) if cell == target_color]
+        if special_type == SPECIAL_TILE_BOMB:
+            return [(x + dx, y + dy) for dy in range(-1, 2) for dx in range(-1, 2)
+                    if 0 <= x + dx < self.width and 0 <= y + dy < self.height]
+        return []
+
+    def clear_special(self, affected, stats):
+        """Remove a special tile's cells and score SPECIAL_POINTS each, then cascade"""
+        removed = 0
+        for x, y in set(affected):
+            index = y * self.width + x
+            if is_swappable(self.cells[index]):
+                self.cells[index] = CELL_EMPTY
+                removed += 1
+        points = removed * SPECIAL_POINTS * self.combo_multiplier
+        self.score += points
+        stats['score_delta'] += points
+        stats['cleared'] += removed
+        self.apply_gravity()
+        self.refill()
+        self.resolve_cascades(stats)
+
+    def resolve_cascades(self, stats):
+        """Clear matches, drop and refill until the board settles"""
+        while True:
+            groups = find_match_groups(self.cells, self.width, self.height)
+            if not groups:
+                break
+
+            specials = []
+            for group in groups:
+                if group['count'] == 4:
+                    specials.append((group['center'], SPECIAL_TILE_ROCKET))
+                elif group['count'] >= 5:
+                    specials.append((group['center'], SPECIAL_TILE_LIGHTNING))
+            stats['cascade_depth'] += 1
+            stats['specials_created'] += len(specials)
+
+            matched = set()
+            for group in groups:
+                matched.update(group['matches'])
+            for x, y in matched:
+                self.cells[y * self.width + x] = CELL_EMPTY
+            points = len(matched) * MATCH_POINTS * self.combo_multiplier
+            self.score += points
+            stats['score_delta'] += points
+            stats['cleared'] += len(matched)
+            self.combo_multiplier += 1
+
+            self.apply_gravity()
+            self.refill()
+            for (x, y), special_type in specials:
+                self.cells[y * self.width + x] = special_type
+
+    def apply_gravity(self):
+        """Settle every segment's tiles onto its floor"""
+        cells, width = self.cells, self.width
+        for x, top, bottom in self.segments:
+            column = [cells[y * width + x] for y in range(top, bottom) if cells[y * width + x] != CELL_EMPTY]
+            empty = bottom - top - len(column)
+            for i, y in enumerate(range(top, bottom)):
+                cells[y * width + x] = CELL_EMPTY if i < empty else column[i - empty]
+
+    def refill(self):
+        """Fill empty cells with random fruit"""
+        last_type = len(FRUIT_IMAGES) - 1
+        for i, cell in enumerate(self.cells):
+            if cell == CELL_EMPTY:
+                self.cells[i] = self.rng.randint(0, last_type)
+
+    def shuffle(self):
+        """Rearrange the tiles into a board with a move and no match, as Board.shuffle_board does"""
+        self.cells = playable_shuffle(self.cells, self.width, self.height, self.rng)
@@ -9,28 +9,50 @@ from level_manager import LevelManager
 from database import Database
 from sound_manager import SoundManager
 from effects import Effects
+from preloader import Preloader
+from persistence import PersistenceQueue
+from telemetry import Telemetry
+from save_state import SaveState
+from hints import HintEngine
+from replay import Replay, OUTCOME_UNFINISHED, OUTCOME_WIN, OUTCOME_LOSS
+from attract_mode import AttractMode
+from utils.profiler import BackgroundLoader, startup_trace
+from utils.helpers import get_font, render_text
 
 class Game:
     def __init__(self, screen):
         self.screen = screen
         self.clock = pygame.time.Clock()
-        self.board = Board()
         self.state = MENU
         self.score = 0
         self.moves_left = 20
         self.level = 1
         self.target_score = 3000
+        self.profile_id = DEFAULT_PROFILE_ID  # Whose progress and leaderboard entries results go to
+        
+        # Saves are only ever enqueued from the game loop; a writer thread commits them
+        self.persistence = PersistenceQueue(lambda: self.db)
+        self.telemetry = Telemetry(self.persistence)
+        
+        # Audio and the database are slow to set up, so build them off the main thread
+        self._db_loader = BackgroundLoader("database", self.create_database, startup_trace)
+        self._sound_loader = BackgroundLoader("sound", self.create_sound_manager, startup_trace)
         
         # Initialize managers
-        self.level_manager = LevelManager()
-        self.db = Database()
-        self.sound_manager = SoundManager()
-        self.effects = Effects()
+        with startup_trace.phase("board"):
+            self.board = Board()
+        with startup_trace.phase("level manager"):
+            self.level_manager = LevelManager()
+        with startup_trace.phase("effects"):
+            self.effects = Effects()
         
-        # Initialize UI components
-        self.intro_screen = IntroScreen(self.screen)
-        self.pause_menu = PauseMenu(self.screen)
-        self.hud = HUD(self.screen)
+        # Only the intro screen is needed for the first frame; the rest is built on first use
+        with startup_trace.phase("intro screen"):
+            self.intro_screen = IntroScreen(self.screen)
+        self._pause_menu = None
+        self._hud = None
+        self.attract = None  # Started behind the menu once preloading is done
+        self.soak_test = False  # Have attract mode print soak test statistics
         
         # Game state
         self.selected_tile = None
@@ -39,12 +61,72 @@ class Game:
         self.is_swiping = False
         self.swipe_start_pos = None
         self.boost_multiplier = 1.5
+        self.settled_version = None  # Board version last checked for leftover matches
+        
+        # Hints are ranked in a worker process; update() shows one once it is ready
+        self.hints = HintEngine()
+        self.hint_pending = False
+        self.hint_version = None  # Board version the highlighted hint was worked out for
+        self.autoplay = False  # Let the AI make the moves, for demos and level testing
         
-        # Load level data
-        self.load_level(1)
+        # Every level is recorded from its board seed so it can be played back exactly
+        self.frame = 0  # update() calls since the level started
+        self.replay = None  # Replay of the level being played, saved when it ends
+        self.playback = None  # Replay being played back instead of taking input
+        self.playback_events = []
+        self.playback_result = None  # (score, outcome) the playback ended with
+        
+        # Per-level statistics recorded when the level ends
+        self.matches_made = 0
+        self.moves_made = 0
+        self.level_start_ticks = pygame.time.get_ticks()
+        self.last_move_ticks = self.level_start_ticks
+        self.move_stats = self.new_move_stats()
+        
+        # Prepare level 1 on worker threads while the menu animates
+        self.preloader = Preloader(self.level_manager)
+        self.preloader.start(1)
+    
+    def create_database(self):
+        """Open the database and batch its setting writes through the persistence queue"""
+        db = Database()
+        db.set_setting_writer(self.persistence)
+        return db
+    
+    def create_sound_manager(self):
+        """Build the sound manager and have it follow the stored audio settings"""
+        sound_manager = SoundManager()
+        sound_manager.bind_settings(self.db)
+        return sound_manager
+    
+    @property
+    def db(self):
+        """Database, waiting for background initialization if needed"""
+        return self._db_loader.get()
+    
+    @property
+    def sound_manager(self):
+        """Sound manager, waiting for background initialization if needed"""
+        return self._sound_loader.get()
+    
+    @property
+    def pause_menu(self):
+        """Pause menu, created the first time the game is paused"""
+        if self._pause_menu is None:
+            with startup_trace.phase("pause menu"):
+                self._pause_menu = PauseMenu(self.screen)
+        return self._pause_menu
+    
+    @property
+    def hud(self):
+        """HUD, created the first time it is drawn"""
+        if self._hud is None:
+            with startup_trace.phase("hud"):
+                self._hud = HUD(self.screen)
+        return self._hud
         
-    def load_level(self, level_num):
-        """Load a specific level"""
+    def load_level(self, level_num, seed=None):
+        """Load a specific level; with the seed of an earlier game (board.rng.seed), replay its randomness"""
         level_data = self.level_manager.load_level(level_num)
         if level_data:
             self.level = level_data.get('level', 1)
@@ -52,7 +134,99 @@ class Game:
             self.moves_left = level_data.get('moves', 20)
             self.score = 0
             self.combo_multiplier = 1
-            self.board.initialize()
+            self.matches_made = 0
+            self.moves_made = 0
+            self.level_start_ticks = pygame.time.get_ticks()
+            self.last_move_ticks = self.level_start_ticks
+            self.frame = 0
+            
+            # Use the board the preloader built in the background when it is ready
+            board = self.preloader.take_board(level_num) if seed is None else None
+            if board:
+                self.board = board
+            else:
+                self.board.initialize(self.level_manager.get_compiled_level(level_num), seed)
+            # Playing a replay back records nothing and leaves the player's save alone
+            recording = REPLAY_RECORDING and self.playback is None
+            self.replay = Replay(self.level, self.board.rng.seed) if recording else None
+            
+            # Have restarts and the next level ready before they are needed
+            self.preloader.prepare_board(level_num)
+            self.preloader.prepare_board(level_num + 1)
+            self.autosave()
+    
+    def autosave(self):
+        """Queue a snapshot of the level in progress; packing it takes well under a millisecond"""
+        if self.playback is not None:
+            return
+        self.persistence.save_state(SaveState.capture(self).to_bytes(), self.profile_id)
+    
+    def resume_saved_level(self):
+        """Restore the profile's level in progress, returning False if there is none"""
+        self.persistence.flush(wait=True)  # A save from earlier this session may still be queued
+        data = self.db.load_state(self.profile_id)
+        if not data:
+            return False
+        try:
+            state = SaveState.from_bytes(data)
+        except ValueError as e:
+            print(f"Discarding save state: {e}")
+            self.persistence.clear_state(self.profile_id)
+            return False
+        
+        state.apply(self)
+        self.replay = None  # The board's seed no longer leads to this position
+        self.preloader.prepare_board(self.level)
+        self.preloader.prepare_board(self.level + 1)
+        return True
+        
+    def start_playback(self, replay):
+        """Start a level from a replay's seed and play its swaps on the frames they were made"""
+        self.playback = replay  # Set first, so loading the level neither autosaves nor starts a recording
+        self.load_level(replay.level, replay.seed)
+        self.playback_events = list(reversed(replay.events))
+        self.playback_result = None
+        self.autoplay = False
+        self.state = PLAYING
+    
+    def play_replay_events(self):
+        """Make the replay's swaps that are due on this frame"""
+        if not self.playback_events:
+            # Not until the frame after the last swap, whose check for leftover matches can still score
+            if self.playback_result is None:
+                self.finish_playback(OUTCOME_UNFINISHED)
+            return
+        while (self.playback_events and self.playback_events[-1][0] <= self.frame and
+               self.playback_result is None):
+            _, pos1, pos2 = self.playback_events.pop()
+            self.make_move(pos1, pos2)
+    
+    def finish_playback(self, outcome):
+        """Note the score and outcome playback ended with; playback.matches() checks them"""
+        self.playback_result = (int(self.score), outcome)
+    
+    def save_replay(self):
+        """Write the level's replay out, as it stands, if any swap was made"""
+        if self.replay is None or not self.replay.events:
+            return
+        try:
+            self.replay.save()
+        except OSError as e:
+            print(f"Error saving replay: {e}")
+    
+    def shutdown(self):
+        """Release resources explicitly before pygame quits"""
+        if self.state in (PLAYING, PAUSED) and self.replay is not None:
+            self.replay.finish(self.score, OUTCOME_UNFINISHED)
+            self.save_replay()
+        self.preloader.shutdown()
+        self.hints.shutdown()
+        self.telemetry.flush()
+        self.persistence.close()
+        try:
+            self.db.close()
+        except Exception as e:
+            print(f"Error closing database: {e}")
         
     def handle_event(self, event):
         """Handle game events"""
@@ -60,7 +234,8 @@ class Game:
             result = self.intro_screen.handle_event(event)
             if result == "start":
                 self.state = PLAYING
-                self.load_level(1)
+                if not self.resume_saved_level():
+                    self.load_level(1)
             elif result == "quit":
                 return False
                 
@@ -68,12 +243,15 @@ class Game:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     self.state = PAUSED
-                elif event.key == pygame.K_r:
+                elif event.key == pygame.K_r and self.playback is None:
                     self.load_level(self.level)  # Restart level
                 elif event.key == pygame.K_h:
                     self.show_hint()
+                elif event.key == pygame.K_a and self.playback is None:
+                    self.autoplay = not self.autoplay
                     
-            elif event.type == pygame.MOUSEBUTTONDOWN and not self.processing_matches:
+            elif (event.type == pygame.MOUSEBUTTONDOWN and not self.processing_matches and
+                  self.playback is None):
                 self.is_swiping = True
                 self.swipe_start_pos = event.pos
             elif event.type == pygame.MOUSEBUTTONUP and self.is_swiping:
@@ -131,12 +309,14 @@ class Game:
         if tile1 and tile1.is_special_tile():
             affected_positions = self.board.activate_special_tile(x1, y1)
             if affected_positions:
+                self.move_stats['specials_triggered'] += 1
                 self.activate_special_effects(affected_positions, tile1.get_special_type())
                 return True
         
         if tile2 and tile2.is_special_tile():
             affected_positions = self.board.activate_special_tile(x2, y2)
             if affected_positions:
+                self.move_stats['specials_triggered'] += 1
                 self.activate_special_effects(affected_positions, tile2.get_special_type())
                 return True
             
@@ -177,8 +357,9 @@ class Game:
                 removed_count += 1
         
         # Add score for special tile activation
-        points = removed_count * 20 * self.combo_multiplier  # Higher points for special tiles
+        points = removed_count * SPECIAL_POINTS * self.combo_multiplier  # Higher points for special tiles
         self.score += points
+        self.move_stats['score_delta'] += points
         
         # Show score popup
         if removed_count > 0:
@@ -203,15 +384,20 @@ class Game:
             if not matches:
                 break
             
+            self.matches_made += len(match_groups)
+            
             # Create special tiles for 4+ matches before removing tiles
             special_tiles = self.board.create_special_tiles(match_groups)
+            self.move_stats['cascade_depth'] += 1
+            self.move_stats['specials_created'] += len(special_tiles)
             
             # Remove matches and update score
             removed_count = self.board.remove_matches(matches)
-            points = removed_count * 10 * self.combo_multiplier
+            points = removed_count * MATCH_POINTS * self.combo_multiplier
             if self.is_swiping:
                 points *= self.boost_multiplier
             self.score += points
+            self.move_stats['score_delta'] += points
             
             # Add visual effects for matches
             for match_pos in matches:
@@ -270,32 +456,101 @@ class Game:
     
     def check_game_state(self):
         """Check if game is won, lost, or continues"""
-        if self.score >= self.target_score:
+        if self.playback is not None and (self.score >= self.target_score or self.moves_left <= 0):
+            # Playback ends with the level: no telemetry, progress, next level or change to the save
+            self.finish_playback(OUTCOME_WIN if self.score >= self.target_score else OUTCOME_LOSS)
+            
+        elif self.score >= self.target_score:
             # Level completed
+            self.telemetry.record('level_end', self.level, self.moves_made, self.score, outcome='win')
+            self.record_level_result(self.level, completed=True)
             self.level += 1
             if self.level_manager.has_level(self.level):
                 self.load_level(self.level)
             else:
                 # Game completed
                 self.state = GAME_OVER
+                self.persistence.clear_state(self.profile_id)
                 
         elif self.moves_left <= 0:
             # Game over
+            self.telemetry.record('level_end', self.level, self.moves_made, self.score, outcome='loss')
+            self.record_level_result(self.level, completed=False)
             self.state = GAME_OVER
+            self.persistence.clear_state(self.profile_id)
             
         elif not self.board.has_possible_moves():
             # No moves available, shuffle board
             self.board.shuffle_board()
     
+    def calculate_stars(self):
+        """Stars for a completed level: 1 at the target, 2 at 1.5x, 3 at 2x"""
+        stars = 1
+        if self.score >= self.target_score * 1.5:
+            stars += 1
+        if self.score >= self.target_score * 2:
+            stars += 1
+        return stars
+    
+    def record_level_result(self, level, completed):
+        """Queue the result of a finished level without waiting on disk"""
+        outcome = OUTCOME_WIN if completed else OUTCOME_LOSS
+        if self.replay is not None:
+            self.replay.finish(self.score, outcome)
+            self.save_replay()
+            if SCORE_VERIFICATION:
+                self.persistence.submit_replay(self.replay.to_bytes(), level, int(self.score), self.profile_id)
+        
+        stars = self.calculate_stars() if completed else 0
+        play_time = (pygame.time.get_ticks() - self.level_start_ticks) // 1000
+        if SCORE_VERIFICATION:
+            # Only the attempt is counted here: the best score, completion and stars are written by
+            # verify_replays.py once it has played the replay back
+            if self.replay is None:
+                print(f"Level {level} was resumed from a save, so its result has no replay to verify; "
+                      f"only the attempt is recorded")
+            self.persistence.save_level_progress(level, 0, None, None, self.profile_id)
+        else:
+            self.persistence.save_level_progress(level, int(self.score), completed, stars, self.profile_id)
+        self.persistence.update_game_stats(int(self.score), self.matches_made, self.moves_made, play_time,
+                                           self.profile_id)
+        self.telemetry.flush()
+        self.persistence.flush()
+    
+    def new_move_stats(self):
+        """Counters filled in by try_swap and process_matches during one move"""
+        return {'score_delta': 0, 'cascade_depth': 0, 'specials_created': 0, 'specials_triggered': 0}
+    
     def show_hint(self):
-        """Show a hint for possible moves"""
-        possible_moves = self.board.get_possible_moves()
-        if possible_moves:
-            # Highlight first possible move
-            move = possible_moves[0]
-            pos1, pos2 = move
-            # Could implement visual hint here
-            print(f"Hint: Try swapping tiles at {pos1} and {pos2}")
+        """Ask for the best move on the current board; update() highlights it when it is ranked"""
+        if self.processing_matches:
+            return
+        self.hints.request(self.board, self.moves_left, self.target_score)
+        self.hint_pending = True
+    
+    def update_hint(self):
+        """Show a ranked hint once it arrives, or play it in autoplay, and drop it when the board changes"""
+        if (self.autoplay and not self.hint_pending and not self.board.animation_in_progress and
+                pygame.time.get_ticks() - self.last_move_ticks >= AUTOPLAY_MOVE_DELAY):
+            self.show_hint()
+        
+        if self.hint_pending:
+            if self.hints.version != self.board.version:
+                self.hints.cancel()  # The board moved on before the ranking finished
+                self.hint_pending = False
+            else:
+                ranking = self.hints.result(self.board.version)
+                if ranking is not None:
+                    self.hint_pending = False
+                    if ranking and self.autoplay:
+                        self.make_move(*ranking[0][0])
+                    elif ranking:
+                        self.effects.add_hint(*ranking[0][0])
+                        self.hint_version = self.board.version
+        
+        if self.hint_version is not None and self.hint_version != self.board.version:
+            self.effects.clear_hints()
+            self.hint_version = None
     
     def handle_swipe(self, start_pos, end_pos):
         """Handle a swipe gesture to swap tiles with improved detection."""
@@ -338,15 +593,36 @@ class Game:
 
         # Visual feedback for swipe
         self.show_swipe_feedback(start_pos, end_pos)
+        self.make_move((start_grid_x, start_grid_y), (end_grid_x, end_grid_y))
+
+    def make_move(self, pos1, pos2):
+        """Play a swap, whether from a swipe or from autoplay, and record it"""
+        # Time the player took to make this move
+        now = pygame.time.get_ticks()
+        think_time = now - self.last_move_ticks
+        self.last_move_ticks = now
+        self.move_stats = self.new_move_stats()
+        level = self.level
+        if self.replay is not None:
+            self.replay.record(self.frame, pos1, pos2)
 
         # Try to perform the swap
-        if self.try_swap((start_grid_x, start_grid_y), (end_grid_x, end_grid_y)):
+        if self.try_swap(pos1, pos2):
             self.moves_left -= 1
+            self.moves_made += 1
             self.combo_multiplier = 1
             self.process_matches()
+            if self.state == PLAYING:
+                self.autosave()
+            if self.playback is None:
+                self.telemetry.record('swap', level, self.moves_made, self.move_stats['score_delta'],
+                                      self.move_stats['cascade_depth'], self.move_stats['specials_created'],
+                                      self.move_stats['specials_triggered'], think_time)
         else:
             # Show invalid move feedback
-            self.show_invalid_move_feedback((start_grid_x, start_grid_y), (end_grid_x, end_grid_y))
+            if self.playback is None:
+                self.telemetry.record('invalid_swap', level, self.moves_made, duration_ms=think_time)
+            self.show_invalid_move_feedback(pos1, pos2)
 
     def show_swipe_feedback(self, start_pos, end_pos):
         """Show visual feedback for swipe gesture"""
@@ -366,24 +642,46 @@ class Game:
 
     def update(self):
         """Update game state"""
+        if self.state == MENU and ATTRACT_MODE:
+            self.update_attract()
+        
         if self.state == PLAYING and not self.processing_matches:
+            self.frame += 1
             self.board.update()
-            
-            # Check for automatic matches (shouldn't happen in match-3)
-            if not self.processing_matches:
-                matches = self.board.check_matches()
-                if matches:
-                    self.process_matches()
+            self.settle_board()
+            if self.playback is not None and self.playback_result is None:
+                self.play_replay_events()
+            self.update_hint()
         
         # Always update effects
         self.effects.update()
+        self.telemetry.update()
+    
+    def settle_board(self):
+        """Clear matches left on the board (only a shuffle makes them), once per board change"""
+        if self.board.version != self.settled_version:
+            matches, _ = self.board.check_matches()
+            self.settled_version = self.board.version
+            if matches:
+                self.process_matches()
+    
+    def update_attract(self):
+        """Run attract mode behind the menu, starting it once its tiles and levels are loaded"""
+        if self.attract is None:
+            if not self.preloader.is_done():
+                return
+            with startup_trace.phase("attract mode"):
+                self.attract = AttractMode(self.level_manager)
+            self.attract.soak = self.soak_test
+            self.intro_screen.attract = self.attract
+        self.attract.update()
     
     def draw(self):
         """Draw the game"""
         self.screen.fill(BLACK)
         
         if self.state == MENU:
-            self.intro_screen.draw()
+            self.intro_screen.draw(self.preloader.progress())
             
         elif self.state == PLAYING:
             self.board.draw(self.screen)
@@ -411,23 +709,20 @@ class Game:
         self.screen.blit(overlay, (0, 0))
         
         # Game over text
-        font = pygame.font.Font(None, 72)
         if self.score >= self.target_score:
-            text = font.render("LEVEL COMPLETE!", True, GREEN)
+            text = render_text(72, "LEVEL COMPLETE!", GREEN)
         else:
-            text = font.render("GAME OVER", True, RED)
+            text = render_text(72, "GAME OVER", RED)
         
         text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50))
         self.screen.blit(text, text_rect)
         
         # Score text
-        score_font = pygame.font.Font(None, 36)
-        score_text = score_font.render(f"Final Score: {self.score}", True, WHITE)
+        score_text = get_font(36).render(f"Final Score: {self.score}", True, WHITE)
         score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(score_text, score_rect)
         
         # Instructions
-        inst_font = pygame.font.Font(None, 24)
-        inst_text = inst_font.render("Press R to restart, ESC for menu", True, WHITE)
+        inst_text = render_text(24, "Press R to restart, ESC for menu", WHITE)
         inst_rect = inst_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 50))
         self.screen.blit(inst_text, inst_rect)
@@ -0,0 +1,36 @@
+from analysis_worker import AnalysisWorker
+
+class HintEngine:
+    """Ranks a board's moves with the AI in the analysis worker process, keyed by the board's version
+
+    Asking again for an unchanged board reuses the ranking; the worker keeps
+    its transposition table between requests. Rankings cover the best
+    ANALYSIS_RESULT_MOVES moves.
+    """
+
+    def __init__(self, worker=None):
+        self.worker = worker or AnalysisWorker()
+        self.version = None
+
+    def request(self, board, moves_left, target_score):
+        """Start ranking the board's moves unless this version is already ranked or in progress"""
+        if self.version == board.version:
+            return
+        self.version = board.version
+        self.worker.submit(board.version, board.get_cells(), moves_left, target_score)
+
+    def cancel(self):
+        """Abandon the ranking in progress, e.g. because the board changed"""
+        if self.version is not None:
+            self.worker.cancel(self.version)
+            self.version = None
+
+    def result(self, version):
+        """The ranking for a board version, or None while it is still being worked out"""
+        if self.version != version:
+            return None
+        return self.worker.poll(version)
+
+    def shutdown(self):
+        """Stop the worker process"""
+        self.worker.close()
@@ -0,0 +1,127 @@
+import random
+import struct
+from config import *
+from engine import find_match_groups, find_valid_moves
+
+COMPILED_HEADER = struct.Struct("<BBH")  # width, height, number of initial moves
+COMPILED_MOVE = struct.Struct("<BBBB")  # x1, y1, x2, y2
+
+# Retries when filling a partial board happens to leave no valid move
+FILL_ATTEMPTS = 100
+
+class LevelError(ValueError):
+    """A level definition that breaks the board rules"""
+
+class CompiledLevel:
+    """A validated starting board with the data the game needs to start it without checks
+
+    cells uses the Board.get_cells() layout; obstacle_mask has a 1 for every
+    blocked cell; moves lists the swaps that are legal on the starting board.
+    """
+
+    def __init__(self, cells, moves, width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.cells = cells
+        self.moves = moves
+        self.width = width
+        self.height = height
+        self.obstacle_mask = bytes(1 if cell == CELL_OBSTACLE else 0 for cell in cells)
+
+    def to_bytes(self):
+        """Pack into the form stored in the level pack"""
+        return (COMPILED_HEADER.pack(self.width, self.height, len(self.moves)) + bytes(self.cells) +
+                b"".join(COMPILED_MOVE.pack(x1, y1, x2, y2) for (x1, y1), (x2, y2) in self.moves))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Unpack the output of to_bytes; nothing is validated or recomputed"""
+        width, height, move_count = COMPILED_HEADER.unpack_from(data)
+        start = COMPILED_HEADER.size
+        cells = bytes(data[start:start + width * height])
+        start += width * height
+        moves = [((x1, y1), (x2, y2)) for x1, y1, x2, y2 in
+                 COMPILED_MOVE.iter_unpack(data[start:start + move_count * COMPILED_MOVE.size])]
+        return cls(cells, moves, width, height)
+
+def compile_level(level_data, level_num):
+    """Validate a level's board and obstacles and precompute its starting state
+
+    Returns None for levels without a layout, which get a random board each
+    time they are played. Authored rows fill the board from the top; any rows
+    left out are generated here, seeded by the level number, so the result
+    is the same on every build. Raises LevelError if the level is invalid.
+    """
+    if not isinstance(level_data.get('moves', 20), int) or level_data.get('moves', 20) <= 0:
+        raise LevelError(f"level {level_num}: moves must be a positive integer")
+    if not isinstance(level_data.get('target_score', 0), (int, float)) or level_data.get('target_score', 0) < 0:
+        raise LevelError(f"level {level_num}: target_score must be a non-negative number")
+
+    board = level_data.get('board')
+    obstacles = level_data.get('obstacles') or []
+    if board is None and not obstacles:
+        return None
+
+    cells = bytearray([CELL_EMPTY] * (BOARD_WIDTH * BOARD_HEIGHT))
+    for position in obstacles:
+        if not (isinstance(position, list) and len(position) == 2 and
+                0 <= position[0] < BOARD_WIDTH and 0 <= position[1] < BOARD_HEIGHT):
+            raise LevelError(f"level {level_num}: obstacle {position} is not an [x, y] on the board")
+        x, y = position
+        cells[y * BOARD_WIDTH + x] = CELL_OBSTACLE
+
+    rows = board or []
+    if len(rows) > BOARD_HEIGHT:
+        raise LevelError(f"level {level_num}: board has {len(rows)} rows, the game has {BOARD_HEIGHT}")
+    for y, row in enumerate(rows):
+        if len(row) != BOARD_WIDTH:
+            raise LevelError(f"level {level_num}: row {y} has {len(row)} cells, the game has {BOARD_WIDTH}")
+        for x, cell in enumerate(row):
+            blocked = cells[y * BOARD_WIDTH + x] == CELL_OBSTACLE
+            if cell is None:
+                if not blocked:
+                    raise LevelError(f"level {level_num}: empty cell ({x}, {y}) is not listed in obstacles")
+            elif blocked:
+                raise LevelError(f"level {level_num}: obstacle ({x}, {y}) also has a tile")
+            elif cell not in FRUIT_IMAGES and cell not in SPECIAL_TILES:
+                raise LevelError(f"level {level_num}: unknown tile type {cell} at ({x}, {y})")
+            else:
+                cells[y * BOARD_WIDTH + x] = cell
+
+    groups = find_match_groups(cells, BOARD_WIDTH, BOARD_HEIGHT)
+    if groups:
+        raise LevelError(f"level {level_num}: board starts with a match at {groups[0]['matches']}")
+
+    rng = random.Random(level_num)
+    for _ in range(FILL_ATTEMPTS):
+        filled = fill_missing_cells(cells, rng)
+        moves = find_valid_moves(filled, BOARD_WIDTH, BOARD_HEIGHT)
+        if moves:
+            return CompiledLevel(bytes(filled), moves)
+        if filled == cells:
+            break  # Fully authored, so retrying cannot help
+    raise LevelError(f"level {level_num}: board has no valid moves")
+
+def fill_missing_cells(cells, rng):
+    """Fill CELL_EMPTY squares with fruit that never completes a run of three"""
+    filled = bytearray(cells)
+    for y in range(BOARD_HEIGHT):
+        for x in range(BOARD_WIDTH):
+            index = y * BOARD_WIDTH + x
+            if filled[index] != CELL_EMPTY:
+                continue
+            forbidden = set()
+            # Any neighbouring pair this cell would extend to three, looking in all four directions
+            for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+                x1, y1, x2, y2 = x + dx, y + dy, x + 2 * dx, y + 2 * dy
+                if 0 <= x2 < BOARD_WIDTH and 0 <= y2 < BOARD_HEIGHT:
+                    first, second = filled[y1 * BOARD_WIDTH + x1], filled[y2 * BOARD_WIDTH + x2]
+                    if first == second:
+                        forbidden.add(first)
+            for dx, dy in ((1, 0), (0, 1)):
+                x1, y1, x2, y2 = x - dx, y - dy, x + dx, y + dy
+                if 0 <= x1 and 0 <= y1 and x2 < BOARD_WIDTH and y2 < BOARD_HEIGHT:
+                    first, second = filled[y1 * BOARD_WIDTH + x1], filled[y2 * BOARD_WIDTH + x2]
+                    if first == second:
+                        forbidden.add(first)
+            choices = [tile_type for tile_type in FRUIT_IMAGES if tile_type not in forbidden]
+            filled[index] = rng.choice(choices)
+    return filled
@@ -1,25 +1,46 @@
 import json
 import os
 from config import *
+from level_pack import LevelPack, find_level_files
+from level_compiler import LevelError, compile_level
 
 class LevelManager:
-    def __init__(self):
-        self.levels_dir = "levels"
+    def __init__(self, levels_dir=LEVELS_DIR, pack_path=LEVEL_PACK):
+        self.levels_dir = levels_dir
         self.current_level = 1
         self.levels_cache = {}
+        self.compiled_cache = {}
+        self.pack = self.open_pack(pack_path)
+        
+        # Without a built pack, index the loose source files once instead of probing per lookup
+        self.level_files = {} if self.pack is not None else find_level_files(self.levels_dir)
+    
+    def open_pack(self, pack_path):
+        """Map the compiled level pack, or return None to fall back to loose JSON"""
+        if not pack_path or not os.path.exists(pack_path):
+            return None
+        try:
+            return LevelPack(pack_path)
+        except (OSError, ValueError) as e:
+            print(f"Error opening level pack {pack_path}: {e}")
+            return None
         
     def load_level(self, level_num):
-        """Load level data from JSON file"""
+        """Load level data from the level pack or a loose JSON file"""
         if level_num in self.levels_cache:
             return self.levels_cache[level_num]
-            
-        level_file = os.path.join(self.levels_dir, f"level_{level_num}.json")
         
+        level_file = self.level_files.get(level_num)
         try:
-            with open(level_file, 'r') as f:
-                level_data = json.load(f)
-                self.levels_cache[level_num] = level_data
-                return level_data
+            if level_file:
+                with open(level_file, 'r') as f:
+                    level_data = json.load(f)
+            elif self.pack is not None and level_num in self.pack:
+                level_data = self.pack.read(level_num)
+            else:
+                raise FileNotFoundError(level_num)
+            self.levels_cache[level_num] = level_data
+            return level_data
         except FileNotFoundError:
             # Return default level data if file not found
             default_level = {
@@ -31,22 +52,36 @@ class LevelManager:
             }
             return default_level
         except json.JSONDecodeError:
-            print(f"Error parsing level file: {level_file}")
+            print(f"Error parsing level file: {level_file or self.pack.path}")
             return None
     
+    def get_compiled_level(self, level_num):
+        """Get a level's validated starting board, or None if it is played on a random board"""
+        if level_num in self.compiled_cache:
+            return self.compiled_cache[level_num]
+        
+        if self.pack is not None and level_num in self.pack and level_num not in self.level_files:
+            compiled = self.pack.read_compiled(level_num)
+        else:
+            # Loose sources are compiled on first use; packs were compiled by build_levels.py
+            level_data = self.load_level(level_num)
+            try:
+                compiled = compile_level(level_data, level_num) if level_data else None
+            except LevelError as e:
+                print(f"Invalid level, using a random board: {e}")
+                compiled = None
+        self.compiled_cache[level_num] = compiled
+        return compiled
+    
     def has_level(self, level_num):
         """Check if a level exists"""
-        level_file = os.path.join(self.levels_dir, f"level_{level_num}.json")
-        return os.path.exists(level_file) or level_num <= 10  # Support up to 10 levels
+        return (self.pack is not None and level_num in self.pack) or level_num in self.level_files
     
     def get_level_count(self):
         """Get the total number of available levels"""
-        count = 0
-        level_num = 1
-        while self.has_level(level_num):
-            count += 1
-            level_num += 1
-        return count
+        if self.pack is not None:
+            return len(self.pack) + sum(1 for level_num in self.level_files if level_num not in self.pack)
+        return len(self.level_files)
     
     def create_level_file(self, level_num, target_score, moves, objective="score"):
         """Create a new level file"""
@@ -63,6 +98,9 @@ class LevelManager:
         try:
             with open(level_file, 'w') as f:
                 json.dump(level_data, f, indent=4)
+            self.level_files[level_num] = level_file
+            self.levels_cache.pop(level_num, None)
+            self.compiled_cache.pop(level_num, None)
             return True
         except Exception as e:
             print(f"Error creating level file: {e}")
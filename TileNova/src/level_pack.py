@@ -0,0 +1,110 @@
+import json
+import mmap
+import os
+import re
+import struct
+from config import *
+from level_compiler import CompiledLevel, LevelError, compile_level
+
+PACK_MAGIC = b"TNLV"
+PACK_HEADER = struct.Struct("<4sHxxI")  # magic, version, level count
+PACK_ENTRY = struct.Struct("<IIIII")  # level number, JSON offset and length, compiled board offset and length
+
+LEVEL_FILE_PATTERN = re.compile(r"level_(\d+)\.json$")
+
+class LevelPack:
+    """Read-only, memory-mapped level archive
+
+    A pack is a header, an index entry per level sorted by level number,
+    then each level's compact JSON and its CompiledLevel bytes (empty for
+    levels with a random board). Opening a pack reads only the index; a
+    level is decoded the first time it is read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, count = PACK_HEADER.unpack_from(self.data)
+            if magic != PACK_MAGIC or version != LEVEL_PACK_VERSION:
+                raise ValueError(f"{path} is not a version {LEVEL_PACK_VERSION} level pack")
+            self.index = {}
+            for i in range(count):
+                entry = PACK_ENTRY.unpack_from(self.data, PACK_HEADER.size + i * PACK_ENTRY.size)
+                self.index[entry[0]] = entry[1:]
+        except (ValueError, struct.error):
+            self.close()
+            raise
+
+    def __contains__(self, level_num):
+        return level_num in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, level_num):
+        """Decode one level's data, or return None if the pack does not have it"""
+        entry = self.index.get(level_num)
+        if entry is None:
+            return None
+        offset, length = entry[:2]
+        return json.loads(self.data[offset:offset + length])
+
+    def read_compiled(self, level_num):
+        """Get a level's CompiledLevel, or None if it has no fixed layout"""
+        entry = self.index.get(level_num)
+        if entry is None or not entry[3]:
+            return None
+        offset, length = entry[2:]
+        return CompiledLevel.from_bytes(self.data[offset:offset + length])
+
+    def close(self):
+        """Unmap the archive and close its file"""
+        if getattr(self, 'data', None) is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+def find_level_files(levels_dir):
+    """Map level numbers to the loose level_N.json files in a directory"""
+    try:
+        names = os.listdir(levels_dir)
+    except FileNotFoundError:
+        return {}
+    files = {}
+    for name in names:
+        match = LEVEL_FILE_PATTERN.match(name)
+        if match:
+            files[int(match.group(1))] = os.path.join(levels_dir, name)
+    return files
+
+def build_level_pack(levels_dir=LEVELS_DIR, pack_path=LEVEL_PACK):
+    """Validate and compile every loose level file in a directory into one pack, returning the level count"""
+    payloads = []
+    for level_num, path in sorted(find_level_files(levels_dir).items()):
+        with open(path, 'r') as f:
+            try:
+                level_data = json.load(f)
+                compiled = compile_level(level_data, level_num)
+            except (json.JSONDecodeError, LevelError) as e:
+                raise ValueError(f"{path}: {e}") from None
+        payloads.append((level_num, json.dumps(level_data, separators=(',', ':')).encode('utf-8'),
+                         compiled.to_bytes() if compiled else b""))
+
+    offset = PACK_HEADER.size + len(payloads) * PACK_ENTRY.size
+    index = []
+    for level_num, payload, board in payloads:
+        index.append(PACK_ENTRY.pack(level_num, offset, len(payload), offset + len(payload), len(board)))
+        offset += len(payload) + len(board)
+
+    # Write beside the destination and swap it in so a running game never maps a half-written pack
+    temp_path = pack_path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, LEVEL_PACK_VERSION, len(payloads)))
+        f.writelines(index)
+        for _, payload, board in payloads:
+            f.write(payload)
+            f.write(board)
+    os.replace(temp_path, pack_path)
+    return len(payloads)
@@ -1,15 +1,27 @@
 # FILE: src/main.py
+import sys
 import pygame
 from config import *
+from utils.profiler import startup_trace
 from game import Game
 
 def main():
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("TileNova")
+    startup_trace.enabled = TRACE_STARTUP or "--trace-startup" in sys.argv
+    startup_trace.mark("imports done")
+
+    with startup_trace.phase("pygame.init"):
+        # Open the mixer with the game's format up front so SoundManager never has to re-open it
+        pygame.mixer.pre_init(frequency=22050, size=-16, channels=2, buffer=512)
+        pygame.init()
+    with startup_trace.phase("display"):
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        pygame.display.set_caption("TileNova")
     clock = pygame.time.Clock()
-    game = Game(screen)
+    with startup_trace.phase("Game.__init__"):
+        game = Game(screen)
+    game.soak_test = ATTRACT_SOAK or "--soak" in sys.argv
 
+    first_frame = True
     running = True
     while running:
         for event in pygame.event.get():
@@ -23,8 +35,12 @@ def main():
         game.update()
         game.draw()
         pygame.display.flip()
+        if first_frame:
+            startup_trace.mark("first frame")
+            first_frame = False
         clock.tick(FPS)
 
+    game.shutdown()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from config import *
+
+class PersistenceQueue:
+    """Write-behind layer: the game enqueues saves and a writer thread commits them in batches"""
+
+    def __init__(self, get_database, flush_interval=PERSIST_FLUSH_INTERVAL, max_pending=PERSIST_QUEUE_SIZE):
+        # get_database is called on the writer thread, so a slow database open never blocks the caller
+        self.get_database = get_database
+        self.flush_interval = flush_interval
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.closed = False
+        self.batches_written = 0
+        self.thread = threading.Thread(target=self.run, name="persistence-writer", daemon=True)
+        self.thread.start()
+
+    def enqueue(self, item):
+        """Hand an item to the writer thread"""
+        if self.closed:
+            return False
+        try:
+            self.pending.put_nowait(item)
+        except queue.Full:
+            # Only reached when the disk has stalled for a long time; apply backpressure
+            self.pending.put(item)
+        return True
+
+    def save_level_progress(self, level_id, score, completed=False, stars=0, profile_id=DEFAULT_PROFILE_ID):
+        """Queue a level result; completed and stars of None leave the recorded ones as they are"""
+        return self.enqueue(('level', profile_id, level_id, score, completed, stars))
+
+    def update_game_stats(self, score_gained=0, matches_made=0, moves_made=0, time_played=0,
+                          profile_id=DEFAULT_PROFILE_ID):
+        """Queue an increment of a profile's overall statistics"""
+        return self.enqueue(('stats', profile_id, score_gained, matches_made, moves_made, time_played))
+
+    def save_setting(self, key, value):
+        """Queue a setting change"""
+        return self.enqueue(('setting', key, value))
+
+    def save_state(self, data, profile_id=DEFAULT_PROFILE_ID):
+        """Queue a SaveState blob; only the newest per profile is written"""
+        return self.enqueue(('state', profile_id, data))
+
+    def clear_state(self, profile_id=DEFAULT_PROFILE_ID):
+        """Queue removal of a profile's save state"""
+        return self.enqueue(('state', profile_id, None))
+
+    def submit_replay(self, data, level_id, score, profile_id=DEFAULT_PROFILE_ID):
+        """Queue a finished level's Replay blob for score verification"""
+        return self.enqueue(('replay', profile_id, level_id, score, data))
+
+    def save_events(self, rows):
+        """Queue a block of telemetry rows for a bulk insert"""
+        return self.enqueue(('events', rows))
+
+    def rollup_events(self, retention_seconds):
+        """Queue a telemetry rollup and retention prune"""
+        return self.enqueue(('rollup', retention_seconds))
+
+    def flush(self, wait=False):
+        """Ask the writer to commit everything queued so far, optionally waiting for it"""
+        done = threading.Event()
+        if not self.enqueue(('flush', done)):
+            return True
+        if wait:
+            return done.wait(timeout=5.0)
+        return True
+
+    def close(self):
+        """Commit anything still queued and stop the writer thread"""
+        if self.closed:
+            return
+        done = threading.Event()
+        self.pending.put(('stop', done))
+        self.closed = True
+        self.thread.join(timeout=5.0)
+
+    def run(self):
+        """Writer loop: wait for work, drain the queue and write it as one transaction"""
+        running = True
+        while running:
+            try:
+                items = [self.pending.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            # Give more updates a moment to arrive so they share the transaction
+            items.extend(self.drain(items[0]))
+
+            events = []
+            for item in items:
+                if item[0] in ('flush', 'stop'):
+                    events.append(item[1])
+                if item[0] == 'stop':
+                    running = False
+
+            self.write_batch(items)
+            for event in events:
+                event.set()
+
+    def drain(self, first_item):
+        """Collect queued items until the flush interval ends or a flush is requested"""
+        items = []
+        deadline = time.monotonic() + self.flush_interval
+        flush_requested = first_item[0] in ('flush', 'stop')
+        while not flush_requested:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            flush_requested = item[0] in ('flush', 'stop')
+
+        # Pick up anything that is already waiting without blocking
+        while True:
+            try:
+                items.append(self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def merge(self, items):
+        """Collapse queued updates into one write per row"""
+        levels = {}
+        stats = {}
+        settings = {}
+        events = []
+        states = {}
+
+        for item in items:
+            kind = item[0]
+            if kind == 'level':
+                _, profile_id, level_id, score, completed, stars = item
+                key = (profile_id, level_id)
+                previous = levels.get(key)
+                attempts = previous['attempts'] + 1 if previous else 1
+                best = max(previous['score'], score) if previous else score
+                if completed is None and previous:
+                    completed, stars = previous['completed'], previous['stars']
+                levels[key] = {'score': best, 'completed': completed, 'stars': stars, 'attempts': attempts}
+            elif kind == 'stats':
+                totals = stats.setdefault(item[1], [0, 0, 0, 0, 0])
+                for i, value in enumerate(item[2:]):
+                    totals[i] += value
+                totals[4] += 1  # games played
+            elif kind == 'setting':
+                settings[item[1]] = item[2]
+            elif kind == 'events':
+                events.extend(item[1])
+            elif kind == 'state':
+                states[item[1]] = item[2]
+
+        return levels, stats, settings, events, states
+
+    def write_batch(self, items):
+        """Write merged updates in a single transaction"""
+        levels, stats, settings, events, states = self.merge(items)
+        rollups = [item[1] for item in items if item[0] == 'rollup']
+        replays = [item[1:] for item in items if item[0] == 'replay']
+        if not levels and not stats and not settings and not events and not states and not rollups and not replays:
+            return
+        try:
+            db = self.get_database()
+        except Exception as e:
+            print(f"Persistence error: database unavailable: {e}")
+            return
+        if levels or stats or settings or events or states:
+            if db.write_batch(levels, stats, settings, events, states):
+                self.batches_written += 1
+        if replays:
+            db.submit_replays(replays)
+        if rollups:
+            db.rollup_events(min(rollups))
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import *
+from board import Board
+from tile_atlas import get_tile_atlas
+from utils.helpers import get_font, render_text
+
+# Static HUD and menu text that is rendered every frame once play starts
+WARM_TEXT = [
+    (FONT_SIZE, "SCORE", YELLOW),
+    (FONT_SIZE, "TARGET", ORANGE),
+    (FONT_SIZE, "MOVES LEFT", LIGHT_GRAY),
+    (FONT_SIZE, "CONTROLS", CYAN),
+    (18, "Swipe", YELLOW),
+    (18, "ESC", YELLOW),
+    (18, "R", YELLOW),
+    (18, "H", YELLOW),
+    (18, "A", YELLOW),
+    (18, "- Move tiles", LIGHT_GRAY),
+    (18, "- Pause game", LIGHT_GRAY),
+    (18, "- Restart level", LIGHT_GRAY),
+    (18, "- Show hint", LIGHT_GRAY),
+    (18, "- Autoplay", LIGHT_GRAY),
+    (72, "LEVEL COMPLETE!", GREEN),
+    (72, "GAME OVER", RED),
+    (24, "Press R to restart, ESC for menu", WHITE),
+]
+
+class Preloader:
+    """Prepares tile images, level data, fonts and boards on worker threads"""
+
+    def __init__(self, level_manager, max_workers=2):
+        self.level_manager = level_manager
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="preload")
+        self.tasks = {}
+        self.boards = {}  # level number -> future building that level's board
+        self.lock = threading.Lock()
+
+    def start(self, first_level=1):
+        """Queue everything the first level needs while the menu is showing"""
+        self.submit("tile images", self.load_tile_images)
+        self.submit("levels", self.load_levels)
+        self.submit("fonts", self.warm_fonts)
+        self.prepare_board(first_level)
+
+    def submit(self, name, task, *args):
+        """Run a task on the worker pool and track it for progress reporting"""
+        future = self.executor.submit(task, *args)
+        with self.lock:
+            self.tasks[name] = future
+        return future
+
+    def load_tile_images(self):
+        """Decode and convert the tile atlas"""
+        get_tile_atlas().get_image(0)
+
+    def load_levels(self):
+        """Parse every level file into the level manager's cache"""
+        for level_num in range(1, self.level_manager.get_level_count() + 1):
+            self.level_manager.load_level(level_num)
+
+    def warm_fonts(self):
+        """Create fonts and render the static text drawn during play"""
+        for size in (FONT_SIZE, 18, 24, 32, 36, 48, 72):
+            get_font(size)
+        for size, text, color in WARM_TEXT:
+            render_text(size, text, color)
+
+    def build_board(self, level_num):
+        """Build a ready-to-play board for a level"""
+        board = Board()
+        board.initialize(self.level_manager.get_compiled_level(level_num))
+        return board
+
+    def prepare_board(self, level_num):
+        """Start building the board for a level unless one is already queued"""
+        with self.lock:
+            if level_num in self.boards:
+                return
+        future = self.submit(f"board {level_num}", self.build_board, level_num)
+        with self.lock:
+            self.boards[level_num] = future
+
+    def take_board(self, level_num):
+        """Return the prepared board for a level, or None if it is not ready yet"""
+        with self.lock:
+            future = self.boards.get(level_num)
+            if future is None or not future.done():
+                return None
+            del self.boards[level_num]
+        try:
+            return future.result()
+        except Exception as e:
+            print(f"Error preparing board for level {level_num}: {e}")
+            return None
+
+    def progress(self):
+        """Fraction of queued tasks that have finished (0.0 to 1.0)"""
+        with self.lock:
+            futures = list(self.tasks.values())
+        if not futures:
+            return 1.0
+        return sum(1 for future in futures if future.done()) / len(futures)
+
+    def is_done(self):
+        """Check whether every queued task has finished"""
+        return self.progress() >= 1.0
+
+    def shutdown(self):
+        """Stop accepting work and let running tasks finish in the background"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,102 @@
+import os
+import struct
+import zlib
+from config import *
+
+REPLAY_MAGIC = b"TNRP"
+
+# How a recording ended
+OUTCOME_UNFINISHED = 0  # Saved mid-level, e.g. when the game was closed
+OUTCOME_WIN = 1
+OUTCOME_LOSS = 2
+
+# magic, version, width, height, level, outcome, board seed, final score, event count
+REPLAY_HEADER = struct.Struct("<4sBBBxHBxQiI")
+REPLAY_EVENT = struct.Struct("<IHH")  # Frame, then the two swapped cells as y * width + x
+REPLAY_CHECKSUM = struct.Struct("<I")
+
+class Replay:
+    """A level played from its board seed, stored as the swaps made and the frames they were made on
+
+    Everything random in a level comes from the board's seeded stream, so
+    the seed, the level and the swaps in order are enough to play it again
+    exactly. The blob is the header above, eight bytes per swap and a CRC32,
+    laid out like SaveState. The frame is the Game.update() count since the
+    level started; a swap on frame n is played right after that update's
+    check for leftover matches.
+    """
+
+    def __init__(self, level, seed, events=None, outcome=OUTCOME_UNFINISHED, final_score=0,
+                 width=BOARD_WIDTH, height=BOARD_HEIGHT):
+        self.level = level
+        self.seed = seed
+        self.events = events if events is not None else []  # (frame, pos1, pos2)
+        self.outcome = outcome
+        self.final_score = final_score
+        self.width = width
+        self.height = height
+
+    def record(self, frame, pos1, pos2):
+        """Add a swap the player tried, whether or not it was legal"""
+        self.events.append((frame, pos1, pos2))
+
+    def finish(self, score, outcome):
+        """Note how the level ended, for playback to check against"""
+        self.final_score = int(score)
+        self.outcome = outcome
+
+    def matches(self, score, outcome):
+        """Check a playback's result against the recorded one"""
+        return int(score) == self.final_score and outcome == self.outcome
+
+    def file_name(self):
+        return f"level{self.level:03d}-{self.seed:016x}.tnr"
+
+    def save(self, directory=REPLAY_DIR):
+        """Write the replay into a directory and return its path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.file_name())
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+    def to_bytes(self):
+        """Pack the replay into its binary form"""
+        data = bytearray(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_FORMAT_VERSION, self.width, self.height,
+                                            self.level, self.outcome, self.seed, self.final_score,
+                                            len(self.events)))
+        for frame, (x1, y1), (x2, y2) in self.events:
+            data += REPLAY_EVENT.pack(frame, y1 * self.width + x1, y2 * self.width + x2)
+        return bytes(data) + REPLAY_CHECKSUM.pack(zlib.crc32(data))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Unpack a blob written by to_bytes, raising ValueError if it is damaged or from another version"""
+        if len(data) < REPLAY_HEADER.size + REPLAY_CHECKSUM.size:
+            raise ValueError("replay is truncated")
+        body = memoryview(data)[:-REPLAY_CHECKSUM.size]
+        (checksum,) = REPLAY_CHECKSUM.unpack_from(data, len(body))
+        if zlib.crc32(body) != checksum:
+            raise ValueError("replay checksum mismatch")
+
+        magic, version, width, height, level, outcome, seed, final_score, count = REPLAY_HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_FORMAT_VERSION:
+            raise ValueError("not a replay for this version")
+        if len(body) != REPLAY_HEADER.size + count * REPLAY_EVENT.size:
+            raise ValueError("replay length does not match its event count")
+        if not width or not height:
+            raise ValueError(f"replay board is {width}x{height}")
+        if outcome not in (OUTCOME_UNFINISHED, OUTCOME_WIN, OUTCOME_LOSS):
+            raise ValueError(f"replay has unknown outcome {outcome}")
+
+        events = []
+        for frame, first, second in REPLAY_EVENT.iter_unpack(body[REPLAY_HEADER.size:]):
+            if first >= width * height or second >= width * height:
+                raise ValueError(f"replay swap on frame {frame} is off the {width}x{height} board")
+            events.append((frame, (first % width, first // width), (second % width, second // width)))
+        return cls(level, seed, events, outcome, final_score, width, height)
@@ -0,0 +1,78 @@
+from config import *
+from board import Board
+from game import Game
+
+class Discard:
+    """Takes any method call and does nothing; stands in for effects, sound, telemetry and saving"""
+
+    def __getattr__(self, name):
+        return self.ignore
+
+    @staticmethod
+    def ignore(*args, **kwargs):
+        return None
+
+class ReplayGame(Game):
+    """Game's own move rules with no window, sound, effects or saving, for playing replays at full speed
+
+    Game.__init__ is skipped on purpose: it opens the database and audio and
+    starts the preloader threads and the hint worker process, none of which
+    playback needs. Swaps are made back to back without waiting for
+    animations or frames, with the same leftover-match check update() makes
+    between frames, so the result is the one the recorded game reached.
+    """
+
+    sound_manager = Discard()  # Shadow Game's lazily loaded properties
+    db = None
+
+    def __init__(self, level_manager):
+        self.screen = None
+        self.state = PLAYING
+        self.level_manager = level_manager
+        self.board = Board()
+        self.effects = Discard()
+        self.telemetry = Discard()
+        self.persistence = Discard()
+        self.preloader = Discard()
+        self.hints = Discard()
+        self.profile_id = DEFAULT_PROFILE_ID
+        self.score = 0
+        self.moves_left = 0
+        self.level = 1
+        self.target_score = 0
+        self.selected_tile = None
+        self.processing_matches = False
+        self.combo_multiplier = 1
+        self.is_swiping = False
+        self.boost_multiplier = 1.5
+        self.settled_version = None
+        self.autoplay = False
+        self.matches_made = 0
+        self.moves_made = 0
+        self.level_start_ticks = 0
+        self.last_move_ticks = 0
+        self.move_stats = self.new_move_stats()
+        self.frame = 0
+        self.replay = None
+        self.playback = None
+        self.playback_events = []
+        self.playback_result = None
+
+    def play(self, replay):
+        """Play a replay through and return the (score, outcome) it ends with"""
+        self.start_playback(replay)
+        while self.playback_result is None:
+            if self.playback_events:
+                self.frame = self.playback_events[-1][0]
+            self.settle_board()
+            self.play_replay_events()
+        return self.playback_result
+
+    def autosave(self):
+        pass
+
+    def wait_for_animations(self):
+        pass
+
+    def draw(self):
+        pass
@@ -0,0 +1,58 @@
+import random
+import secrets
+import numpy
+from config import *
+
+# Effects and menus draw from this, so cosmetic randomness never shifts a game's sequence
+cosmetic = random.Random()
+
+def new_seed():
+    """A fresh 64-bit game seed"""
+    return secrets.randbits(64)
+
+class GameRandom:
+    """Seedable random stream for one game's logic: starting tiles, refills, shuffles and lightning
+
+    Draws come from a buffer of raw 32-bit values that NumPy fills
+    RNG_BUFFER_SIZE at a time, so each draw is a list lookup and a modulo
+    instead of a call into the generator. Replaying the same calls with the
+    same seed reproduces the game exactly.
+    """
+
+    def __init__(self, seed=None, buffer_size=RNG_BUFFER_SIZE):
+        self.seed = new_seed() if seed is None else seed
+        self.generator = numpy.random.default_rng(self.seed)
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.index = 0
+
+    def raw(self):
+        """Next raw 32-bit value, refilling the buffer when it runs out"""
+        if self.index >= len(self.buffer):
+            self.buffer = self.generator.integers(0, 2 ** 32, self.buffer_size, dtype=numpy.uint32).tolist()
+            self.index = 0
+        value = self.buffer[self.index]
+        self.index += 1
+        return value
+
+    def below(self, n):
+        """Integer in [0, n); the modulo bias is negligible for the small n a board needs"""
+        return self.raw() % n
+
+    def tile_type(self):
+        """A random fruit type"""
+        return self.raw() % len(FRUIT_IMAGES)
+
+    def randint(self, a, b):
+        """Integer in [a, b], like random.randint"""
+        return a + self.below(b - a + 1)
+
+    def choice(self, items):
+        """A random element of a non-empty sequence"""
+        return items[self.below(len(items))]
+
+    def shuffle(self, items):
+        """Shuffle a list in place (Fisher-Yates)"""
+        for i in range(len(items) - 1, 0, -1):
+            j = self.below(i + 1)
+            items[i], items[j] = items[j], items[i]
@@ -0,0 +1,81 @@
+import struct
+import zlib
+import pygame
+from config import *
+
+SAVE_MAGIC = b"TNSV"
+
+# magic, version, width, height, level, moves left, score, target score,
+# combo multiplier, moves made, matches made, elapsed level time in ms
+SAVE_HEADER = struct.Struct("<4sBBBxHHiiHHII")
+SAVE_CHECKSUM = struct.Struct("<I")
+
+class SaveState:
+    """A level in progress packed into a small fixed-layout binary blob
+
+    The blob is the header above, one byte per board cell (the tile type,
+    CELL_EMPTY or CELL_OBSTACLE) and a CRC32 of everything before it, so a
+    save torn by a power cut is rejected instead of restored.
+    """
+
+    def __init__(self, level, score, moves_left, target_score, cells, width=BOARD_WIDTH, height=BOARD_HEIGHT,
+                 combo_multiplier=1, moves_made=0, matches_made=0, elapsed_ms=0):
+        self.level = level
+        self.score = score
+        self.moves_left = moves_left
+        self.target_score = target_score
+        self.cells = cells
+        self.width = width
+        self.height = height
+        self.combo_multiplier = combo_multiplier
+        self.moves_made = moves_made
+        self.matches_made = matches_made
+        self.elapsed_ms = elapsed_ms
+
+    @classmethod
+    def capture(cls, game):
+        """Snapshot the game's current level, counters and board"""
+        return cls(game.level, int(game.score), game.moves_left, int(game.target_score), game.board.get_cells(),
+                   combo_multiplier=game.combo_multiplier, moves_made=game.moves_made,
+                   matches_made=game.matches_made,
+                   elapsed_ms=pygame.time.get_ticks() - game.level_start_ticks)
+
+    def apply(self, game):
+        """Put the game back into this state, rebuilding the board from its cells"""
+        game.level = self.level
+        game.score = self.score
+        game.moves_left = self.moves_left
+        game.target_score = self.target_score
+        game.combo_multiplier = self.combo_multiplier
+        game.moves_made = self.moves_made
+        game.matches_made = self.matches_made
+        game.level_start_ticks = pygame.time.get_ticks() - self.elapsed_ms
+        game.last_move_ticks = pygame.time.get_ticks()
+        game.board.load_cells(self.cells)
+
+    def to_bytes(self):
+        """Pack the state into its binary form"""
+        data = SAVE_HEADER.pack(SAVE_MAGIC, SAVE_STATE_VERSION, self.width, self.height, self.level,
+                                self.moves_left, self.score, self.target_score, self.combo_multiplier,
+                                self.moves_made, self.matches_made, self.elapsed_ms) + bytes(self.cells)
+        return data + SAVE_CHECKSUM.pack(zlib.crc32(data))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Unpack a blob written by to_bytes, raising ValueError if it is damaged or from another version"""
+        if len(data) < SAVE_HEADER.size + SAVE_CHECKSUM.size:
+            raise ValueError("save state is truncated")
+        body = memoryview(data)[:-SAVE_CHECKSUM.size]
+        (checksum,) = SAVE_CHECKSUM.unpack_from(data, len(body))
+        if zlib.crc32(body) != checksum:
+            raise ValueError("save state checksum mismatch")
+
+        (magic, version, width, height, level, moves_left, score, target_score, combo_multiplier,
+         moves_made, matches_made, elapsed_ms) = SAVE_HEADER.unpack_from(data)
+        if magic != SAVE_MAGIC or version != SAVE_STATE_VERSION:
+            raise ValueError("not a save state for this version")
+        if (width, height) != (BOARD_WIDTH, BOARD_HEIGHT) or len(body) != SAVE_HEADER.size + width * height:
+            raise ValueError("save state board size does not match")
+
+        return cls(level, score, moves_left, target_score, bytes(body[SAVE_HEADER.size:]), width, height,
+                   combo_multiplier, moves_made, matches_made, elapsed_ms)
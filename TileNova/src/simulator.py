@@ -0,0 +1,211 @@
+import csv
+import json
+import os
+import random
+import zlib
+from collections import Counter
+from multiprocessing import Pool
+from config import *
+from ai import ExpectimaxAI
+from batch_engine import BatchEngine, run_random_games
+from board_generator import generate_board
+from engine import GameState
+from level_manager import LevelManager
+
+class RandomPolicy:
+    """Plays a uniformly random valid move"""
+    name = "random"
+
+    def __init__(self, rng):
+        self.rng = rng
+
+    def choose(self, state, moves):
+        return self.rng.choice(moves)
+
+    def move_score(self, state, move):
+        """Points a move scores right away, with refills the bot cannot foresee"""
+        stats = state.copy(random.Random(self.rng.random())).play(*move)
+        return stats['score_delta'] if stats else 0
+
+class GreedyPolicy(RandomPolicy):
+    """Plays the move that scores the most immediately, breaking ties at random"""
+    name = "greedy"
+
+    def choose(self, state, moves):
+        scored = [(self.move_score(state, move), self.rng.random(), move) for move in moves]
+        return max(scored)[2]
+
+class LookaheadPolicy(RandomPolicy):
+    """Plays the move whose score plus the best greedy follow-up is highest
+
+    Only the few best immediate moves are expanded to keep a decision cheap.
+    """
+    name = "lookahead"
+    width = 5
+
+    def choose(self, state, moves):
+        ranked = sorted(moves, key=lambda move: self.move_score(state, move), reverse=True)[:self.width]
+        best_move, best_value = ranked[0], -1
+        for move in ranked:
+            after = state.copy(random.Random(self.rng.random()))
+            stats = after.play(*move)
+            follow_ups = after.valid_moves() if stats and after.outcome() is None else []
+            value = (stats['score_delta'] if stats else 0) + max(
+                (self.move_score(after, follow_up) for follow_up in follow_ups), default=0)
+            if value > best_value:
+                best_move, best_value = move, value
+        return best_move
+
+class ExpectimaxPolicy(RandomPolicy):
+    """Plays the AI's move, the same one hints and autoplay suggest"""
+    name = "expectimax"
+
+    def __init__(self, rng):
+        super().__init__(rng)
+        self.ai = ExpectimaxAI()
+
+    def choose(self, state, moves):
+        return self.ai.choose(state, moves)
+
+# Policies selectable by name; add a class with a name and choose(state, moves) to plug in another bot
+POLICIES = {policy.name: policy for policy in (RandomPolicy, GreedyPolicy, LookaheadPolicy, ExpectimaxPolicy)}
+
+def play_game(cells, target_score, moves, policy, rng):
+    """Play one game to the end and return its outcome and per-move cascade depths"""
+    if cells is None:
+        cells = generate_board(seed=rng.getrandbits(64))
+    state = GameState(cells, target_score, moves, rng)
+    cascades = []
+    specials = 0
+    while state.outcome() is None:
+        valid_moves = state.valid_moves()
+        shuffles = 0
+        while not valid_moves and shuffles < SIMULATION_SHUFFLE_LIMIT:
+            state.shuffle()
+            valid_moves = state.valid_moves()
+            shuffles += 1
+        if not valid_moves:
+            break
+
+        stats = state.play(*policy.choose(state, valid_moves))
+        if stats is None:
+            continue  # A lightning tile rolled a color that is not on the board; the swap did nothing
+        cascades.append(stats['cascade_depth'])
+        specials += stats['specials_created']
+
+    return {'won': state.outcome() == 'win', 'score': state.score, 'moves_used': state.moves_made,
+            'cascades': cascades, 'specials_created': specials}
+
+def run_chunk(job):
+    """Worker entry point: play a batch of games of one level with one policy"""
+    level_num, policy_name, cells, target_score, moves, seed, games = job
+    rng = random.Random(seed)
+    policy = POLICIES[policy_name](random.Random(rng.random()))
+    return level_num, policy_name, [play_game(cells, target_score, moves, policy, rng) for _ in range(games)]
+
+def run_batch_chunk(job):
+    """Worker entry point for the batch engine: play a chunk of random games side by side"""
+    level_num, policy_name, cells, target_score, moves, seed, games = job
+    results, _ = run_random_games(BatchEngine(games, cells, target_score, moves, seed))
+    return level_num, policy_name, results
+
+def level_jobs(level_manager, level_num, policy_name, games, seed, chunk_size=SIMULATION_CHUNK_SIZE):
+    """Split a level's games into chunks, each with its own seed"""
+    level_data = level_manager.load_level(level_num) or {}
+    compiled = level_manager.get_compiled_level(level_num)
+    cells = compiled.cells if compiled else None
+    target_score = level_data.get('target_score', 3000)
+    moves = level_data.get('moves', 20)
+    jobs = []
+    for start in range(0, games, chunk_size):
+        chunk_seed = zlib.crc32(f"{seed}:{level_num}:{policy_name}:{start}".encode())
+        jobs.append((level_num, policy_name, cells, target_score, moves, chunk_seed,
+                     min(chunk_size, games - start)))
+    return jobs, target_score, moves
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def summarize(level_num, policy_name, target_score, moves, results):
+    """Fold per-game results into the balancing report for one level and policy"""
+    scores = sorted(result['score'] for result in results)
+    wins = [result for result in results if result['won']]
+    cascade_depths = Counter(depth for result in results for depth in result['cascades'])
+    score_bins = Counter(score // SIMULATION_SCORE_BIN * SIMULATION_SCORE_BIN for score in scores)
+    games = len(results)
+    return {
+        'level': level_num,
+        'policy': policy_name,
+        'games': games,
+        'target_score': target_score,
+        'moves': moves,
+        'pass_rate': len(wins) / games if games else 0.0,
+        'avg_moves_used': sum(result['moves_used'] for result in results) / games if games else 0.0,
+        'avg_moves_used_to_win': sum(result['moves_used'] for result in wins) / len(wins) if wins else None,
+        'avg_specials_created': sum(result['specials_created'] for result in results) / games if games else 0.0,
+        'score': {
+            'mean': sum(scores) / games if games else 0.0,
+            'min': scores[0] if scores else 0,
+            'p10': percentile(scores, 0.10),
+            'p25': percentile(scores, 0.25),
+            'p50': percentile(scores, 0.50),
+            'p75': percentile(scores, 0.75),
+            'p90': percentile(scores, 0.90),
+            'max': scores[-1] if scores else 0,
+            'histogram': {str(start): count for start, count in sorted(score_bins.items())},
+        },
+        'cascade_depth_histogram': {str(depth): count for depth, count in sorted(cascade_depths.items())},
+    }
+
+def simulate(levels, policy_names, games=SIMULATION_GAMES, workers=None, seed=0, level_manager=None, batch=False):
+    """Play every level with every policy on a process pool and return one report per pair
+
+    With batch set, games run on the NumPy batch engine, which only plays random moves.
+    """
+    if batch and set(policy_names) != {RandomPolicy.name}:
+        raise ValueError("the batch engine only plays the random policy")
+    level_manager = level_manager or LevelManager()
+    chunk_size = SIMULATION_BATCH_SIZE if batch else SIMULATION_CHUNK_SIZE
+    jobs = []
+    settings = {}
+    for level_num in levels:
+        for policy_name in policy_names:
+            level_jobs_list, target_score, moves = level_jobs(level_manager, level_num, policy_name, games, seed,
+                                                              chunk_size)
+            jobs.extend(level_jobs_list)
+            settings[(level_num, policy_name)] = (target_score, moves)
+
+    results = {key: [] for key in settings}
+    with Pool(processes=workers or os.cpu_count()) as pool:
+        for level_num, policy_name, chunk in pool.imap_unordered(run_batch_chunk if batch else run_chunk, jobs):
+            results[(level_num, policy_name)].extend(chunk)
+
+    return [summarize(level_num, policy_name, *settings[(level_num, policy_name)], results[(level_num, policy_name)])
+            for level_num, policy_name in settings]
+
+def write_json(reports, path):
+    """Write the reports as a JSON list"""
+    with open(path, 'w') as f:
+        json.dump(reports, f, indent=2)
+
+CSV_FIELDS = ['level', 'policy', 'games', 'target_score', 'moves', 'pass_rate', 'avg_moves_used',
+              'avg_moves_used_to_win', 'avg_specials_created', 'score_mean', 'score_min', 'score_p10', 'score_p25',
+              'score_p50', 'score_p75', 'score_p90', 'score_max', 'score_histogram', 'cascade_depth_histogram']
+
+def write_csv(reports, path):
+    """Write one row per level and policy; histograms are packed as bucket:count pairs"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        for report in reports:
+            row = {key: value for key, value in report.items() if key in CSV_FIELDS}
+            for key, value in report['score'].items():
+                if key != 'histogram':
+                    row[f'score_{key}'] = value
+            row['score_histogram'] = ";".join(f"{k}:{v}" for k, v in report['score']['histogram'].items())
+            row['cascade_depth_histogram'] = ";".join(
+                f"{k}:{v}" for k, v in report['cascade_depth_histogram'].items())
+            writer.writerow(row)
@@ -1,13 +1,14 @@
 import pygame
 import os
+import hashlib
 import numpy
 from config import *
 
 class SoundManager:
     def __init__(self):
-        if pygame.mixer.get_init():
-            pygame.mixer.quit()
-        pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        # main.py pre-initializes the mixer; sounds are generated to match whatever format it has
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
         self.sounds = {}
         self.music_volume = 0.5
         self.sfx_volume = 0.7
@@ -43,39 +44,78 @@ class SoundManager:
     
     def create_beep_sound(self, frequency, duration):
         """Create a simple beep sound"""
-        sample_rate = 22050
-        frames = int(duration * sample_rate)
-        arr = []
-        
-        for i in range(frames):
-            time = float(i) / sample_rate
-            wave = 4096 * (0.5 * (1 + (time * frequency * 2 * 3.14159) % (2 * 3.14159) / 3.14159 - 1))
-            # Adapt to the mixer's 8-channel requirement
-            arr.append([int(wave)] * 8)
-        
-        sound = pygame.sndarray.make_sound(numpy.array(arr, dtype=numpy.int16))
-        return sound
-    
+        return self.make_cached_sound(('beep', frequency, duration), self.synthesize_beep)
+
     def create_melody(self, frequencies, note_duration):
         """Create a simple melody from frequencies"""
-        sample_rate = 22050
+        return self.make_cached_sound(('melody', tuple(frequencies), note_duration), self.synthesize_melody)
+
+    def synthesize_beep(self, sample_rate, frequency, duration):
+        """Sawtooth beep as 16-bit sample values"""
+        frames = int(duration * sample_rate)
+        time = numpy.arange(frames, dtype=numpy.float64) / sample_rate
+        return self.sawtooth(time, frequency, 4096)
+
+    def synthesize_melody(self, sample_rate, frequencies, note_duration):
+        """Sawtooth melody, one note per frequency, as 16-bit sample values"""
         total_duration = len(frequencies) * note_duration
         frames = int(total_duration * sample_rate)
-        arr = []
-        
-        for i in range(frames):
-            time = float(i) / sample_rate
-            note_index = int(time / note_duration)
-            if note_index < len(frequencies):
-                frequency = frequencies[note_index]
-                wave = 2048 * (0.5 * (1 + (time * frequency * 2 * 3.14159) % (2 * 3.14159) / 3.14159 - 1))
-            else:
-                wave = 0
-            # Adapt to the mixer's 8-channel requirement
-            arr.append([int(wave)] * 8)
-        
-        sound = pygame.sndarray.make_sound(numpy.array(arr, dtype=numpy.int16))
-        return sound
+        time = numpy.arange(frames, dtype=numpy.float64) / sample_rate
+        note_index = (time / note_duration).astype(numpy.int64)
+        in_range = note_index < len(frequencies)
+        frequency = numpy.asarray(frequencies, dtype=numpy.float64)[numpy.minimum(note_index, len(frequencies) - 1)]
+        return numpy.where(in_range, self.sawtooth(time, frequency, 2048), 0)
+
+    @staticmethod
+    def sawtooth(time, frequency, amplitude):
+        """Rising sawtooth wave from 0 to amplitude"""
+        phase = (time * frequency * 2 * 3.14159) % (2 * 3.14159)
+        return amplitude * (0.5 * (1 + phase / 3.14159 - 1))
+
+    def mixer_format(self):
+        """Return (frequency, size, channels) of the running mixer"""
+        mixer_init = pygame.mixer.get_init()
+        if mixer_init:
+            return mixer_init
+        return (22050, -16, 2)
+
+    def to_mixer_samples(self, wave, size, channels):
+        """Convert 16-bit sample values to the mixer's sample format and channel count"""
+        wave = numpy.trunc(wave)
+        if size == 32:
+            samples = (wave / 32768.0).astype(numpy.float32)
+        elif size == -32:
+            samples = (wave * 65536).astype(numpy.int32)
+        elif size == 16:
+            samples = (wave + 32768).astype(numpy.uint16)
+        elif size == 8:
+            samples = (wave / 256 + 128).astype(numpy.uint8)
+        elif size == -8:
+            samples = (wave / 256).astype(numpy.int8)
+        else:
+            samples = wave.astype(numpy.int16)
+
+        if channels > 1:
+            samples = numpy.repeat(samples[:, None], channels, axis=1)
+        return numpy.ascontiguousarray(samples)
+
+    def make_cached_sound(self, params, synthesize):
+        """Build a Sound from synthesized samples, reusing the on-disk cache when possible"""
+        frequency, size, channels = self.mixer_format()
+        key = repr((SOUND_CACHE_VERSION, params, frequency, size, channels))
+        cache_file = os.path.join(SOUND_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npy')
+
+        try:
+            samples = numpy.load(cache_file)
+        except (OSError, ValueError):
+            samples = self.to_mixer_samples(synthesize(frequency, *params[1:]), size, channels)
+            try:
+                os.makedirs(SOUND_CACHE_DIR, exist_ok=True)
+                numpy.save(cache_file, samples)
+            except OSError as e:
+                print(f"Could not cache sound: {e}")
+
+        return pygame.sndarray.make_sound(samples)
     
     def play_bg_music(self):
         """Play background music"""
@@ -120,6 +160,30 @@ class SoundManager:
             self.sounds['game_over'].set_volume(self.sfx_volume)
             self.sounds['game_over'].play()
     
+    def bind_settings(self, db):
+        """Apply the stored audio settings and follow later changes without polling"""
+        current = {
+            'music_volume': self.music_volume,
+            'sfx_volume': self.sfx_volume,
+            'music_enabled': self.music_enabled,
+            'sfx_enabled': self.sfx_enabled
+        }
+        for key, value in current.items():
+            self.on_setting_changed(key, db.get_setting(key, value))
+            db.add_setting_listener(key, self.on_setting_changed)
+    
+    def on_setting_changed(self, key, value):
+        """React to a setting change pushed by the database"""
+        if key == 'music_volume':
+            self.set_music_volume(float(value))
+        elif key == 'sfx_volume':
+            self.set_sfx_volume(float(value))
+        elif key == 'music_enabled':
+            if bool(value) != self.music_enabled:
+                self.toggle_music()
+        elif key == 'sfx_enabled':
+            self.sfx_enabled = bool(value)
+    
     def set_music_volume(self, volume):
         """Set music volume (0.0 to 1.0)"""
         self.music_volume = max(0.0, min(1.0, volume))
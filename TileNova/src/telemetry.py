@@ -0,0 +1,45 @@
+import threading
+import time
+import uuid
+from collections import deque
+from config import *
+
+class Telemetry:
+    """Gameplay events kept in a ring buffer and bulk-inserted through the persistence queue"""
+
+    def __init__(self, persistence, capacity=TELEMETRY_BUFFER_SIZE):
+        self.persistence = persistence
+        self.session_id = uuid.uuid4().hex
+        self.buffer = deque(maxlen=capacity)  # Oldest events are dropped if flushing falls behind
+        self.lock = threading.Lock()
+        self.dropped = 0
+        self.last_flush = time.monotonic()
+        self.last_rollup = time.monotonic()
+
+    def record(self, event_type, level_id, move_number=0, score_delta=0, cascade_depth=0,
+               specials_created=0, specials_triggered=0, duration_ms=0, outcome=None):
+        """Append one event; this only touches memory"""
+        row = (self.session_id, level_id, event_type, time.time(), move_number, int(score_delta),
+               cascade_depth, specials_created, specials_triggered, int(duration_ms), outcome)
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(row)
+
+    def flush(self):
+        """Hand every buffered event to the writer thread as one executemany"""
+        with self.lock:
+            rows = list(self.buffer)
+            self.buffer.clear()
+        self.last_flush = time.monotonic()
+        if rows:
+            self.persistence.save_events(rows)
+
+    def update(self):
+        """Flush and roll up on their intervals; call once per frame"""
+        now = time.monotonic()
+        if now - self.last_flush >= TELEMETRY_FLUSH_INTERVAL:
+            self.flush()
+        if now - self.last_rollup >= TELEMETRY_ROLLUP_INTERVAL:
+            self.last_rollup = now
+            self.persistence.rollup_events(TELEMETRY_RETENTION_DAYS * 24 * 60 * 60)
@@ -1,7 +1,6 @@
 import pygame
-import random
-import os
 from config import *
+from tile_atlas import get_tile_atlas
 
 class Tile(pygame.sprite.Sprite):
     def __init__(self, x, y, tile_type):
@@ -114,21 +113,7 @@ class Tile(pygame.sprite.Sprite):
     
     def load_fruit_image(self):
         """Load the image for the tile's fruit type"""
-        # Check if it's a special tile
-        if self.tile_type >= 100:  # Special tiles start at 100
-            from config import SPECIAL_TILES
-            image_name = SPECIAL_TILES.get(self.tile_type)
-        else:
-            image_name = FRUIT_IMAGES.get(self.tile_type)
-            
-        if image_name:
-            path = os.path.join(TILE_ASSETS, image_name)
-            try:
-                image = pygame.image.load(path).convert_alpha()
-                return pygame.transform.scale(image, (TILE_SIZE - 15, TILE_SIZE - 15))
-            except pygame.error:
-                return None
-        return None
+        return get_tile_atlas().get_image(self.tile_type)
 
     def is_special_tile(self):
         """Check if this is a special tile"""
@@ -140,11 +125,6 @@ class Tile(pygame.sprite.Sprite):
             return self.tile_type
         return None
 
-    @staticmethod
-    def generate_random_type():
-        """Generate a random tile type"""
-        return random.randint(0, len(FRUIT_IMAGES) - 1)
-
 class TileGroup(pygame.sprite.Group):
     """Custom sprite group for tiles with additional functionality"""
     
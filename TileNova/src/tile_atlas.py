@@ -0,0 +1,81 @@
+import pygame
+import json
+import os
+import threading
+from config import *
+
+class TileAtlas:
+    """Tile images decoded once from a packed atlas and handed out as subsurfaces"""
+
+    def __init__(self, tile_size=TILE_SIZE):
+        self.tile_size = tile_size
+        self.image_size = (tile_size - TILE_IMAGE_PADDING, tile_size - TILE_IMAGE_PADDING)
+        self.source = None  # The packed atlas surface every tile image views into
+        self.rects = {}
+        self.images = {}
+        self.loaded = False
+        self.lock = threading.Lock()  # The preloader may load the atlas off the main thread
+
+    def image_names(self):
+        """Map every tile type to its image file name"""
+        names = dict(FRUIT_IMAGES)
+        names.update(SPECIAL_TILES)
+        return names
+
+    def load(self):
+        """Load the atlas for this tile size, falling back to loose files per tile"""
+        atlas_dir = os.path.join(TILE_ASSETS, str(self.tile_size))
+        try:
+            with open(os.path.join(atlas_dir, TILE_ATLAS_INDEX), 'r') as f:
+                index = json.load(f)
+            self.source = pygame.image.load(os.path.join(atlas_dir, index["image"])).convert_alpha()
+            self.rects = {name: pygame.Rect(rect) for name, rect in index["rects"].items()}
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, pygame.error):
+            self.source = None
+            self.rects = {}
+
+        for tile_type, image_name in self.image_names().items():
+            self.images[tile_type] = self.load_image(image_name)
+        self.loaded = True
+
+    def load_image(self, image_name):
+        """Return a view into the atlas, or the loose file if the atlas lacks it"""
+        rect = self.rects.get(image_name)
+        if self.source is not None and rect is not None:
+            image = self.source.subsurface(rect)
+            if image.get_size() == self.image_size:
+                return image
+            return pygame.transform.scale(image, self.image_size)
+        return self.load_loose_image(image_name)
+
+    def load_loose_image(self, image_name):
+        """Load a single tile PNG, preferring the variant pre-rendered for this size"""
+        for path in (os.path.join(TILE_ASSETS, str(self.tile_size), image_name),
+                     os.path.join(TILE_ASSETS, image_name)):
+            if not os.path.exists(path):
+                continue
+            try:
+                image = pygame.image.load(path).convert_alpha()
+            except pygame.error:
+                return None
+            if image.get_size() != self.image_size:
+                image = pygame.transform.scale(image, self.image_size)
+            return image
+        return None
+
+    def get_image(self, tile_type):
+        """Get the image for a tile type, loading the atlas on first use"""
+        if not self.loaded:
+            with self.lock:
+                if not self.loaded:
+                    self.load()
+        return self.images.get(tile_type)
+
+_shared_atlas = None
+
+def get_tile_atlas():
+    """Get the atlas shared by every tile on the board"""
+    global _shared_atlas
+    if _shared_atlas is None:
+        _shared_atlas = TileAtlas()
+    return _shared_atlas
@@ -1,13 +1,14 @@
 import pygame
 import math
 from config import *
+from utils.helpers import get_font, render_text
 
 class HUD:
     def __init__(self, screen):
         self.screen = screen
-        self.font = pygame.font.Font(None, FONT_SIZE)
-        self.font_large = pygame.font.Font(None, 32)
-        self.font_title = pygame.font.Font(None, 36)
+        self.font = get_font(FONT_SIZE)
+        self.font_large = get_font(32)
+        self.font_title = get_font(36)
         self.animation_time = 0
         
     def draw(self, score, moves_left, target_score, level):
@@ -131,13 +132,13 @@ class HUD:
             ("Swipe", "Move tiles"),
             ("ESC", "Pause game"),
             ("R", "Restart level"),
-            ("H", "Show hint")
+            ("H", "Show hint"),
+            ("A", "Autoplay")
         ]
         
-        small_font = pygame.font.Font(None, 18)
         for key, action in controls:
-            key_text = small_font.render(key, True, YELLOW)
-            action_text = small_font.render(f"- {action}", True, LIGHT_GRAY)
+            key_text = render_text(18, key, YELLOW)
+            action_text = render_text(18, f"- {action}", LIGHT_GRAY)
             
             self.screen.blit(key_text, (hud_rect.x + 10, y_offset))
             self.screen.blit(action_text, (hud_rect.x + 50, y_offset))
@@ -145,7 +146,7 @@ class HUD:
     
     def draw_section_header(self, text, x, y, color):
         """Draw a section header with underline"""
-        header_text = self.font.render(text, True, color)
+        header_text = render_text(FONT_SIZE, text, color)
         self.screen.blit(header_text, (x, y))
         
         # Underline
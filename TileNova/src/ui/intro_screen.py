@@ -18,6 +18,7 @@ class IntroScreen:
         }
         
         self.hovered_button = None
+        self.attract = None  # AttractMode drawn behind the menu instead of the particles, once the game sets it
         
         # Particle system for background
         self.particles = []
@@ -68,10 +69,11 @@ class IntroScreen:
             elif particle['y'] > SCREEN_HEIGHT:
                 particle['y'] = 0
 
-    def draw(self):
+    def draw(self, load_progress=1.0):
         """Draw the enhanced intro screen"""
         self.animation_time += 0.05
-        self.update_particles()
+        if self.attract is None:
+            self.update_particles()
         
         # Gradient background
         for y in range(SCREEN_HEIGHT):
@@ -81,14 +83,17 @@ class IntroScreen:
             b = int(40 * (1 - color_factor))
             pygame.draw.line(self.screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
         
-        # Draw animated particles
-        for particle in self.particles:
-            alpha = int(128 + 127 * abs(math.sin(self.animation_time + particle['x'] * 0.01)))
-            color = (*particle['color'][:3], alpha)
-            
-            particle_surface = pygame.Surface((particle['size'] * 2, particle['size'] * 2), pygame.SRCALPHA)
-            pygame.draw.circle(particle_surface, color, (particle['size'], particle['size']), particle['size'])
-            self.screen.blit(particle_surface, (particle['x'] - particle['size'], particle['y'] - particle['size']))
+        # Draw the attract mode game, or animated particles until it is running
+        if self.attract is not None:
+            self.attract.draw(self.screen)
+        else:
+            for particle in self.particles:
+                alpha = int(128 + 127 * abs(math.sin(self.animation_time + particle['x'] * 0.01)))
+                color = (*particle['color'][:3], alpha)
+                
+                particle_surface = pygame.Surface((particle['size'] * 2, particle['size'] * 2), pygame.SRCALPHA)
+                pygame.draw.circle(particle_surface, color, (particle['size'], particle['size']), particle['size'])
+                self.screen.blit(particle_surface, (particle['x'] - particle['size'], particle['y'] - particle['size']))
         
         # Animated title with glow effect
         title_scale = 1.0 + 0.1 * abs(math.sin(self.animation_time))
@@ -188,3 +193,16 @@ class IntroScreen:
         controls_title = self.font_small.render("CONTROLS: ESC-Pause | R-Restart | H-Hint", True, CYAN)
         controls_rect = controls_title.get_rect(center=(SCREEN_WIDTH // 2, controls_y))
         self.screen.blit(controls_title, controls_rect)
+        
+        # Loading bar while the preloader is still working
+        if load_progress < 1.0:
+            self.draw_load_progress(load_progress)
+    
+    def draw_load_progress(self, load_progress):
+        """Draw a thin progress bar under the buttons while assets load"""
+        bar_rect = pygame.Rect(SCREEN_WIDTH // 2 - BUTTON_WIDTH // 2, 290, BUTTON_WIDTH, 6)
+        pygame.draw.rect(self.screen, DARK_GRAY, bar_rect, border_radius=3)
+        fill_rect = bar_rect.copy()
+        fill_rect.width = int(bar_rect.width * load_progress)
+        if fill_rect.width > 0:
+            pygame.draw.rect(self.screen, CYAN, fill_rect, border_radius=3)
@@ -7,4 +7,24 @@ def load_image(path):
         return image
     except pygame.error as message:
         print("Cannot load image:", path)
-        raise SystemExit(message)
\ No newline at end of file
+        raise SystemExit(message)
+
+_font_cache = {}
+_text_cache = {}
+
+def get_font(size):
+    """Get the default font at the given size, creating it only once"""
+    font = _font_cache.get(size)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        _font_cache[size] = font
+    return font
+
+def render_text(size, text, color):
+    """Render static text once and reuse the surface on later frames"""
+    key = (size, text, color)
+    surface = _text_cache.get(key)
+    if surface is None:
+        surface = get_font(size).render(text, True, color)
+        _text_cache[key] = surface
+    return surface
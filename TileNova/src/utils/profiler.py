@@ -0,0 +1,95 @@
+import threading
+import time
+from contextlib import contextmanager
+
+class StartupTrace:
+    """Records how long each startup phase takes, relative to process start"""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.phases = []
+        self.enabled = False
+        self.lock = threading.Lock()
+
+    def elapsed_ms(self):
+        """Milliseconds since the trace started"""
+        return (time.perf_counter() - self.start_time) * 1000
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one startup phase"""
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - begin) * 1000)
+
+    def record(self, name, duration_ms):
+        """Store a finished phase and print it when tracing is enabled"""
+        thread_name = threading.current_thread().name
+        background = threading.current_thread() is not threading.main_thread()
+        with self.lock:
+            self.phases.append({
+                'name': name,
+                'duration_ms': duration_ms,
+                'finished_at_ms': self.elapsed_ms(),
+                'thread': thread_name
+            })
+        if self.enabled:
+            where = f" ({thread_name})" if background else ""
+            print(f"[startup] {name:<24} {duration_ms:8.2f} ms{where}")
+
+    def mark(self, name):
+        """Record a point in time, such as the first frame being shown"""
+        at_ms = self.elapsed_ms()
+        with self.lock:
+            self.phases.append({'name': name, 'duration_ms': 0.0, 'finished_at_ms': at_ms,
+                                'thread': threading.current_thread().name})
+        if self.enabled:
+            print(f"[startup] {name:<24} at {at_ms:8.2f} ms")
+
+    def report(self):
+        """Return the recorded phases as a printable table"""
+        with self.lock:
+            phases = list(self.phases)
+        lines = [f"{'phase':<24} {'time':>10} {'done at':>10}  thread"]
+        for phase in phases:
+            lines.append(f"{phase['name']:<24} {phase['duration_ms']:8.2f}ms {phase['finished_at_ms']:8.2f}ms  {phase['thread']}")
+        return "\n".join(lines)
+
+class BackgroundLoader:
+    """Builds an object on a worker thread; the first caller that needs it waits for it"""
+
+    def __init__(self, name, factory, trace=None):
+        self.name = name
+        self.factory = factory
+        self.trace = trace
+        self.value = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name=f"init-{name}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """Build the object, remembering any failure for the caller"""
+        try:
+            if self.trace:
+                with self.trace.phase(self.name):
+                    self.value = self.factory()
+            else:
+                self.value = self.factory()
+        except Exception as e:
+            self.error = e
+
+    def ready(self):
+        """Check whether the object has finished building"""
+        return not self.thread.is_alive()
+
+    def get(self):
+        """Return the object, blocking until the worker thread finishes"""
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+startup_trace = StartupTrace()
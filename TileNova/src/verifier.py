@@ -0,0 +1,112 @@
+import os
+import time
+from multiprocessing import Pool
+from config import *
+from level_manager import LevelManager
+from replay import Replay, OUTCOME_UNFINISHED, OUTCOME_WIN
+from replay_player import ReplayGame
+
+# Each worker process loads the levels once and keeps them for every chunk it verifies
+worker_level_manager = None
+
+def init_worker():
+    global worker_level_manager
+    worker_level_manager = LevelManager()
+
+def verdict(accepted, reason=None, score=0, completed=False, stars=0, swaps=0):
+    return {'accepted': accepted, 'reason': reason, 'score': score, 'completed': completed, 'stars': stars,
+            'swaps': swaps}
+
+def verify_replay(data, claimed_score, level_manager):
+    """Play a submitted Replay blob back and accept it only if it reaches the score it claims
+
+    claimed_score is the score submitted alongside the replay, or None to
+    check the replay against its own recorded score alone.
+    """
+    try:
+        replay = Replay.from_bytes(data)
+    except ValueError as e:
+        return verdict(False, str(e))
+    except Exception as e:  # As with playback below, a forged blob fails verification, not the worker
+        return verdict(False, f"unreadable replay: {e!r}")
+    if replay.outcome == OUTCOME_UNFINISHED:
+        return verdict(False, "level was not finished")
+    if claimed_score is not None and claimed_score != replay.final_score:
+        return verdict(False, f"claimed {claimed_score} but the replay records {replay.final_score}")
+    if (replay.width, replay.height) != (BOARD_WIDTH, BOARD_HEIGHT) or not level_manager.has_level(replay.level):
+        return verdict(False, f"no level {replay.level} on this board size")
+
+    game = ReplayGame(level_manager)
+    try:
+        score, outcome = game.play(replay)
+    except Exception as e:  # A forged replay can hold anything; it fails verification, not the worker
+        return verdict(False, f"playback failed: {e!r}", swaps=len(replay.events))
+    if not replay.matches(score, outcome):
+        return verdict(False, f"played back to {score}, not {replay.final_score}", score, swaps=len(replay.events))
+    completed = outcome == OUTCOME_WIN
+    return verdict(True, None, score, completed, game.calculate_stars() if completed else 0, len(replay.events))
+
+def verify_chunk(chunk):
+    """Worker entry point: verify (key, claimed score, data) submissions and time the work"""
+    started = time.perf_counter()
+    verdicts = [(key, verify_replay(data, claimed_score, worker_level_manager)) for key, claimed_score, data in chunk]
+    return verdicts, time.perf_counter() - started
+
+class VerificationStats:
+    """Running totals and throughput for a verification run"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.replays = 0
+        self.accepted = 0
+        self.swaps = 0
+        self.worker_seconds = 0.0
+
+    def add(self, verdicts, seconds):
+        self.replays += len(verdicts)
+        self.accepted += sum(1 for _, result in verdicts if result['accepted'])
+        self.swaps += sum(result['swaps'] for _, result in verdicts)
+        self.worker_seconds += seconds
+
+    def report(self):
+        """One line: counts, replays per minute, swaps per second and worker time per replay"""
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        per_replay = self.worker_seconds / max(1, self.replays) * 1000
+        return (f"{self.replays} replays, {self.accepted} accepted, {self.replays - self.accepted} rejected "
+                f"in {elapsed:.1f}s: {self.replays / elapsed * 60:,.0f} replays/min, "
+                f"{self.swaps / elapsed:,.0f} swaps/s, {per_replay:.1f} ms per replay per worker")
+
+class Verifier:
+    """A process pool that plays submitted replays back in chunks
+
+    The pool lives as long as the Verifier, so a service verifying batch
+    after batch pays for starting the workers and loading the levels once.
+    """
+
+    def __init__(self, workers=None, chunk_size=VERIFY_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.pool = Pool(processes=workers or os.cpu_count(), initializer=init_worker)
+        self.stats = VerificationStats()
+
+    def verify(self, submissions):
+        """Verify (key, claimed score, data) submissions, yielding (key, verdict) lists as chunks finish"""
+        chunks = [submissions[i:i + self.chunk_size] for i in range(0, len(submissions), self.chunk_size)]
+        for verdicts, seconds in self.pool.imap_unordered(verify_chunk, chunks):
+            self.stats.add(verdicts, seconds)
+            yield verdicts
+
+    def verify_database(self, db, batch_size=VERIFY_BATCH_SIZE):
+        """Verify every pending submission in the database, recording each chunk's verdicts; returns the count"""
+        done = 0
+        while True:
+            pending = db.get_pending_replays(batch_size)
+            if not pending:
+                return done
+            for verdicts in self.verify(pending):
+                if not db.record_replay_verdicts(verdicts):
+                    return done  # Left pending; fetching them again would only fail the same way
+                done += len(verdicts)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
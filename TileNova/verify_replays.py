@@ -0,0 +1,53 @@
+import argparse
+import glob
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from config import VERIFY_POLL_INTERVAL
+from database import Database
+from verifier import Verifier
+
+def read_directory(directory):
+    """Every .tnr file in a directory as a (path, claimed score, data) submission"""
+    submissions = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.tnr"))):
+        with open(path, 'rb') as f:
+            submissions.append((path, None, f.read()))
+    return submissions
+
+def main():
+    parser = argparse.ArgumentParser(description="Play submitted replays back and accept only scores that match")
+    parser.add_argument("--db", default="game_progress.db", help="database holding the submission queue")
+    parser.add_argument("--dir", help="check the .tnr files in a directory instead; nothing is written")
+    parser.add_argument("--watch", action="store_true", help="keep running and verify new submissions as they arrive")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per core)")
+    args = parser.parse_args()
+
+    verifier = Verifier(args.workers)
+    try:
+        if args.dir:
+            for verdicts in verifier.verify(read_directory(args.dir)):
+                for path, verdict in verdicts:
+                    if not verdict['accepted']:
+                        print(f"{path}: rejected, {verdict['reason']}")
+            print(verifier.stats.report())
+            return
+
+        db = Database(args.db)
+        try:
+            while True:
+                if verifier.verify_database(db):
+                    print(verifier.stats.report())
+                if not args.watch:
+                    break
+                time.sleep(VERIFY_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            db.close()
+    finally:
+        verifier.close()
+
+if __name__ == "__main__":
+    main()